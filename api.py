@@ -0,0 +1,384 @@
+"""
+    Project Name:       Mo Bank (A dummy banking system)
+    Module:             api
+    Purpose:            HTTP JSON API of the ledger server
+    Description:
+        Gives ATMs, internet banking and scripts the banking operations of the app over HTTP, on the same
+        LedgerServer as the counters (server.py), so they share its sessions, role checks and single writer:
+            python server.py --db assets/mo_bank.db --http 127.0.0.1:8080
+
+        The HTTP/1.1 server is written on asyncio streams with the standard library only. Connections are kept alive
+        between requests (until Connection: close or KEEP_ALIVE_SECONDS idle), every connection is served
+        concurrently, and requests sent ahead on a connection are answered in order. Bodies are JSON with a
+        Content-Length; amounts are decimal rupee strings ("2500.00"), dates YYYY-MM-DD.
+
+            POST /login                             {"user_info", "password"} -> {"token", "session"}
+            POST /logout
+            GET  /accounts/{acc_no}/balance         -> {"acc_no", "name", "balance"}
+            POST /accounts/{acc_no}/atm-withdrawals {"amount"} -> {"acc_no", "balance"}   (account holder)
+            POST /accounts/{acc_no}/deposits        {"amount"} -> {"acc_no", "balance"}   (Admin/SWO)
+            POST /accounts/{acc_no}/withdrawals     {"amount"} -> {"acc_no", "balance"}   (Admin/SWO)
+            POST /transfers                         {"from_acc_no", "to_acc_no", "amount"} -> {"acc_no", "balance"}
+            GET  /accounts/{acc_no}/statement?from_date=&to_date=&limit=&after=
+                                                    -> {"acc_no", "transactions", "next"}
+
+        Every request but login carries "Authorization: Bearer <token>". A statement page holds up to limit
+        transactions (default STATEMENT_PAGE_SIZE); "next" is the after value of the following page, null on the last
+        one. Errors come as {"error": {"type", "message"}} with a 4xx/5xx status.
+"""
+
+################################   Libraries   ################################
+import asyncio
+import base64
+from datetime import date
+from http import HTTPStatus
+import json
+import logging
+import re
+from urllib.parse import parse_qs, urlsplit
+
+from database import MAX_INTEGER
+from money import Money
+from server import MAX_PAGE_SIZE, LedgerServer, listen, stop_listening
+from service import ServiceError, day_range, timestamp_bounds
+
+
+#############################   Global variables   ############################
+MAX_HEAD_BYTES = 16_384  # request line and headers
+MAX_BODY_BYTES = 65_536
+KEEP_ALIVE_SECONDS = 30  # idle connections are closed after
+STATEMENT_PAGE_SIZE = 100
+
+# HTTP status of the error types of the ledger server, others are 422
+ERROR_STATUS = {
+    "BadRequest": 400,
+    "NotAuthenticated": 401,
+    "NotAllowed": 403,
+    "AccountNotFound": 404,
+    "ServerError": 500,
+}
+
+# Method, path and handler name of every route, the path groups (account numbers) are passed to the handler as int
+ROUTES = [
+    ("POST", re.compile(r"/login"), "login"),
+    ("POST", re.compile(r"/logout"), "logout"),
+    ("GET", re.compile(r"/accounts/(\d+)/balance"), "balance"),
+    ("POST", re.compile(r"/accounts/(\d+)/atm-withdrawals"), "atm_withdrawal"),
+    ("POST", re.compile(r"/accounts/(\d+)/deposits"), "deposit"),
+    ("POST", re.compile(r"/accounts/(\d+)/withdrawals"), "withdrawal"),
+    ("POST", re.compile(r"/transfers"), "transfer"),
+    ("GET", re.compile(r"/accounts/(\d+)/statement"), "statement"),
+]
+
+log = logging.getLogger("mobank.api")
+
+
+###############################   Exceptions   ################################
+class HttpError(Exception):
+    def __init__(self, status: int, kind: str, message: str, close: bool = False):
+        super().__init__(message)
+        self.status = status
+        self.kind = kind
+        self.close = close  # the connection can't be read any further
+
+
+#############################   Helper functions   ############################
+def parse_head(head: bytes) -> tuple:
+    """Method, target, version and headers (lower case names) of a request head"""
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, target, version = lines[0].split(" ")
+    except ValueError:
+        raise HttpError(400, "BadRequest", "Invalid request line", close=True)
+
+    headers = {}
+    for line in lines[1:]:
+        if not line:
+            continue
+        name, sep, value = line.partition(":")
+        if not sep:
+            raise HttpError(400, "BadRequest", "Invalid header line", close=True)
+        headers[name.strip().lower()] = value.strip()
+    return method, target, version, headers
+
+
+def keep_alive(version: str, headers: dict) -> bool:
+    connection = headers.get("connection", "").lower()
+    if version == "HTTP/1.1":
+        return connection != "close"
+    return connection == "keep-alive"
+
+
+def encode_response(status: int, payload, keep_open: bool) -> bytes:
+    body = (
+        b"" if payload is None else json.dumps(payload, separators=(",", ":")).encode()
+    )
+    head = (
+        f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+        "Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_open else 'close'}\r\n\r\n"
+    )
+    return head.encode("latin-1") + body
+
+
+def error_payload(kind: str, message: str) -> dict:
+    return {"error": {"type": kind, "message": message}}
+
+
+def bearer_token(headers: dict):
+    scheme, _, token = headers.get("authorization", "").partition(" ")
+    return token.strip() if scheme.lower() == "bearer" and token else None
+
+
+def checked_integer(value: int, name: str) -> int:
+    """value if SQLite can store it, larger numbers can't be an account or an amount"""
+    if abs(value) > MAX_INTEGER:
+        raise HttpError(400, "BadRequest", f"{name} out of range")
+    return value
+
+
+def amount_paise(body: dict) -> int:
+    """Paise of the rupee amount of a request body"""
+    if "amount" not in body:
+        raise HttpError(400, "BadRequest", "amount missing")
+    try:
+        paise = Money.from_rupees(body["amount"]).paise
+    except ValueError as err:
+        raise HttpError(400, "BadRequest", str(err))
+    return checked_integer(paise, "amount")
+
+
+def account_number(body: dict, field: str) -> int:
+    value = body.get(field)
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise HttpError(400, "BadRequest", f"{field} missing")
+    try:
+        acc_no = int(value)
+    except ValueError:
+        raise HttpError(400, "BadRequest", f"Invalid {field} {value!r}")
+    return checked_integer(acc_no, field)
+
+
+def encode_after(row) -> str:
+    """Opaque statement page token of the last row of a page"""
+    return base64.urlsafe_b64encode(f"{row[2]}|{row[0]}".encode()).decode()
+
+
+def decode_after(token: str) -> tuple:
+    try:
+        timestamp, _, txn_id = base64.urlsafe_b64decode(token).decode().rpartition("|")
+        return timestamp, checked_integer(int(txn_id), "after")
+    except ValueError:
+        raise HttpError(400, "BadRequest", "Invalid after token")
+
+
+def transaction(row) -> dict:
+    return {
+        "txn_id": row[0],
+        "timestamp": row[2],
+        "operation": row[3],
+        "amount": str(Money(row[5])),
+        "balance": str(Money(row[6])),
+        "details": row[7],
+        "operator": row[8],
+    }
+
+
+##################################   API   ####################################
+class HttpApi:
+    """
+    HTTP/1.1 JSON front end of a LedgerServer
+
+    Parameters
+    ----------
+    server : LedgerServer
+        Server running the operations, shared with its line protocol clients.
+
+    """
+
+    def __init__(self, server: LedgerServer):
+        self.server = server
+        self._connections = {}  # StreamWriter of every open connection, by its task
+
+    async def serve(self, address: str, stop: asyncio.Event):
+        """Accept HTTP connections on address until stop is set"""
+        server = await listen(address, self._connection, MAX_HEAD_BYTES)
+        try:
+            await stop.wait()
+        finally:
+            await stop_listening(address, server, self._connections)
+
+    ##########################   Connections   ##########################
+    async def _connection(self, reader, writer):
+        self._connections[asyncio.current_task()] = writer
+        try:
+            keep_open = True
+            while keep_open:
+                try:
+                    head = await asyncio.wait_for(
+                        reader.readuntil(b"\r\n\r\n"), KEEP_ALIVE_SECONDS
+                    )
+                except asyncio.LimitOverrunError:
+                    status, payload = 431, error_payload(
+                        "BadRequest", "Headers too long"
+                    )
+                    keep_open = False
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError):
+                    break
+                else:
+                    status, payload, keep_open = await self._request(head, reader)
+
+                writer.write(encode_response(status, payload, keep_open))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            del self._connections[asyncio.current_task()]
+            writer.close()
+
+    async def _request(self, head: bytes, reader) -> tuple:
+        """Status, payload and keep alive of the response to one request"""
+        keep_open = False
+        try:
+            method, target, version, headers = parse_head(head)
+            keep_open = keep_alive(version, headers)
+            body = await self._body(reader, headers)
+            status, payload = await self.respond(method, target, headers, body)
+        except HttpError as err:
+            keep_open = keep_open and not err.close
+            status, payload = err.status, error_payload(err.kind, str(err))
+        except ServiceError as err:
+            status, payload = 422, error_payload("ServiceError", str(err))
+        except Exception:
+            log.exception("Request %r failed", head[:200])
+            status, payload = 500, error_payload("ServerError", "Internal server error")
+        return status, payload, keep_open
+
+    @staticmethod
+    async def _body(reader, headers: dict) -> bytes:
+        if "transfer-encoding" in headers:
+            raise HttpError(
+                501, "BadRequest", "Chunked bodies not supported", close=True
+            )
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            raise HttpError(400, "BadRequest", "Invalid Content-Length", close=True)
+        if not 0 <= length <= MAX_BODY_BYTES:
+            raise HttpError(413, "BadRequest", "Body too large", close=True)
+        try:
+            return await reader.readexactly(length)
+        except asyncio.IncompleteReadError:
+            raise HttpError(400, "BadRequest", "Body incomplete", close=True)
+
+    async def respond(self, method: str, target: str, headers: dict, body: bytes):
+        """Status and payload of a request"""
+        url = urlsplit(target)
+        allowed = False
+        for route_method, pattern, name in ROUTES:
+            match = pattern.fullmatch(url.path)
+            if match is None:
+                continue
+            allowed = True
+            if route_method == method:
+                break
+        else:
+            if allowed:
+                raise HttpError(405, "BadRequest", f"{method} not allowed here")
+            raise HttpError(404, "BadRequest", f"No route for {url.path}")
+
+        try:
+            data = json.loads(body) if body else {}
+        except ValueError:
+            raise HttpError(400, "BadRequest", "Body is not valid JSON")
+        if not isinstance(data, dict):
+            raise HttpError(400, "BadRequest", "Body should be a JSON object")
+
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        handler = getattr(self, f"_{name}")
+        acc_nos = [checked_integer(int(group), "acc_no") for group in match.groups()]
+        return 200, await handler(bearer_token(headers), data, query, *acc_nos)
+
+    async def _call(self, op: str, token, **args):
+        result, error = await self.server.call(op, token, args)
+        if error is not None:
+            status = ERROR_STATUS.get(error["type"], 422)
+            raise HttpError(status, error["type"], error["message"])
+        return result
+
+    ##########################   Routes   ##########################
+    async def _login(self, token, body: dict, query: dict):
+        user_info = body.get("user_info")
+        password = body.get("password")
+        if not isinstance(user_info, str) or not isinstance(password, str):
+            raise HttpError(400, "BadRequest", "user_info and password required")
+        result = await self._call("login", None, user_info=user_info, password=password)
+        if result is None:
+            raise HttpError(401, "InvalidCredentials", "Invalid credentials")
+        return result
+
+    async def _logout(self, token, body: dict, query: dict):
+        await self._call("logout", token)
+        return {}
+
+    async def _balance(self, token, body: dict, query: dict, acc_no: int):
+        data = await self._call("get_account", token, acc_no=acc_no)
+        if data is None:
+            raise HttpError(404, "AccountNotFound", f"Account {acc_no} not found")
+        return {"acc_no": data[0], "name": data[2], "balance": str(Money(data[9]))}
+
+    async def _posting(self, op: str, token, acc_no: int, **args) -> dict:
+        balance = await self._call(op, token, acc_no=acc_no, **args)
+        return {"acc_no": acc_no, "balance": str(Money(balance))}
+
+    async def _atm_withdrawal(self, token, body: dict, query: dict, acc_no: int):
+        amount = amount_paise(body)
+        return await self._posting("self_withdraw", token, acc_no, amount=amount)
+
+    async def _deposit(self, token, body: dict, query: dict, acc_no: int):
+        amount = amount_paise(body)
+        return await self._posting("deposit", token, acc_no, amount=amount)
+
+    async def _withdrawal(self, token, body: dict, query: dict, acc_no: int):
+        amount = amount_paise(body)
+        return await self._posting("withdraw", token, acc_no, amount=amount)
+
+    async def _transfer(self, token, body: dict, query: dict):
+        sender_acc_no = account_number(body, "from_acc_no")
+        balance = await self._call(
+            "transfer",
+            token,
+            sender_acc_no=sender_acc_no,
+            receiver_acc_no=account_number(body, "to_acc_no"),
+            amount=amount_paise(body),
+        )
+        return {"acc_no": sender_acc_no, "balance": str(Money(balance))}
+
+    async def _statement(self, token, body: dict, query: dict, acc_no: int):
+        try:
+            today = str(date.today())
+            from_date = date.fromisoformat(query.get("from_date", today))
+            to_date = date.fromisoformat(query.get("to_date", today))
+            limit = int(query.get("limit", STATEMENT_PAGE_SIZE))
+        except ValueError as err:
+            raise HttpError(400, "BadRequest", str(err))
+        if not 0 < limit <= MAX_PAGE_SIZE:
+            raise HttpError(400, "BadRequest", f"limit should be 1 to {MAX_PAGE_SIZE}")
+
+        bounds = timestamp_bounds(*day_range(from_date, to_date))
+        after = decode_after(query["after"]) if "after" in query else (bounds[0], 0)
+        rows = await self._call(
+            "transaction_page",
+            token,
+            column="acc_no",
+            key=acc_no,
+            bounds=bounds,
+            after=after,
+            size=limit,
+        )
+        return {
+            "acc_no": acc_no,
+            "transactions": [transaction(row) for row in rows],
+            "next": encode_after(rows[-1]) if len(rows) == limit else None,
+        }
@@ -0,0 +1,311 @@
+"""
+    Project Name:       Mo Bank (A dummy banking system)
+    Module:             batch
+    Purpose:            Headless bulk posting of transaction files
+    Description:
+        Posts a CSV file of deposits, withdrawals and transfers without the GUI. Rows are validated, then applied in
+        chunks: each chunk reads the balances it needs, works out every posting in Python and writes the ledger rows,
+        balance updates and per-row failures with executemany inside one BEGIN IMMEDIATE transaction. Progress is
+        checkpointed in the same transaction, so an interrupted file resumes after its last committed chunk and a
+        completed file is never posted twice.
+
+        CSV layout (header row required, to_acc_no and details are optional):
+            operation,acc_no,amount,to_acc_no,details
+            deposit,100002,2500.00,,Salary for March
+            withdraw,100003,150,,
+            transfer,100002,99.50,100003,
+
+        The database must already be initialised by database.create_schema.
+"""
+
+################################   Libraries   ################################
+from collections import namedtuple
+import csv
+from datetime import datetime
+import hashlib
+from itertools import islice
+import os
+
+from database import MAX_INTEGER, ConnectionManager
+from money import Money
+import queries
+
+
+#############################   Global variables   ############################
+BATCH_CHUNK_SIZE = 5000
+
+# SQLite limits the number of bound parameters in one statement
+MAX_QUERY_PARAMS = 900
+
+OPERATIONS = ("deposit", "withdraw", "transfer")
+
+DEFAULT_DETAILS = {
+    "deposit": "Deposit at Bank",
+    "withdraw": "Withdrawl at Bank",
+}
+
+BatchRow = namedtuple(
+    "BatchRow", ["line_no", "operation", "acc_no", "amount", "to_acc_no", "details"]
+)
+
+
+#############################   Helper functions   ############################
+def file_digest(csv_path: str) -> str:
+    """SHA-256 of the file content, used as the batch id"""
+    digest = hashlib.sha256()
+    with open(csv_path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _parse_acc_no(value: str):
+    value = (value or "").strip()
+    if len(value) < 6 or not value.isdigit():
+        return None
+    acc_no = int(value)
+    return acc_no if acc_no <= MAX_INTEGER else None
+
+
+def parse_row(line_no: int, record: dict) -> tuple:
+    """
+    Validate one CSV record
+
+    Returns
+    -------
+    tuple
+        (BatchRow, "") for a valid record or (None, reason) for an invalid one.
+
+    """
+    operation = (record.get("operation") or "").strip().lower()
+    if operation not in OPERATIONS:
+        return None, "Invalid operation"
+
+    acc_no = _parse_acc_no(record.get("acc_no"))
+    if acc_no is None:
+        return None, "Invalid account number"
+
+    try:
+        amount = Money.from_rupees(record.get("amount") or "")
+    except ValueError:
+        return None, "Invalid amount"
+    if not 0 < amount.paise <= MAX_INTEGER:
+        return None, "Invalid amount"
+
+    to_acc_no = None
+    if operation == "transfer":
+        to_acc_no = _parse_acc_no(record.get("to_acc_no"))
+        if to_acc_no is None:
+            return None, "Invalid receiver account number"
+        if to_acc_no == acc_no:
+            return None, "Can not transfer to same account"
+
+    details = (record.get("details") or "").strip()
+    if not details:
+        details = DEFAULT_DETAILS.get(operation, "")
+
+    row = BatchRow(line_no, operation, acc_no, amount.paise, to_acc_no, details)
+    return row, ""
+
+
+def _load_balances(conn, acc_nos) -> dict:
+    balances = {}
+    acc_nos = list(acc_nos)
+    for start in range(0, len(acc_nos), MAX_QUERY_PARAMS):
+        part = acc_nos[start : start + MAX_QUERY_PARAMS]
+        query = queries.account_balances(len(part))
+        balances.update(conn.execute(query, part).fetchall())
+    return balances
+
+
+def _apply_chunk(conn, batch_id: str, rows: list, operator: int) -> int:
+    """
+    Post one chunk of rows on the write connection, returns the number of rows posted
+
+    Balances are read and written inside the caller's BEGIN IMMEDIATE transaction, so no other writer can change
+    them in between and the computed balances can be written back directly.
+    """
+    acc_nos = set()
+    for row in rows:
+        if isinstance(row, BatchRow):
+            acc_nos.add(row.acc_no)
+            if row.to_acc_no is not None:
+                acc_nos.add(row.to_acc_no)
+    balances = _load_balances(conn, acc_nos)
+
+    timestamp = str(datetime.now())
+    changed = {}
+    ledger_rows = []
+    failures = []
+
+    for row in rows:
+        if not isinstance(row, BatchRow):
+            # (line_no, reason) left by the validation step
+            failures.append((batch_id, *row))
+            continue
+
+        if row.acc_no not in balances:
+            failures.append((batch_id, row.line_no, "Account not found"))
+            continue
+        if row.to_acc_no is not None and row.to_acc_no not in balances:
+            failures.append((batch_id, row.line_no, "Receiver account not found"))
+            continue
+
+        # A credit taking a balance past what SQLite stores would abort the whole chunk
+        credited = row.acc_no if row.operation == "deposit" else row.to_acc_no
+        if credited is not None and balances[credited] + row.amount > MAX_INTEGER:
+            failures.append((batch_id, row.line_no, "Balance out of range"))
+            continue
+
+        prev_bal = balances[row.acc_no]
+        if row.operation == "deposit":
+            avail_bal = prev_bal + row.amount
+            ledger_rows.append(
+                (row.acc_no, timestamp, "Cr", prev_bal, row.amount, avail_bal)
+                + (row.details, operator)
+            )
+        else:
+            if prev_bal < row.amount:
+                failures.append((batch_id, row.line_no, "Insufficient balance"))
+                continue
+            avail_bal = prev_bal - row.amount
+            details = row.details
+            if row.operation == "transfer" and not details:
+                details = f"Transferred to {row.to_acc_no}"
+            ledger_rows.append(
+                (row.acc_no, timestamp, "Db", prev_bal, row.amount, avail_bal)
+                + (details, operator)
+            )
+        balances[row.acc_no] = changed[row.acc_no] = avail_bal
+
+        if row.operation == "transfer":
+            prev_bal = balances[row.to_acc_no]
+            avail_bal = prev_bal + row.amount
+            details = row.details or f"Transferred from {row.acc_no}"
+            ledger_rows.append(
+                (row.to_acc_no, timestamp, "Cr", prev_bal, row.amount, avail_bal)
+                + (details, operator)
+            )
+            balances[row.to_acc_no] = changed[row.to_acc_no] = avail_bal
+
+    conn.executemany(queries.INSERT_TRANSACTION, ledger_rows)
+    conn.executemany(
+        queries.SET_BALANCE, ((bal, acc_no) for acc_no, bal in changed.items())
+    )
+    conn.executemany(queries.INSERT_BATCH_FAILURE, failures)
+
+    return len(rows) - len(failures)
+
+
+def _read_chunks(csv_path: str, skip: int, chunk_size: int):
+    """Yield lists of validated rows (BatchRow or (line_no, reason)) after skipping the first `skip` records"""
+    with open(csv_path, newline="", encoding="utf-8-sig") as file:
+        reader = csv.DictReader(file)
+        records = enumerate(reader, start=2)  # line 1 is the header
+        for _ in islice(records, skip):
+            pass
+
+        while True:
+            chunk = []
+            for line_no, record in islice(records, chunk_size):
+                row, reason = parse_row(line_no, record)
+                chunk.append(row if row is not None else (line_no, reason))
+            if not chunk:
+                return
+            yield chunk
+
+
+###############################   Batch posting   #############################
+def post_batch(
+    db: ConnectionManager,
+    csv_path: str,
+    operator: int,
+    chunk_size: int = BATCH_CHUNK_SIZE,
+    progress=None,
+) -> dict:
+    """
+    Post every row of a batch file, resuming after the last committed chunk
+
+    Parameters
+    ----------
+    db : ConnectionManager
+        Connection manager of an initialised database.
+    csv_path : str
+        Path of the batch CSV file.
+    operator : int
+        Account number of the Admin/SWO the postings are made by.
+    chunk_size : int, optional
+        Number of rows committed per transaction. The default is BATCH_CHUNK_SIZE.
+    progress : callable, optional
+        Called with a status message after every committed chunk.
+
+    Returns
+    -------
+    dict
+        batch_id, rows (records processed), posted, resumed_from, already_posted and failures as a list of
+        (line_no, reason).
+
+    Raises
+    ------
+    ValueError
+        If the operator is not an Admin or SWO account.
+
+    """
+    with db.reader() as conn:
+        ret = conn.execute(queries.ACCOUNT_ROLE, (operator,)).fetchone()
+    if ret is None or ret[0] not in ["A", "S"]:
+        raise ValueError("Operator should be an Admin or SWO account")
+
+    batch_id = file_digest(csv_path)
+    now = str(datetime.now())
+    with db.writer() as conn:
+        params = (batch_id, os.path.basename(csv_path), operator, now, now)
+        conn.execute(queries.INSERT_BATCH_RUN, params)
+        query = queries.BATCH_RUN_STATE
+        rows_done, completed = conn.execute(query, (batch_id,)).fetchone()
+
+    already_posted = bool(completed)
+    resumed_from = rows_done
+    if not completed:
+        if rows_done and progress:
+            progress(f"Resuming batch after {rows_done} rows")
+
+        for chunk in _read_chunks(csv_path, rows_done, chunk_size):
+            with db.writer() as conn:
+                posted = _apply_chunk(conn, batch_id, chunk, operator)
+                rows_done += len(chunk)
+                params = (rows_done, posted, str(datetime.now()), batch_id)
+                conn.execute(queries.BATCH_RUN_PROGRESS, params)
+            if progress:
+                progress(f"{rows_done} rows committed")
+
+        with db.writer() as conn:
+            params = (str(datetime.now()), batch_id)
+            conn.execute(queries.BATCH_RUN_COMPLETED, params)
+
+    with db.reader() as conn:
+        query = queries.BATCH_RUN_RESULT
+        rows_done, posted = conn.execute(query, (batch_id,)).fetchone()
+        failures = conn.execute(queries.BATCH_FAILURES, (batch_id,)).fetchall()
+
+    return {
+        "batch_id": batch_id,
+        "rows": rows_done,
+        "posted": posted,
+        "resumed_from": resumed_from,
+        "already_posted": already_posted,
+        "failures": failures,
+    }
+
+
+def print_report(result: dict):
+    """Print the outcome of post_batch"""
+    print(f"Batch {result['batch_id'][:12]}")
+    if result["already_posted"]:
+        print("This file was already posted, nothing new was applied")
+    elif result["resumed_from"]:
+        print(f"Resumed after row {result['resumed_from']}")
+    print(f"Rows: {result['rows']}  Posted: {result['posted']}", end="  ")
+    print(f"Failed: {len(result['failures'])}")
+    for line_no, reason in result["failures"]:
+        print(f"    Line {line_no}: {reason}")
@@ -0,0 +1,400 @@
+"""
+    Project Name:       Mo Bank (A dummy banking system)
+    Module:             benchmark
+    Purpose:            Performance benchmarks of the ledger
+    Description:
+        Builds a seeded Mo Bank database of the requested size and times the operations the app performs most often:
+        login lookup, account fetch (from the database and from the account cache), the login query with its values
+        formatted into the SQL and bound from the query catalogue (the parse and plan cost the statement cache
+        saves), the former OR login query, a 30 day statement, an operator's daily totals, a transfer posting and
+        PDF statement generation.
+        Latencies are reported as p50/p95/p99 in milliseconds and can be written as JSON, to size hardware and to
+        compare runs before and after a schema change.
+
+        Datasets are cached in the data directory by size and seed, so later runs with the same arguments reuse
+        them (the transfer benchmark adds a few postings to the cached database on every run):
+            python benchmark.py --preset small
+            python benchmark.py --accounts 50000 --transactions 2000000 --json results.json
+"""
+
+################################   Libraries   ################################
+import argparse
+from collections import namedtuple
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+import io
+import json
+import os
+import platform
+import random
+import sqlite3 as sql
+import statistics
+import sys
+import tempfile
+import time
+
+from database import ConnectionManager, create_schema
+import datagen
+import ledger
+from money import Money
+import queries
+from report import write_report
+from service import BankService, encrypt_password
+
+
+#############################   Global variables   ############################
+# (accounts, transactions) of the predefined dataset sizes
+PRESETS = {
+    "tiny": (1_000, 50_000),
+    "small": (10_000, 1_000_000),
+    "medium": (100_000, 10_000_000),
+    "large": (1_000_000, 50_000_000),
+    # Many accounts with few transactions each, for the account lookups
+    "wide": (1_000_000, 2_000_000),
+}
+
+DEFAULT_DATA_DIR = os.path.join(tempfile.gettempdir(), "mobank_bench")
+DEFAULT_SEED = 2019
+DATA_YEARS = 1
+FIRST_ACC_NO = 100002  # 100001 is the Admin created by create_schema
+STATEMENT_DAYS = 30
+HOT_ACCOUNTS = 20  # accounts of the cached account fetch benchmark
+
+# Login query of the app before LoginIdentifiers, timed against it by login_or_sql
+OR_LOGIN_QUERY = """SELECT * FROM AccountDetails WHERE (email = ? OR mobile = ?) AND password = ?
+LIMIT 1;"""
+
+Dataset = namedtuple(
+    "Dataset", ["first_acc_no", "last_acc_no", "operators", "start_date", "end_date"]
+)
+
+
+#############################   Benchmark datasets   ###########################
+def dataset_path(data_dir: str, accounts: int, transactions: int, seed: int) -> str:
+    return os.path.join(data_dir, f"bench_{accounts}_{transactions}_{seed}.db")
+
+
+def open_dataset(
+    data_dir: str,
+    accounts: int,
+    transactions: int,
+    seed: int = DEFAULT_SEED,
+    workers: int = None,
+    progress=print,
+) -> tuple:
+    """
+    Path of the cached dataset, building it first if needed
+
+    Returns
+    -------
+    tuple
+        (path, build time in seconds or None when the cached database was reused)
+
+    """
+    path = dataset_path(data_dir, accounts, transactions, seed)
+    if os.path.exists(path):
+        return path, None
+
+    os.makedirs(data_dir, exist_ok=True)
+    partial_path = path + ".part"
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(partial_path + suffix):
+            os.remove(partial_path + suffix)
+
+    progress(f"Building {accounts} accounts / {transactions} transactions")
+    started = time.perf_counter()
+    # The Admin created by create_schema counts as one of the accounts
+    datagen.generate(
+        partial_path,
+        accounts - 1,
+        transactions,
+        years=DATA_YEARS,
+        seed=seed,
+        workers=workers,
+        progress=progress,
+    )
+    os.replace(partial_path, path)
+    return path, time.perf_counter() - started
+
+
+def load_dataset(db: ConnectionManager) -> Dataset:
+    with db.reader() as conn:
+        last_acc_no = conn.execute("SELECT max(acc_no) FROM AccountDetails;")
+        last_acc_no = last_acc_no.fetchone()[0]
+        query = "SELECT acc_no FROM AccountDetails WHERE user_type IN ('A', 'S');"
+        operators = [row[0] for row in conn.execute(query)]
+
+        # Period covered by the ledger, each lookup is a seek on the (operator, timestamp) index
+        query = "SELECT min(timestamp), max(timestamp) FROM Transactions WHERE operator = ?;"
+        periods = [conn.execute(query, (acc_no,)).fetchone() for acc_no in operators]
+        start = min(period[0] for period in periods if period[0])
+        end = max(period[1] for period in periods if period[1])
+
+    return Dataset(
+        FIRST_ACC_NO,
+        last_acc_no,
+        operators,
+        datetime.fromisoformat(start).date(),
+        datetime.fromisoformat(end).date(),
+    )
+
+
+################################   Benchmarks   ###############################
+# Every benchmark prepares its inputs and returns the call to be timed
+
+
+def bench_login(bank: BankService, data: Dataset, rng: random.Random):
+    acc_no = rng.randint(data.first_acc_no, data.last_acc_no)
+    user_info = (
+        datagen.mobile_of(acc_no) if rng.random() < 0.5 else datagen.email_of(acc_no)
+    )
+
+    def run():
+        if bank.login(user_info, datagen.DEFAULT_PASSWORD) is None:
+            raise RuntimeError(f"Login failed for {user_info}")
+
+    return run
+
+
+def bench_account_fetch(bank: BankService, data: Dataset, rng: random.Random):
+    acc_no = rng.randint(data.first_acc_no, data.last_acc_no)
+    bank.accounts.invalidate(acc_no)  # time the database lookup
+    return lambda: bank.get_account(acc_no)
+
+
+def bench_account_fetch_cached(bank: BankService, data: Dataset, rng: random.Random):
+    # A counter looks the same few accounts up again and again
+    acc_no = data.first_acc_no + rng.randrange(HOT_ACCOUNTS)
+    return lambda: bank.get_account(acc_no)
+
+
+def bench_login_sql_literal(bank: BankService, data: Dataset, rng: random.Random):
+    # The login lookup with its value formatted into the SQL, the text is new on every call so SQLite compiles it
+    user_info = datagen.mobile_of(rng.randint(data.first_acc_no, data.last_acc_no))
+    query = queries.ACCOUNTS_BY_LOGIN.replace("?", f"'{user_info}'")
+
+    def run():
+        with bank.db.reader() as conn:
+            conn.execute(query).fetchall()
+
+    return run
+
+
+def bench_login_sql_bound(bank: BankService, data: Dataset, rng: random.Random):
+    # The same lookup through the catalogue, compiled once per connection and then reused from the statement cache
+    user_info = datagen.mobile_of(rng.randint(data.first_acc_no, data.last_acc_no))
+
+    def run():
+        with bank.db.reader() as conn:
+            conn.execute(queries.ACCOUNTS_BY_LOGIN, (user_info,)).fetchall()
+
+    return run
+
+
+def bench_login_or_sql(bank: BankService, data: Dataset, rng: random.Random):
+    # The login query replaced by the LoginIdentifiers lookup: an OR over the email and mobile indexes
+    user_info = datagen.mobile_of(rng.randint(data.first_acc_no, data.last_acc_no))
+    params = (user_info, user_info, encrypt_password(datagen.DEFAULT_PASSWORD))
+
+    def run():
+        with bank.db.reader() as conn:
+            conn.execute(OR_LOGIN_QUERY, params).fetchone()
+
+    return run
+
+
+def bench_statement(bank: BankService, data: Dataset, rng: random.Random):
+    acc_no = rng.randint(data.first_acc_no, data.last_acc_no)
+    from_date = data.end_date - timedelta(days=STATEMENT_DAYS)
+    return lambda: bank.statement(acc_no, from_date, data.end_date)
+
+
+def bench_operator_totals(bank: BankService, data: Dataset, rng: random.Random):
+    operator = rng.choice(data.operators)
+    day = data.start_date + timedelta(
+        days=rng.randint(0, (data.end_date - data.start_date).days)
+    )
+    return lambda: bank.operator_totals(operator, day, day)
+
+
+def bench_transfer(bank: BankService, data: Dataset, rng: random.Random):
+    operator = rng.choice(data.operators)
+    sender, receiver = operator, operator
+    while operator in (sender, receiver):
+        sender, receiver = rng.sample(range(data.first_acc_no, data.last_acc_no + 1), 2)
+
+    def run():
+        try:
+            bank.transfer(sender, receiver, Money(100), operator)
+        except ledger.InsufficientBalance:
+            pass
+
+    return run
+
+
+def bench_pdf_report(bank: BankService, data: Dataset, rng: random.Random):
+    acc_no = rng.randint(data.first_acc_no, data.last_acc_no)
+    from_date = data.end_date - timedelta(days=STATEMENT_DAYS)
+    user_data = bank.get_account(acc_no)
+    trans_data = bank.statement(acc_no, from_date, data.end_date)
+    from_date, to_date = str(from_date), str(data.end_date)
+    return lambda: write_report(io.BytesIO(), user_data, trans_data, from_date, to_date)
+
+
+BENCHMARKS = {
+    "login": bench_login,
+    "account_fetch": bench_account_fetch,
+    "account_fetch_cached": bench_account_fetch_cached,
+    "login_sql_literal": bench_login_sql_literal,
+    "login_sql_bound": bench_login_sql_bound,
+    "login_or_sql": bench_login_or_sql,
+    "statement_30d": bench_statement,
+    "operator_daily_totals": bench_operator_totals,
+    "transfer": bench_transfer,
+    "pdf_report": bench_pdf_report,
+}
+
+
+def summarize(samples: list) -> dict:
+    """Latency statistics in milliseconds of a list of timings in seconds"""
+    samples = sorted(sample * 1000 for sample in samples)
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return {
+        "count": len(samples),
+        "mean_ms": statistics.fmean(samples),
+        "min_ms": samples[0],
+        "p50_ms": cuts[49],
+        "p95_ms": cuts[94],
+        "p99_ms": cuts[98],
+        "max_ms": samples[-1],
+    }
+
+
+def run_benchmarks(
+    db: ConnectionManager, names, iterations: int, warmup: int, seed: int
+) -> dict:
+    """Run the named benchmarks, returns their latency statistics by name"""
+    bank = BankService(db)
+    data = load_dataset(db)
+    results = {}
+    for name in names:
+        rng = random.Random(f"{seed}-{name}")
+        samples = []
+        for i in range(warmup + iterations):
+            run = BENCHMARKS[name](bank, data, rng)
+            started = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - started
+            if i >= warmup:
+                samples.append(elapsed)
+        results[name] = summarize(samples)
+    return results
+
+
+def machine_info() -> dict:
+    return {
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "sqlite": sql.sqlite_version,
+    }
+
+
+def print_results(results: dict):
+    print(f"{'Benchmark':<24}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, stats in results.items():
+        print(
+            f"{name:<24}{stats['p50_ms']:>10.3f}{stats['p95_ms']:>10.3f}"
+            f"{stats['p99_ms']:>10.3f}{stats['max_ms']:>10.3f}"
+        )
+
+
+###############################   Main Program   ##############################
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Mo Bank performance benchmarks")
+    parser.add_argument(
+        "--preset",
+        choices=PRESETS,
+        default="small",
+        help="Dataset size, accounts/transactions: "
+        + ", ".join(f"{k} {a}/{t}" for k, (a, t) in PRESETS.items()),
+    )
+    parser.add_argument("--accounts", type=int, help="Overrides the preset")
+    parser.add_argument("--transactions", type=int, help="Overrides the preset")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR)
+    parser.add_argument(
+        "--workers", type=int, help="Dataset generator processes (default CPUs)"
+    )
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument(
+        "--only",
+        nargs="+",
+        choices=BENCHMARKS,
+        default=list(BENCHMARKS),
+        metavar="NAME",
+        help="Benchmarks to run: " + ", ".join(BENCHMARKS),
+    )
+    parser.add_argument(
+        "--json", metavar="FILE", help="Write the results as JSON ('-' for stdout)"
+    )
+    args = parser.parse_args(argv)
+
+    if args.iterations < 2:
+        parser.error("--iterations should be at least 2")
+    accounts, transactions = PRESETS[args.preset]
+    args.accounts = args.accounts or accounts
+    args.transactions = args.transactions or transactions
+    return args
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+
+    # Keep the progress messages out of the JSON written to stdout
+    with redirect_stdout(sys.stderr if args.json == "-" else sys.stdout):
+        db_path, build_seconds = open_dataset(
+            args.data_dir, args.accounts, args.transactions, args.seed, args.workers
+        )
+        print(f"Dataset {db_path}")
+
+        db = ConnectionManager(db_path)
+        try:
+            create_schema(db)  # bring datasets from older versions up to date
+            results = run_benchmarks(
+                db, args.only, args.iterations, args.warmup, args.seed
+            )
+        finally:
+            db.close()
+
+    if args.json != "-":
+        print_results(results)
+    if args.json:
+        report = {
+            "created_at": str(datetime.now()),
+            "machine": machine_info(),
+            "dataset": {
+                "path": db_path,
+                "accounts": args.accounts,
+                "transactions": args.transactions,
+                "seed": args.seed,
+                "size_bytes": os.path.getsize(db_path),
+                "build_seconds": build_seconds,
+            },
+            "iterations": args.iterations,
+            "warmup": args.warmup,
+            "results": results,
+        }
+        if args.json == "-":
+            json.dump(report, sys.stdout, indent=2)
+            print()
+        else:
+            with open(args.json, "w") as file:
+                json.dump(report, file, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
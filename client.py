@@ -0,0 +1,353 @@
+"""
+    Project Name:       Mo Bank (A dummy banking system)
+    Module:             client
+    Purpose:            Client of the ledger server
+    Description:
+        RemoteBank has the methods of service.BankService the app uses and runs each of them on a ledger server
+        (server.py) instead of on a local database, so every counter started with --server shares the one server:
+            python main.py --server 127.0.0.1:7219
+
+        Requests refused by the server raise the same ServiceError and ledger.PostingError subclasses as the local
+        service. A server that can't be reached raises ServerUnavailable, a ServiceError, so the pages report it like
+        any refused request. RemoteBank is thread safe: each call borrows a connection of its own from a small pool,
+        so the background lookups and the GUI thread don't wait on each other.
+"""
+
+################################   Libraries   ################################
+import itertools
+import json
+import socket
+import threading
+
+import ledger
+from money import Money
+from server import (
+    DEFAULT_ADDRESS,
+    MAX_PAGE_SIZE,
+    LedgerServer,
+    NotAllowed,
+    NotAuthenticated,
+    encode_message,
+    parse_address,
+)
+from service import BankService, ServiceError, day_range, timestamp_bounds
+
+
+#############################   Global variables   ############################
+CONNECT_TIMEOUT = 5  # seconds
+REPLY_TIMEOUT = 60  # seconds, a posting may queue behind many others
+IDLE_CONNECTIONS = 4  # connections kept open for the next calls
+
+
+###############################   Exceptions   ################################
+class ServerUnavailable(ServiceError):
+    """The ledger server could not be reached or dropped the connection"""
+
+
+#############################   Helper functions   ############################
+def remote_error(details: dict) -> Exception:
+    """Exception matching the error of a reply"""
+    kind = details.get("type")
+    message = details.get("message", "")
+    if kind == "InvalidAmount":
+        return ledger.InvalidAmount(Money(details["arg"]))
+    if kind == "AccountNotFound":
+        return ledger.AccountNotFound(details["arg"])
+    if kind == "InsufficientBalance":
+        return ledger.InsufficientBalance(details["arg"])
+    if kind == "PostingError":
+        return ledger.PostingError(message)
+    if kind == "NotAuthenticated":
+        return NotAuthenticated(message)
+    if kind == "NotAllowed":
+        return NotAllowed(message)
+    if kind == "ServiceError":
+        return ServiceError(message)
+    return ServiceError(f"Ledger server error: {message}")
+
+
+def _row(row):
+    return None if row is None else tuple(row)
+
+
+#############################   Server connection   ###########################
+class _Connection:
+    """One socket to the server, carrying one request at a time"""
+
+    def __init__(self, family: str, location):
+        if family == "unix":
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(CONNECT_TIMEOUT)
+            try:
+                sock.connect(location)
+            except OSError:
+                sock.close()
+                raise
+        else:
+            sock = socket.create_connection(location, timeout=CONNECT_TIMEOUT)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.settimeout(REPLY_TIMEOUT)
+        self.sock = sock
+        self.file = sock.makefile("rb")
+
+    def request(self, message: dict) -> dict:
+        self.sock.sendall(encode_message(message))
+        line = self.file.readline()
+        if not line:
+            raise ConnectionError("connection closed by the server")
+        return json.loads(line)
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
+
+
+################################   Remote bank   ##############################
+class RemoteCursor:
+    """TransactionCursor reading its pages from the ledger server"""
+
+    def __init__(self, bank: "RemoteBank", column: str, key: int, bounds: tuple):
+        self.bank = bank
+        self.exhausted = False
+        self._column = column
+        self._key = key
+        self._bounds = bounds
+        self._last = (bounds[0], 0)
+
+    def fetchmany(self, size: int) -> list:
+        rows = []
+        while not self.exhausted and len(rows) < size:
+            wanted = min(size - len(rows), MAX_PAGE_SIZE)
+            page = self.bank.call(
+                "transaction_page",
+                column=self._column,
+                key=self._key,
+                bounds=self._bounds,
+                after=self._last,
+                size=wanted,
+            )
+            if len(page) < wanted:
+                self.exhausted = True
+            if page:
+                self._last = (page[-1][2], page[-1][0])
+            rows.extend(tuple(row) for row in page)
+        return rows
+
+    def fetchall(self, page_size: int = 1000) -> list:
+        rows = []
+        while not self.exhausted:
+            rows.extend(self.fetchmany(page_size))
+        return rows
+
+
+class RemoteBank:
+    """
+    Banking operations run on a ledger server, with the interface of service.BankService
+
+    The session opened by login() is used for every later call until logout(). Account rows come without their
+    password hash.
+
+    Parameters
+    ----------
+    address : str, optional
+        host:port or unix:/path of the server. The default is server.DEFAULT_ADDRESS.
+
+    """
+
+    transaction_totals = staticmethod(BankService.transaction_totals)
+
+    def __init__(self, address: str = DEFAULT_ADDRESS):
+        self.address = address
+        self.token = None
+        self._family, self._location = parse_address(address)
+        self._ids = itertools.count(1)
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def call(self, op: str, **args):
+        """Run an operation on the server and return its result"""
+        with self._lock:
+            request_id = next(self._ids)
+            conn = self._idle.pop() if self._idle else None
+        request = {"id": request_id, "op": op, "token": self.token, "args": args}
+        pooled = conn is not None
+
+        try:
+            try:
+                if conn is None:
+                    conn = _Connection(self._family, self._location)
+                reply = conn.request(request)
+            except ConnectionError:
+                # A pooled connection may have been closed by a server restart. Reads are run again on a new one,
+                # a posting is not, as it may have been applied before the connection dropped.
+                if not pooled or LedgerServer.OPERATIONS.get(op, (None, True))[1]:
+                    raise
+                conn.close()
+                conn = None
+                conn = _Connection(self._family, self._location)
+                reply = conn.request(request)
+        except (OSError, ValueError) as err:
+            if conn is not None:
+                conn.close()
+            raise ServerUnavailable(
+                f"Ledger server {self.address} is not available ({err})"
+            ) from None
+
+        with self._lock:
+            if len(self._idle) < IDLE_CONNECTIONS:
+                self._idle.append(conn)
+                conn = None
+        if conn is not None:
+            conn.close()
+
+        if "error" in reply:
+            raise remote_error(reply["error"])
+        return reply["result"]
+
+    def close(self):
+        """Close the pooled connections"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+    ##############################   Accounts   ###############################
+    def get_account(self, acc_no: int):
+        return _row(self.call("get_account", acc_no=acc_no))
+
+    def get_session(self, acc_no: int):
+        return self.call("get_session", acc_no=acc_no)
+
+    def login(self, user_info: str, password: str):
+        reply = self.call("login", user_info=user_info, password=password)
+        if reply is None:
+            return None
+        self.token = reply["token"]
+        return reply["session"]
+
+    def logout(self):
+        if self.token is None:
+            return
+        try:
+            self.call("logout")
+        except ServiceError:
+            pass  # the session already expired or the server is gone
+        finally:
+            self.token = None
+
+    def get_employee(self, acc_no: int):
+        return _row(self.call("get_employee", acc_no=acc_no))
+
+    def open_account(
+        self,
+        full_name: str,
+        email: str,
+        mobile: str,
+        gender: str,
+        dob: str,
+        acc_type: str,
+        opening_balance: Money,
+        password: str,
+        operator: int,
+    ) -> int:
+        return self.call(
+            "open_account",
+            full_name=full_name,
+            email=email,
+            mobile=mobile,
+            gender=gender,
+            dob=dob,
+            acc_type=acc_type,
+            opening_balance=opening_balance.paise,
+            password=password,
+            operator=operator,
+        )
+
+    def update_kyc(
+        self,
+        acc_no: int,
+        full_name: str,
+        email: str,
+        mobile: str,
+        gender: str,
+        dob: str,
+        acc_type: str,
+        user_type: str,
+        password: str,
+    ):
+        self.call(
+            "update_kyc",
+            acc_no=acc_no,
+            full_name=full_name,
+            email=email,
+            mobile=mobile,
+            gender=gender,
+            dob=dob,
+            acc_type=acc_type,
+            user_type=user_type,
+            password=password,
+        )
+
+    ##############################   Postings   ###############################
+    def self_withdraw(self, acc_no: int, amount: Money) -> Money:
+        return Money(self.call("self_withdraw", acc_no=acc_no, amount=amount.paise))
+
+    def deposit(self, acc_no: int, amount: Money, operator: int) -> Money:
+        paise = self.call(
+            "deposit", acc_no=acc_no, amount=amount.paise, operator=operator
+        )
+        return Money(paise)
+
+    def withdraw(self, acc_no: int, amount: Money, operator: int) -> Money:
+        paise = self.call(
+            "withdraw", acc_no=acc_no, amount=amount.paise, operator=operator
+        )
+        return Money(paise)
+
+    def transfer(
+        self, sender_acc_no: int, receiver_acc_no: int, amount: Money, operator: int
+    ) -> Money:
+        paise = self.call(
+            "transfer",
+            sender_acc_no=sender_acc_no,
+            receiver_acc_no=receiver_acc_no,
+            amount=amount.paise,
+            operator=operator,
+        )
+        return Money(paise)
+
+    #############################   Statements   ##############################
+    def statement(self, acc_no: int, from_date, to_date) -> list:
+        return self.statement_cursor(acc_no, from_date, to_date).fetchall()
+
+    def operator_transactions(self, operator: int, from_date, to_date) -> list:
+        return self.operator_cursor(operator, from_date, to_date).fetchall()
+
+    def statement_cursor(self, acc_no: int, from_date, to_date) -> RemoteCursor:
+        bounds = timestamp_bounds(*day_range(from_date, to_date))
+        return RemoteCursor(self, "acc_no", acc_no, bounds)
+
+    def operator_cursor(self, operator: int, from_date, to_date) -> RemoteCursor:
+        bounds = timestamp_bounds(*day_range(from_date, to_date))
+        return RemoteCursor(self, "operator", operator, bounds)
+
+    def operator_totals(self, operator: int, from_date, to_date) -> tuple:
+        totals = self.call(
+            "operator_totals",
+            operator=operator,
+            from_date=str(from_date),
+            to_date=str(to_date),
+        )
+        return tuple(totals)
+
+    def balance_as_of(self, acc_no: int, day) -> Money:
+        return Money(self.call("balance_as_of", acc_no=acc_no, day=str(day)))
+
+    def statement_balances(self, acc_no: int, from_date, to_date) -> tuple:
+        balances = self.call(
+            "statement_balances",
+            acc_no=acc_no,
+            from_date=str(from_date),
+            to_date=str(to_date),
+        )
+        return tuple(Money(balance) for balance in balances)
@@ -0,0 +1,412 @@
+"""
+    Project Name:       Mo Bank (A dummy banking system)
+    Module:             database
+    Purpose:            Connection management for the Mo Bank SQLite database
+    Description:
+        Opening a new SQLite connection for every query means the file is opened, the schema is parsed and the page
+        cache starts cold on each click. The ConnectionManager keeps one long-lived write connection and a small pool
+        of read connections per process, all configured with WAL journal mode and tuned pragmas. Handlers borrow a
+        connection through the reader() and writer() context managers. The module also owns the database schema and
+        its migrations (create_schema).
+"""
+
+################################   Libraries   ################################
+from contextlib import contextmanager
+import queue
+import sqlite3 as sql
+import threading
+
+from querystats import InstrumentedConnection
+
+
+#############################   Global variables   ############################
+READ_POOL_SIZE = 4
+
+# Largest INTEGER SQLite stores, account numbers and amounts in paise beyond it can't be written
+MAX_INTEGER = 2**63 - 1
+
+# Compiled statements kept per connection, well above the number in queries.py so the catalogue always stays cached
+STATEMENT_CACHE_SIZE = 256
+
+# Pragmas applied to every connection opened by the manager
+CONNECTION_PRAGMAS = (
+    "PRAGMA synchronous = NORMAL;",  # safe with WAL, avoids an fsync per commit
+    "PRAGMA cache_size = -16000;",  # 16 MB page cache per connection
+    "PRAGMA mmap_size = 268435456;",  # 256 MB memory mapped I/O
+    "PRAGMA temp_store = MEMORY;",
+    "PRAGMA busy_timeout = 5000;",
+)
+
+# Keeps the closing balance of the day of every new ledger row in DailyBalances, inside the posting transaction
+DAILY_BALANCES_TRIGGER = """CREATE TRIGGER IF NOT EXISTS trg_daily_balances AFTER INSERT ON Transactions
+BEGIN
+    INSERT INTO DailyBalances(acc_no, day, closing_bal, last_timestamp, last_txn_id)
+    VALUES(NEW.acc_no, substr(NEW.timestamp, 1, 10), NEW.avail_bal, NEW.timestamp, NEW.txn_id)
+    ON CONFLICT(acc_no, day) DO UPDATE SET closing_bal = excluded.closing_bal,
+    last_timestamp = excluded.last_timestamp, last_txn_id = excluded.last_txn_id
+    WHERE (excluded.last_timestamp, excluded.last_txn_id)
+    > (DailyBalances.last_timestamp, DailyBalances.last_txn_id);
+END;"""
+
+
+def rebuild_daily_balances(conn, from_acc_no: int = 0):
+    """
+    Recompute the DailyBalances rows of the accounts numbered from from_acc_no out of the ledger
+
+    The closing balance of a day is the avail_bal of the last transaction of that day, in (timestamp, txn_id)
+    order. Runs on the connection given, inside its current transaction if any.
+    """
+    conn.execute("DELETE FROM DailyBalances WHERE acc_no >= ?;", (from_acc_no,))
+    query = """INSERT INTO DailyBalances(acc_no, day, closing_bal, last_timestamp, last_txn_id)
+    SELECT acc_no, day, avail_bal, timestamp, txn_id FROM (
+        SELECT acc_no, substr(timestamp, 1, 10) AS day, avail_bal, timestamp, txn_id, row_number() OVER (
+        PARTITION BY acc_no, substr(timestamp, 1, 10) ORDER BY timestamp DESC, txn_id DESC) AS position
+        FROM Transactions WHERE acc_no >= ?)
+    WHERE position = 1;"""
+    conn.execute(query, (from_acc_no,))
+
+
+# Adds every new ledger row to the totals of its operator and day, inside the posting transaction
+OPERATOR_TOTALS_TRIGGER = """CREATE TRIGGER IF NOT EXISTS trg_operator_totals AFTER INSERT ON Transactions
+WHEN NEW.operator IS NOT NULL
+BEGIN
+    INSERT INTO OperatorDailyTotals(operator, day, cr_total, db_total, txn_count)
+    VALUES(NEW.operator, substr(NEW.timestamp, 1, 10),
+    CASE NEW.operation WHEN 'Cr' THEN NEW.trans_amount ELSE 0 END,
+    CASE NEW.operation WHEN 'Db' THEN NEW.trans_amount ELSE 0 END, 1)
+    ON CONFLICT(operator, day) DO UPDATE SET cr_total = cr_total + excluded.cr_total,
+    db_total = db_total + excluded.db_total, txn_count = txn_count + 1;
+END;"""
+
+# Adds the ledger rows of a table with the Transactions columns (schema.Transactions) to OperatorDailyTotals
+OPERATOR_TOTALS_ADD = """INSERT INTO OperatorDailyTotals(operator, day, cr_total, db_total, txn_count)
+SELECT operator, substr(timestamp, 1, 10), sum(CASE operation WHEN 'Cr' THEN trans_amount ELSE 0 END),
+sum(CASE operation WHEN 'Db' THEN trans_amount ELSE 0 END), count(*) FROM {table} WHERE operator IS NOT NULL
+GROUP BY operator, substr(timestamp, 1, 10)
+ON CONFLICT(operator, day) DO UPDATE SET cr_total = cr_total + excluded.cr_total,
+db_total = db_total + excluded.db_total, txn_count = txn_count + excluded.txn_count;"""
+
+
+def rebuild_operator_totals(conn):
+    """Recompute OperatorDailyTotals out of the whole ledger, inside the current transaction if any"""
+    conn.execute("DELETE FROM OperatorDailyTotals;")
+    conn.execute(OPERATOR_TOTALS_ADD.format(table="Transactions"))
+
+
+# Login identifiers as they are looked up: emails in lower case, mobile numbers without a leading +
+# (service.login_identifier does the same to what the user typed)
+LOGIN_EMAIL = "lower(trim({row}.email))"
+LOGIN_MOBILE = "ltrim(trim({row}.mobile), '+')"
+
+# Keep LoginIdentifiers in step with the email and mobile of every account
+LOGIN_IDENTIFIERS_TRIGGERS = [
+    f"""CREATE TRIGGER IF NOT EXISTS trg_login_ids_insert AFTER INSERT ON AccountDetails
+BEGIN
+    INSERT OR IGNORE INTO LoginIdentifiers(identifier, acc_no)
+    VALUES({LOGIN_EMAIL.format(row="NEW")}, NEW.acc_no), ({LOGIN_MOBILE.format(row="NEW")}, NEW.acc_no);
+END;""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_login_ids_update AFTER UPDATE OF email, mobile ON AccountDetails
+BEGIN
+    DELETE FROM LoginIdentifiers WHERE acc_no = OLD.acc_no
+    AND identifier IN ({LOGIN_EMAIL.format(row="OLD")}, {LOGIN_MOBILE.format(row="OLD")});
+    INSERT OR IGNORE INTO LoginIdentifiers(identifier, acc_no)
+    VALUES({LOGIN_EMAIL.format(row="NEW")}, NEW.acc_no), ({LOGIN_MOBILE.format(row="NEW")}, NEW.acc_no);
+END;""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_login_ids_delete AFTER DELETE ON AccountDetails
+BEGIN
+    DELETE FROM LoginIdentifiers WHERE acc_no = OLD.acc_no
+    AND identifier IN ({LOGIN_EMAIL.format(row="OLD")}, {LOGIN_MOBILE.format(row="OLD")});
+END;""",
+]
+
+
+def rebuild_login_identifiers(conn, from_acc_no: int = 0):
+    """Recompute the LoginIdentifiers rows of the accounts numbered from from_acc_no, inside the current transaction"""
+    conn.execute("DELETE FROM LoginIdentifiers WHERE acc_no >= ?;", (from_acc_no,))
+    query = f"""INSERT OR IGNORE INTO LoginIdentifiers(identifier, acc_no)
+    SELECT {LOGIN_EMAIL.format(row="AccountDetails")}, acc_no FROM AccountDetails WHERE acc_no >= ?
+    UNION ALL
+    SELECT {LOGIN_MOBILE.format(row="AccountDetails")}, acc_no FROM AccountDetails WHERE acc_no >= ?
+    ORDER BY 1;"""
+    conn.execute(query, (from_acc_no, from_acc_no))
+
+
+# Schema migrations applied by create_schema on top of the base tables, in order.
+# PRAGMA user_version records how many of them a database has already received.
+# A step is a query or a function called with the write connection.
+SCHEMA_MIGRATIONS = [
+    # 1: Indexes for the statement and operator date range queries
+    [
+        "CREATE INDEX IF NOT EXISTS idx_trans_acc_ts ON Transactions(acc_no, timestamp);",
+        "CREATE INDEX IF NOT EXISTS idx_trans_operator_ts ON Transactions(operator, timestamp);",
+    ],
+    # 2: Balances and ledger amounts are stored as integer paise
+    [
+        "UPDATE AccountDetails SET curr_bal = CAST(ROUND(curr_bal * 100) AS INTEGER);",
+        """UPDATE Transactions SET prev_bal = CAST(ROUND(prev_bal * 100) AS INTEGER), 
+        trans_amount = CAST(ROUND(trans_amount * 100) AS INTEGER), 
+        avail_bal = CAST(ROUND(avail_bal * 100) AS INTEGER);""",
+    ],
+    # 3: Checkpoints and per-row failures of headless batch postings
+    [
+        """CREATE TABLE IF NOT EXISTS BatchRuns(
+        batch_id TEXT PRIMARY KEY, 
+        file_name TEXT, 
+        operator INTEGER, 
+        rows_done INTEGER NOT NULL DEFAULT 0, 
+        posted INTEGER NOT NULL DEFAULT 0, 
+        completed INTEGER NOT NULL DEFAULT 0, 
+        started_at TEXT, 
+        updated_at TEXT);""",
+        """CREATE TABLE IF NOT EXISTS BatchFailures(
+        batch_id TEXT NOT NULL, 
+        line_no INTEGER NOT NULL, 
+        reason TEXT, 
+        PRIMARY KEY (batch_id, line_no));""",
+    ],
+    # 4: Daily closing balance snapshots for balance-as-of-date lookups
+    [
+        """CREATE TABLE IF NOT EXISTS DailyBalances(
+        acc_no INTEGER NOT NULL, 
+        day TEXT NOT NULL, 
+        closing_bal INTEGER NOT NULL, 
+        last_timestamp TEXT NOT NULL, 
+        last_txn_id INTEGER NOT NULL, 
+        PRIMARY KEY (acc_no, day)) WITHOUT ROWID;""",
+        DAILY_BALANCES_TRIGGER,
+        rebuild_daily_balances,
+    ],
+    # 5: Credit/debit totals and number of postings of every operator per day
+    [
+        """CREATE TABLE IF NOT EXISTS OperatorDailyTotals(
+        operator INTEGER NOT NULL, 
+        day TEXT NOT NULL, 
+        cr_total INTEGER NOT NULL DEFAULT 0, 
+        db_total INTEGER NOT NULL DEFAULT 0, 
+        txn_count INTEGER NOT NULL DEFAULT 0, 
+        PRIMARY KEY (operator, day)) WITHOUT ROWID;""",
+        OPERATOR_TOTALS_TRIGGER,
+        rebuild_operator_totals,
+    ],
+    # 6: Email and mobile of every account in one index, so a login is a single seek to the account number.
+    # Keyed by (identifier, acc_no): emails differing only in case stay loginable, as they were before.
+    [
+        """CREATE TABLE IF NOT EXISTS LoginIdentifiers(
+        identifier TEXT NOT NULL, 
+        acc_no INTEGER NOT NULL, 
+        PRIMARY KEY (identifier, acc_no)) WITHOUT ROWID;""",
+        *LOGIN_IDENTIFIERS_TRIGGERS,
+        rebuild_login_identifiers,
+    ],
+]
+
+
+###########################   Connection manager   ############################
+class ConnectionManager:
+    """
+    Keeps one write connection and a pool of read connections to a database
+
+    Parameters
+    ----------
+    db_path : str
+        Path of the SQLite database file.
+    read_pool_size : int, optional
+        Maximum number of read connections kept open. The default is READ_POOL_SIZE.
+    read_only : bool, optional
+        Never open the write connection, writer() raises sqlite3.OperationalError. The default is False.
+    stats : querystats.QueryStats, optional
+        Record the latency of every statement run through the connections. The default records nothing.
+
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        read_pool_size: int = READ_POOL_SIZE,
+        read_only: bool = False,
+        stats=None,
+    ):
+        self.db_path = db_path
+        self.read_pool_size = read_pool_size
+        self.read_only = read_only
+        self.stats = stats
+
+        self._write_conn = None
+        self._write_lock = threading.RLock()
+
+        self._read_pool = queue.LifoQueue()
+        self._read_conns = []
+        self._read_lock = threading.Lock()
+
+    def _connect(self, read_only: bool = False) -> sql.Connection:
+        # Connections are shared across threads, access is serialised by the manager.
+        # The write connection runs in autocommit mode, writer() opens the transactions itself.
+        conn = sql.connect(
+            self.db_path,
+            check_same_thread=False,
+            isolation_level="DEFERRED" if read_only else None,
+            cached_statements=STATEMENT_CACHE_SIZE,
+            factory=sql.Connection if self.stats is None else InstrumentedConnection,
+        )
+        if not read_only:
+            conn.execute("PRAGMA journal_mode = WAL;")
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        if read_only:
+            conn.execute("PRAGMA query_only = ON;")
+        if self.stats is not None:
+            conn.stats = self.stats  # set last, the setup pragmas are not recorded
+        return conn
+
+    def _get_write_conn(self) -> sql.Connection:
+        if self.read_only:
+            raise sql.OperationalError(f"{self.db_path} is opened read only")
+        if self._write_conn is None:
+            self._write_conn = self._connect()
+        return self._write_conn
+
+    def _acquire_reader(self) -> sql.Connection:
+        try:
+            return self._read_pool.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._read_lock:
+            if len(self._read_conns) < self.read_pool_size:
+                # Make sure the database exists and is in WAL mode before readers attach
+                if not self.read_only:
+                    with self._write_lock:
+                        self._get_write_conn()
+                conn = self._connect(read_only=True)
+                self._read_conns.append(conn)
+                return conn
+
+        # Pool is exhausted, wait for a connection to be released
+        return self._read_pool.get()
+
+    @contextmanager
+    def reader(self):
+        """
+        Borrow a read only connection from the pool
+
+        Yields
+        ------
+        sqlite3.Connection
+            Connection which goes back to the pool once the block exits.
+
+        """
+        conn = self._acquire_reader()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._read_pool.put(conn)
+
+    @contextmanager
+    def writer(self):
+        """
+        Borrow the write connection inside a BEGIN IMMEDIATE transaction
+
+        The transaction is committed when the block exits and rolled back on error. A writer() block opened
+        inside another one joins the outer transaction.
+
+        Yields
+        ------
+        sqlite3.Connection
+            The process wide write connection.
+
+        """
+        with self._write_lock:
+            conn = self._get_write_conn()
+            if conn.in_transaction:
+                yield conn
+                return
+
+            conn.execute("BEGIN IMMEDIATE;")
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            else:
+                conn.commit()
+
+    def close(self):
+        """Close every connection held by the manager"""
+        with self._write_lock:
+            if self._write_conn is not None:
+                self._write_conn.close()
+                self._write_conn = None
+
+        with self._read_lock:
+            while True:
+                try:
+                    self._read_pool.get_nowait()
+                except queue.Empty:
+                    break
+            for conn in self._read_conns:
+                conn.close()
+            self._read_conns = []
+
+
+###############################   Schema setup   ##############################
+def create_schema(db: ConnectionManager):
+    """Create the tables if they don't exist and bring the database up to the current schema version"""
+    # Check or Create Database, create tables if doesn't exist
+    with db.writer() as conn:
+        try:
+            query = "SELECT * FROM AccountDetails LIMIT 1;"
+            conn.execute(query)
+        except sql.OperationalError:
+            query = """CREATE TABLE IF NOT EXISTS AccountDetails( 
+            acc_no INTEGER PRIMARY KEY AUTOINCREMENT, 
+            acc_type TEXT DEFAULT "C", 
+            full_name TEXT NOT NULL, 
+            email TEXT NOT NULL UNIQUE, 
+            mobile TEXT NOT NULL UNIQUE, 
+            gender TEXT DEFAULT "O", 
+            dob TEXT, 
+            password TEXT NOT NULL, 
+            user_type TEXT NOT NULL DEFAULT "Holder", 
+            curr_bal NUMERIC NOT NULL);"""
+            conn.execute(query)
+            query = """INSERT INTO AccountDetails VALUES(100001, "C", "Admin", "admin@mobank.xy", "9999999999", "M", 
+            "2024-01-01", "e20f517179e9cd52ae29dae43c121b95", "A", 100000.0);"""  # password - Hello@123
+            conn.execute(query)
+            print("Table AccountDetails created")
+
+    with db.writer() as conn:
+        try:
+            query = "SELECT * FROM Transactions LIMIT 1;"
+            conn.execute(query)
+        except sql.OperationalError:
+            query = """CREATE TABLE IF NOT EXISTS Transactions(
+            txn_id INTEGER PRIMARY KEY AUTOINCREMENT, 
+            acc_no INTEGER, 
+            timestamp TEXT NOT NULL, 
+            operation TEXT NOT NULL, 
+            prev_bal NUMERIC NOT NULL, 
+            trans_amount NUMERIC NOT NULL, 
+            avail_bal NUMERIC NOT NULL, 
+            operation_details TEXT, 
+            operator INTEGER, 
+            CONSTRAINT fk_acc FOREIGN KEY (acc_no) REFERENCES AccountDetails(acc_no),
+            CONSTRAINT fk_operator FOREIGN KEY (operator) REFERENCES AccountDetails(acc_no));"""
+            conn.execute(query)
+            query = """INSERT INTO Transactions VALUES(30000001, 100001, "2024-01-01 12:57:01.564427", "Cr", 0.0, 
+            100000.0, 100000.0, "Account opening balance", 100001);"""
+            conn.execute(query)
+            print("Table Transactions created")
+
+    # Bring existing databases up to the current schema version
+    with db.writer() as conn:
+        db_version = conn.execute("PRAGMA user_version;").fetchone()[0]
+        for version in range(db_version, len(SCHEMA_MIGRATIONS)):
+            for query in SCHEMA_MIGRATIONS[version]:
+                if callable(query):
+                    query(conn)
+                else:
+                    conn.execute(query)
+            conn.execute(f"PRAGMA user_version = {version + 1};")
+            print(f"Database migrated to version {version + 1}")
@@ -0,0 +1,446 @@
+"""
+    Project Name:       Mo Bank (A dummy banking system)
+    Module:             datagen
+    Purpose:            Synthetic ledger data for scale testing
+    Description:
+        Fills a Mo Bank database with realistic looking accounts and transactions: Admin, SWO and customer accounts,
+        current and savings accounts, opening balances, then deposits, counter and ATM withdrawals and transfers
+        spread over several years, each with a consistent prev_bal/avail_bal chain per account.
+
+        The account range is split into fixed size shards. Worker processes generate the shards in parallel, each
+        into its own scratch SQLite file with executemany in large transactions, and the main process copies every
+        finished shard into the target database with INSERT ... SELECT while the workers move on. Transfers stay
+        inside a shard so no two processes ever touch the same balance. The ledger indexes and the summary table
+        triggers are dropped during the load: the indexes, balance snapshots and login identifiers are rebuilt once at
+        the end and the operator totals are added per shard. The output only depends on the sizes and the seed, not
+        on the number of workers.
+
+            python datagen.py --db assets/mo_bank.db --accounts 100000 --transactions 10000000 --workers 8
+"""
+
+################################   Libraries   ################################
+import argparse
+from bisect import bisect_right
+from datetime import datetime, timedelta
+import math
+from multiprocessing import Pool
+import os
+import random
+import shutil
+import sqlite3 as sql
+import tempfile
+import time
+
+from database import (
+    DAILY_BALANCES_TRIGGER,
+    LOGIN_IDENTIFIERS_TRIGGERS,
+    OPERATOR_TOTALS_ADD,
+    OPERATOR_TOTALS_TRIGGER,
+    SCHEMA_MIGRATIONS,
+    ConnectionManager,
+    create_schema,
+    rebuild_daily_balances,
+    rebuild_login_identifiers,
+)
+from service import encrypt_password
+
+
+#############################   Global variables   ############################
+SHARD_ACCOUNTS = 20_000
+INSERT_CHUNK_SIZE = 100_000
+DEFAULT_YEARS = 3
+DEFAULT_SEED = 2019
+DEFAULT_PASSWORD = "Mo@12345"
+
+# Roles are given by account number so every shard knows all the operators
+ADMIN_EVERY = 1000
+SWO_EVERY = 100
+
+SAVINGS_SHARE = 0.7
+# Cumulative probabilities of deposit, withdrawal and transfer
+DEPOSIT_SHARE = 0.40
+WITHDRAW_SHARE = 0.75
+ATM_SHARE = 0.5  # share of withdrawals made by the holder at the ATM
+
+LEDGER_INDEXES = ("idx_trans_acc_ts", "idx_trans_operator_ts")
+
+SHARD_SCHEMA = (
+    """CREATE TABLE AccountDetails(acc_no, acc_type, full_name, email, mobile, gender, dob, password, user_type,
+    curr_bal);""",
+    """CREATE TABLE Transactions(acc_no, timestamp, operation, prev_bal, trans_amount, avail_bal,
+    operation_details, operator);""",
+)
+
+FIRST_NAMES = (
+    "Aarav Aditi Amit Ananya Arjun Asha Bikash Deepa Gita Hari Ishaan Jyoti Kabir Kavya Manoj Meera Nikhil Pooja "
+    "Priya Rahul Ravi Rohan Sanjay Sita Sneha Suresh Tanvi Uday Varun Zoya"
+).split()
+LAST_NAMES = (
+    "Behera Das Gupta Iyer Jena Khan Kumar Mishra Mohanty Nair Panda Patel Pati Rao Reddy Sahu Sharma Singh Swain"
+).split()
+
+
+#############################   Helper functions   ############################
+def role_of(acc_no: int) -> str:
+    if acc_no % ADMIN_EVERY == 0:
+        return "A"
+    if acc_no % SWO_EVERY == 0:
+        return "S"
+    return "C"
+
+
+def email_of(acc_no: int) -> str:
+    return f"user{acc_no}@data.mobank.xy"
+
+
+def mobile_of(acc_no: int) -> str:
+    return str(6000000000 + acc_no)
+
+
+def operators_between(first_acc_no: int, last_acc_no: int) -> list:
+    """Admin and SWO account numbers in a range (both inclusive)"""
+    first = -(-first_acc_no // SWO_EVERY) * SWO_EVERY
+    return list(range(first, last_acc_no + 1, SWO_EVERY))
+
+
+def _shard_plan(first_acc_no: int, accounts: int, transactions: int, seed: int):
+    """(first_acc_no, accounts, transactions, seed) of every shard"""
+    shards = []
+    done_accounts = done_transactions = 0
+    while done_accounts < accounts:
+        shard_accounts = min(SHARD_ACCOUNTS, accounts - done_accounts)
+        done_accounts += shard_accounts
+        shard_transactions = transactions * done_accounts // accounts
+        shard_transactions -= done_transactions
+        done_transactions += shard_transactions
+        shard_acc_no = first_acc_no + done_accounts - shard_accounts
+        shards.append(
+            (shard_acc_no, shard_accounts, shard_transactions, f"{seed}-{len(shards)}")
+        )
+    return shards
+
+
+############################   Shard generation   #############################
+def generate_shard(
+    shard_path: str,
+    first_acc_no: int,
+    accounts: int,
+    transactions: int,
+    seed: str,
+    operators: list,
+    start: datetime,
+    end: datetime,
+    password: str,
+) -> str:
+    """
+    Write the accounts and ledger rows of one account range into a scratch database
+
+    Accounts open one after the other over the first 80% of the period (account numbers grow with the opening
+    date) and every posting picks an account that is already open, so balances never go below zero.
+    """
+    rng = random.Random(seed)
+    span = (end - start).total_seconds()
+
+    # Opening time (seconds after start) of every account, in account number order
+    opened = sorted(rng.uniform(0, span * 0.8) for _ in range(accounts))
+    opened[0] = 0.0
+
+    conn = sql.connect(shard_path, isolation_level=None)
+    conn.execute("PRAGMA journal_mode = OFF;")
+    conn.execute("PRAGMA synchronous = OFF;")
+    for query in SHARD_SCHEMA:
+        conn.execute(query)
+    insert_query = "INSERT INTO Transactions VALUES(?, ?, ?, ?, ?, ?, ?, ?);"
+
+    def stamp(seconds: float) -> str:
+        return (start + timedelta(seconds=seconds)).isoformat(" ", "microseconds")
+
+    balances = [0] * accounts
+    rows = []
+    conn.execute("BEGIN;")
+    for index in range(accounts):
+        balance = int(rng.lognormvariate(9, 1.5)) * 100
+        balances[index] = balance
+        rows.append(
+            (first_acc_no + index, stamp(opened[index]), "Cr", 0, balance, balance)
+            + ("Account opening balance", rng.choice(operators))
+        )
+    conn.executemany(insert_query, rows)
+    rows.clear()
+
+    # Bound methods and int(random() * n) instead of randrange/choice keep the inner loop cheap
+    random_, gauss, exp = rng.random, rng.gauss, math.exp
+    n_operators = len(operators)
+    step = span / max(transactions, 1)
+    posted = 0
+    while posted < transactions:
+        seconds = posted * step
+        timestamp = stamp(seconds)
+        open_accounts = bisect_right(opened, seconds)
+        index = int(random_() * open_accounts)
+        acc_no = first_acc_no + index
+        amount = int(exp(gauss(7, 1.3)) * 100) or 100
+        prev_bal = balances[index]
+        operator = operators[int(random_() * n_operators)]
+        if operator == acc_no:
+            operator = operators[0] if operators[0] != acc_no else operators[-1]
+        pick = random_()
+
+        if pick >= WITHDRAW_SHARE and posted + 1 < transactions and open_accounts > 1:
+            to_index = int(random_() * open_accounts)
+            if to_index != index and prev_bal >= amount:
+                to_acc_no = first_acc_no + to_index
+                to_prev_bal = balances[to_index]
+                balances[index] = prev_bal - amount
+                balances[to_index] = to_prev_bal + amount
+                rows.append(
+                    (acc_no, timestamp, "Db", prev_bal, amount, prev_bal - amount)
+                    + (f"Transferred to {to_acc_no}", operator)
+                )
+                rows.append(
+                    (to_acc_no, timestamp, "Cr", to_prev_bal, amount)
+                    + (to_prev_bal + amount, f"Transferred from {acc_no}", operator)
+                )
+                posted += 2
+                continue
+            pick = DEPOSIT_SHARE  # fall back to a withdrawal or deposit
+
+        if pick >= DEPOSIT_SHARE and prev_bal >= amount:
+            details = "Withdrawl at Bank"
+            if random_() < ATM_SHARE:
+                details, operator = "Withdrawl from ATM", acc_no
+            balances[index] = prev_bal - amount
+            rows.append(
+                (acc_no, timestamp, "Db", prev_bal, amount, prev_bal - amount)
+                + (details, operator)
+            )
+        else:
+            balances[index] = prev_bal + amount
+            rows.append(
+                (acc_no, timestamp, "Cr", prev_bal, amount, prev_bal + amount)
+                + ("Deposit at Bank", operator)
+            )
+        posted += 1
+
+        if len(rows) >= INSERT_CHUNK_SIZE:
+            conn.executemany(insert_query, rows)
+            rows.clear()
+    conn.executemany(insert_query, rows)
+    rows.clear()
+
+    for index in range(accounts):
+        acc_no = first_acc_no + index
+        birth_year = rng.randint(1950, 2005)
+        rows.append(
+            (acc_no, "S" if random_() < SAVINGS_SHARE else "C")
+            + (f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}", email_of(acc_no))
+            + (mobile_of(acc_no), rng.choice("MFO"), f"{birth_year}-01-01", password)
+            + (role_of(acc_no), balances[index])
+        )
+    conn.executemany(
+        "INSERT INTO AccountDetails VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?, ?);", rows
+    )
+    conn.execute("COMMIT;")
+    conn.close()
+    return shard_path
+
+
+def _generate_shard(args: tuple) -> tuple:
+    shard_path, shard = args[0], args[1:5]
+    generate_shard(shard_path, *shard, *args[5:])
+    return shard_path, shard[1], shard[2]
+
+
+###############################   Data loading   ##############################
+def _finish_load(conn, first_acc_no: int, loaded: bool, progress):
+    """
+    Rebuild what the bulk load left out, also after a failed load
+
+    The migrations that created the ledger indexes and triggers are recorded as applied already, and the accounts of
+    the shards committed before a failure can't log in or show statement balances without their login identifiers
+    and snapshots.
+    """
+    try:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK;")  # a shard cut short
+        progress("Rebuilding ledger indexes")
+        for query in SCHEMA_MIGRATIONS[0]:
+            conn.execute(query)
+        if loaded:
+            progress("Building daily balance snapshots")
+            conn.execute("BEGIN;")
+            rebuild_daily_balances(conn, first_acc_no)
+            conn.execute("COMMIT;")
+
+            progress("Building login identifiers")
+            conn.execute("BEGIN;")
+            rebuild_login_identifiers(conn, first_acc_no)
+            conn.execute("COMMIT;")
+    finally:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK;")
+        conn.execute(DAILY_BALANCES_TRIGGER)
+        conn.execute(OPERATOR_TOTALS_TRIGGER)
+        for trigger in LOGIN_IDENTIFIERS_TRIGGERS:
+            conn.execute(trigger)
+
+
+def generate(
+    db_path: str,
+    accounts: int,
+    transactions: int,
+    years: float = DEFAULT_YEARS,
+    seed: int = DEFAULT_SEED,
+    workers: int = None,
+    password: str = DEFAULT_PASSWORD,
+    progress=print,
+) -> dict:
+    """
+    Add generated accounts and transactions to a database, creating it if needed
+
+    Parameters
+    ----------
+    db_path : str
+        Path of the target database.
+    accounts : int
+        Number of accounts to add, numbered after the highest existing account.
+    transactions : int
+        Number of ledger rows to add besides the opening balance rows.
+    years : float, optional
+        Length of the period the transactions are spread over, ending now. The default is DEFAULT_YEARS.
+    seed : int, optional
+        Seed of the random generators. The default is DEFAULT_SEED.
+    workers : int, optional
+        Number of generator processes. The default is the number of CPUs.
+    password : str, optional
+        Password of every generated account. The default is DEFAULT_PASSWORD.
+    progress : callable, optional
+        Called with a status message after every loaded shard.
+
+    Returns
+    -------
+    dict
+        first_acc_no, last_acc_no, accounts, transactions and seconds taken.
+
+    """
+    started = time.perf_counter()
+    db = ConnectionManager(db_path)
+    try:
+        create_schema(db)
+        with db.reader() as conn:
+            first_acc_no = conn.execute("SELECT max(acc_no) FROM AccountDetails;")
+            first_acc_no = first_acc_no.fetchone()[0] + 1
+            query = "SELECT acc_no FROM AccountDetails WHERE user_type IN ('A', 'S');"
+            operators = [row[0] for row in conn.execute(query)]
+    finally:
+        db.close()
+
+    last_acc_no = first_acc_no + accounts - 1
+    operators += operators_between(first_acc_no, last_acc_no)
+    end = datetime.now()
+    start = end - timedelta(days=365 * years)
+
+    scratch_dir = tempfile.mkdtemp(
+        prefix="datagen_", dir=os.path.dirname(os.path.abspath(db_path))
+    )
+    jobs = [
+        (os.path.join(scratch_dir, f"shard_{i}.db"), *shard)
+        + (operators, start, end, encrypt_password(password))
+        for i, shard in enumerate(
+            _shard_plan(first_acc_no, accounts, transactions, seed)
+        )
+    ]
+
+    done_accounts = done_transactions = 0
+    conn = sql.connect(db_path, isolation_level=None)
+    try:
+        conn.execute("PRAGMA synchronous = OFF;")
+        conn.execute("PRAGMA cache_size = -262144;")
+        for index in LEDGER_INDEXES:
+            conn.execute(f"DROP INDEX IF EXISTS {index};")
+        # Snapshots of the new accounts are computed once at the end and operator totals once per shard,
+        # instead of per row
+        conn.execute("DROP TRIGGER IF EXISTS trg_daily_balances;")
+        conn.execute("DROP TRIGGER IF EXISTS trg_operator_totals;")
+        # Login identifiers are sorted and added in one pass at the end
+        for trigger in ("insert", "update", "delete"):
+            conn.execute(f"DROP TRIGGER IF EXISTS trg_login_ids_{trigger};")
+
+        with Pool(workers or os.cpu_count()) as pool:
+            for shard_path, shard_accounts, shard_transactions in pool.imap(
+                _generate_shard, jobs
+            ):
+                conn.execute("ATTACH DATABASE ? AS shard;", (shard_path,))
+                conn.execute("BEGIN;")
+                conn.execute(
+                    "INSERT INTO AccountDetails SELECT * FROM shard.AccountDetails;"
+                )
+                conn.execute(
+                    """INSERT INTO Transactions(acc_no, timestamp, operation, prev_bal, trans_amount, avail_bal,
+                    operation_details, operator) SELECT * FROM shard.Transactions;"""
+                )
+                conn.execute(OPERATOR_TOTALS_ADD.format(table="shard.Transactions"))
+                conn.execute("COMMIT;")
+                conn.execute("DETACH DATABASE shard;")
+                os.remove(shard_path)
+
+                done_accounts += shard_accounts
+                done_transactions += shard_transactions
+                progress(
+                    f"{done_accounts}/{accounts} accounts, "
+                    f"{done_transactions}/{transactions} transactions loaded"
+                )
+    finally:
+        _finish_load(conn, first_acc_no, done_accounts > 0, progress)
+        conn.close()
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+
+    return {
+        "first_acc_no": first_acc_no,
+        "last_acc_no": last_acc_no,
+        "accounts": accounts,
+        "transactions": transactions,
+        "seconds": time.perf_counter() - started,
+    }
+
+
+###############################   Main Program   ##############################
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Fill a Mo Bank database with synthetic accounts and transactions"
+    )
+    parser.add_argument("--db", required=True, help="Database to create or extend")
+    parser.add_argument("--accounts", type=int, required=True)
+    parser.add_argument("--transactions", type=int, required=True)
+    parser.add_argument("--years", type=float, default=DEFAULT_YEARS)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--workers", type=int, help="Defaults to the number of CPUs")
+    parser.add_argument(
+        "--password",
+        default=DEFAULT_PASSWORD,
+        help=f"Password of the generated accounts (default {DEFAULT_PASSWORD})",
+    )
+    args = parser.parse_args(argv)
+
+    if args.accounts < 2:
+        parser.error("--accounts should be at least 2")
+    if args.transactions < 0:
+        parser.error("--transactions can not be negative")
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    result = generate(
+        args.db,
+        args.accounts,
+        args.transactions,
+        args.years,
+        args.seed,
+        args.workers,
+        args.password,
+    )
+    print(
+        f"Accounts {result['first_acc_no']} to {result['last_acc_no']}, "
+        f"{result['transactions']} transactions in {result['seconds']:.1f}s"
+    )
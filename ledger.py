@@ -0,0 +1,321 @@
+"""
+    Project Name:       Mo Bank (A dummy banking system)
+    Module:             ledger
+    Purpose:            Posting engine for deposits, withdrawals and transfers
+    Description:
+        Every posting runs inside a single BEGIN IMMEDIATE transaction on the write connection. The balance is changed
+        with a conditional UPDATE (the database does the arithmetic and the sufficient-balance check), so two terminals
+        posting to the same account can not overwrite each other's balance. The matching Transactions rows are
+        inserted in the same transaction. Amounts are Money values and are posted as integer paise.
+
+        Under a burst of postings from many threads, a PostingQueue applies them on one writer thread in batches, many
+        postings per transaction (group commit), instead of one commit each.
+"""
+
+################################   Libraries   ################################
+from concurrent.futures import Future
+from datetime import datetime
+import queue
+import threading
+import time
+
+from database import ConnectionManager
+from money import Money
+import queries
+
+
+#############################   Global variables   ############################
+POSTING_BATCH_SIZE = 64  # postings committed together at most
+POSTING_LINGER_MS = 1.0  # wait for more postings after the first one of a batch
+
+
+###############################   Exceptions   ################################
+class PostingError(Exception):
+    """Base class for errors raised while posting a transaction"""
+
+
+class InvalidAmount(PostingError):
+    def __init__(self, amount):
+        super().__init__(f"Invalid amount {amount}")
+        self.amount = amount
+
+
+class AccountNotFound(PostingError):
+    def __init__(self, acc_no):
+        super().__init__(f"Account {acc_no} not found")
+        self.acc_no = acc_no
+
+
+class InsufficientBalance(PostingError):
+    def __init__(self, acc_no):
+        super().__init__(f"Insufficient balance in account {acc_no}")
+        self.acc_no = acc_no
+
+
+############################   Posting primitives   ###########################
+def _credit(conn, acc_no: int, amount: int) -> tuple:
+    if conn.execute(queries.CREDIT_BALANCE, (amount, acc_no)).rowcount == 0:
+        raise AccountNotFound(acc_no)
+
+    avail_bal = conn.execute(queries.ACCOUNT_BALANCE, (acc_no,)).fetchone()[0]
+    return avail_bal - amount, avail_bal
+
+
+def _debit(conn, acc_no: int, amount: int) -> tuple:
+    if conn.execute(queries.DEBIT_BALANCE, (amount, acc_no, amount)).rowcount == 0:
+        if conn.execute(queries.ACCOUNT_EXISTS, (acc_no,)).fetchone() is None:
+            raise AccountNotFound(acc_no)
+        raise InsufficientBalance(acc_no)
+
+    avail_bal = conn.execute(queries.ACCOUNT_BALANCE, (acc_no,)).fetchone()[0]
+    return avail_bal + amount, avail_bal
+
+
+def _record(
+    conn,
+    acc_no: int,
+    timestamp: str,
+    operation: str,
+    balances: tuple,
+    amount: int,
+    details: str,
+    operator: int,
+):
+    prev_bal, avail_bal = balances
+    conn.execute(
+        queries.INSERT_TRANSACTION,
+        (acc_no, timestamp, operation, prev_bal, amount, avail_bal, details, operator),
+    )
+
+
+def _check_amount(amount: Money) -> int:
+    if amount.paise <= 0:
+        raise InvalidAmount(amount)
+    return amount.paise
+
+
+###############################   Posting API   ###############################
+def deposit(
+    db: ConnectionManager,
+    acc_no: int,
+    amount: Money,
+    operator: int,
+    details: str = "Deposit at Bank",
+):
+    """
+    Credit an account and record the transaction
+
+    Returns
+    -------
+    The available balance after the deposit.
+
+    """
+    paise = _check_amount(amount)
+    timestamp = str(datetime.now())
+    with db.writer() as conn:
+        balances = _credit(conn, acc_no, paise)
+        _record(conn, acc_no, timestamp, "Cr", balances, paise, details, operator)
+    return Money(balances[1])
+
+
+def withdraw(
+    db: ConnectionManager,
+    acc_no: int,
+    amount: Money,
+    operator: int,
+    details: str = "Withdrawl at Bank",
+):
+    """
+    Debit an account if it holds enough balance and record the transaction
+
+    Returns
+    -------
+    The available balance after the withdrawal.
+
+    """
+    paise = _check_amount(amount)
+    timestamp = str(datetime.now())
+    with db.writer() as conn:
+        balances = _debit(conn, acc_no, paise)
+        _record(conn, acc_no, timestamp, "Db", balances, paise, details, operator)
+    return Money(balances[1])
+
+
+def transfer(
+    db: ConnectionManager,
+    sender_acc_no: int,
+    receiver_acc_no: int,
+    amount: Money,
+    operator: int,
+):
+    """
+    Move money between two accounts and record both legs of the transfer
+
+    Accounts are always updated in ascending account number order so concurrent transfers between the same pair
+    take their locks in the same order.
+
+    Returns
+    -------
+    The available balance of the sender after the transfer.
+
+    """
+    paise = _check_amount(amount)
+    if sender_acc_no == receiver_acc_no:
+        raise PostingError("Can not transfer to same account")
+
+    timestamp = str(datetime.now())
+    with db.writer() as conn:
+        balances = {}
+        for acc_no in sorted((sender_acc_no, receiver_acc_no)):
+            if acc_no == sender_acc_no:
+                balances[acc_no] = _debit(conn, acc_no, paise)
+            else:
+                balances[acc_no] = _credit(conn, acc_no, paise)
+
+        _record(
+            conn,
+            sender_acc_no,
+            timestamp,
+            "Db",
+            balances[sender_acc_no],
+            paise,
+            f"Transferred to {receiver_acc_no}",
+            operator,
+        )
+        _record(
+            conn,
+            receiver_acc_no,
+            timestamp,
+            "Cr",
+            balances[receiver_acc_no],
+            paise,
+            f"Transferred from {sender_acc_no}",
+            operator,
+        )
+    return Money(balances[sender_acc_no][1])
+
+
+##############################   Posting queue   ##############################
+class PostingQueue:
+    """
+    Applies postings submitted by any number of threads on one writer thread, many per transaction (group commit)
+
+    The writer thread takes the first waiting posting, waits up to linger_ms for more until it has max_batch, and
+    applies them one after another inside a single BEGIN IMMEDIATE transaction, each in its own savepoint so a
+    refused posting is undone alone. The future of every posting is resolved once the transaction committed, with
+    the result of the posting or its error; if the commit fails, every posting of the batch fails with it.
+
+    Parameters
+    ----------
+    db : ConnectionManager
+        Connection manager of an initialised database.
+    max_batch : int, optional
+        Postings committed together at most, 1 commits each on its own. The default is POSTING_BATCH_SIZE.
+    linger_ms : float, optional
+        Milliseconds the writer waits for more postings before it commits a batch that is not full. With 0 a batch
+        holds the postings that queued up while the last one was committed. The default is POSTING_LINGER_MS.
+
+    """
+
+    def __init__(
+        self,
+        db: ConnectionManager,
+        max_batch: int = POSTING_BATCH_SIZE,
+        linger_ms: float = POSTING_LINGER_MS,
+    ):
+        if max_batch < 1:
+            raise ValueError("max_batch should be at least 1")
+        self.db = db
+        self.max_batch = max_batch
+        self.linger = max(linger_ms, 0) / 1000
+        self.batches = 0
+        self.applied = 0
+
+        self._queue = queue.SimpleQueue()
+        self._closed = False
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(
+            target=self._run, name="posting-writer", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, posting, *args, committed=None, **kwargs) -> Future:
+        """
+        Queue posting(db, *args, **kwargs) and return the future of its result
+
+        posting is deposit, withdraw, transfer or any function making its changes through db.writer(). committed,
+        if given, is called with the result on the writer thread once the batch committed and before the future is
+        resolved, so the results of successive postings reach it in commit order. It should not raise.
+        """
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("The posting queue is closed")
+            self._queue.put((future, posting, args, kwargs, committed))
+        return future
+
+    def close(self):
+        """Apply the postings already queued and stop the writer thread"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch, stopping = self._take_batch()
+            if batch:
+                self._apply(batch)
+
+    def _take_batch(self) -> tuple:
+        """Next batch of postings, and whether close() was called"""
+        item = self._queue.get()
+        if item is None:
+            return [], True
+
+        batch = [item]
+        deadline = time.monotonic() + self.linger
+        while len(batch) < self.max_batch:
+            try:
+                item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _apply(self, batch: list):
+        batch = [item for item in batch if item[0].set_running_or_notify_cancel()]
+        outcomes = []
+        try:
+            with self.db.writer() as conn:
+                for future, posting, args, kwargs, committed in batch:
+                    conn.execute(queries.SAVEPOINT_POSTING)
+                    try:
+                        result = posting(self.db, *args, **kwargs)
+                    except Exception as err:
+                        conn.execute(queries.ROLLBACK_POSTING)
+                        outcomes.append((future, None, err, None))
+                    else:
+                        outcomes.append((future, result, None, committed))
+                    conn.execute(queries.RELEASE_POSTING)
+        except Exception as err:
+            for future, *_ in batch:
+                future.set_exception(err)
+            return
+
+        self.batches += 1
+        self.applied += len(outcomes)
+        for future, result, err, committed in outcomes:
+            if err is not None:
+                future.set_exception(err)
+                continue
+            try:
+                if committed is not None:
+                    committed(result)
+            finally:
+                future.set_result(result)
@@ -0,0 +1,313 @@
+"""
+    Project Name:       Mo Bank (A dummy banking system)
+    Module:             loadgen
+    Purpose:            Load generator of the HTTP API
+    Description:
+        Drives the HTTP API of a running ledger server (server.py --http) with many concurrent keep-alive connections
+        for a fixed time and reports the requests per second and the p50/p95/p99 latency of every operation. Each
+        connection sends its next request as soon as the last one is answered, picking the operation from the mix
+        and the account at random. All connections share the session of one employee login.
+
+            python server.py --db scale_test.db --http 127.0.0.1:8080
+            python loadgen.py --url 127.0.0.1:8080 --connections 64 --duration 20 --processes 4
+
+        The accounts default to the customers datagen.py creates (FIRST_ACC_NO onwards) and the login to its first
+        SWO; deposits and transfers change their balances, so run it against a test database.
+"""
+
+################################   Libraries   ################################
+import argparse
+import asyncio
+from collections import Counter
+from datetime import date, timedelta
+import json
+from multiprocessing import Pool
+import random
+import sys
+import time
+
+from benchmark import FIRST_ACC_NO, print_results, summarize
+import datagen
+from server import parse_address
+
+
+#############################   Global variables   ############################
+DEFAULT_URL = "127.0.0.1:8080"
+DEFAULT_USER = datagen.mobile_of(
+    datagen.operators_between(FIRST_ACC_NO, FIRST_ACC_NO + datagen.SWO_EVERY)[0]
+)
+DEFAULT_MIX = "balance=60,statement=20,deposit=10,transfer=10"
+STATEMENT_DAYS = 30
+STATEMENT_LIMIT = 50
+POSTING_AMOUNT = "1.00"
+
+
+#############################   Helper functions   ############################
+def parse_mix(text: str) -> dict:
+    """Weights of the operations of a mix like balance=60,deposit=10"""
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name not in REQUESTS or not weight.isdigit():
+            raise ValueError(f"Invalid mix entry {part!r}")
+        mix[name] = int(weight)
+    if not any(mix.values()):
+        raise ValueError("The mix needs at least one weight above 0")
+    return mix
+
+
+def parse_accounts(text: str) -> tuple:
+    first, _, last = text.partition("-")
+    return int(first), int(last or first)
+
+
+def balance_request(rng: random.Random, accounts: tuple) -> tuple:
+    return "GET", f"/accounts/{rng.randint(*accounts)}/balance", None
+
+
+def statement_request(rng: random.Random, accounts: tuple) -> tuple:
+    from_date = date.today() - timedelta(days=STATEMENT_DAYS)
+    query = f"from_date={from_date}&to_date={date.today()}&limit={STATEMENT_LIMIT}"
+    return "GET", f"/accounts/{rng.randint(*accounts)}/statement?{query}", None
+
+
+def deposit_request(rng: random.Random, accounts: tuple) -> tuple:
+    path = f"/accounts/{rng.randint(*accounts)}/deposits"
+    return "POST", path, {"amount": POSTING_AMOUNT}
+
+
+def withdraw_request(rng: random.Random, accounts: tuple) -> tuple:
+    path = f"/accounts/{rng.randint(*accounts)}/withdrawals"
+    return "POST", path, {"amount": POSTING_AMOUNT}
+
+
+def transfer_request(rng: random.Random, accounts: tuple) -> tuple:
+    sender, receiver = rng.sample(range(accounts[0], accounts[1] + 1), 2)
+    body = {"from_acc_no": sender, "to_acc_no": receiver, "amount": POSTING_AMOUNT}
+    return "POST", "/transfers", body
+
+
+REQUESTS = {
+    "balance": balance_request,
+    "statement": statement_request,
+    "deposit": deposit_request,
+    "withdraw": withdraw_request,
+    "transfer": transfer_request,
+}
+
+
+##############################   HTTP client   ################################
+class HttpConnection:
+    """Keep-alive HTTP/1.1 connection sending one request at a time"""
+
+    def __init__(self, url: str, token: str = None):
+        self.family, self.location = parse_address(url.removeprefix("http://"))
+        self.token = token
+        self.reader = None
+        self.writer = None
+
+    async def open(self):
+        if self.family == "unix":
+            connection = asyncio.open_unix_connection(self.location)
+        else:
+            connection = asyncio.open_connection(*self.location)
+        self.reader, self.writer = await connection
+
+    async def request(self, method: str, path: str, body: dict = None) -> tuple:
+        """Status and JSON payload of a request"""
+        data = b"" if body is None else json.dumps(body).encode()
+        head = f"{method} {path} HTTP/1.1\r\nHost: mobank\r\nContent-Length: {len(data)}\r\n"
+        if body is not None:
+            head += "Content-Type: application/json\r\n"
+        if self.token:
+            head += f"Authorization: Bearer {self.token}\r\n"
+        self.writer.write(head.encode() + b"\r\n" + data)
+        await self.writer.drain()
+
+        response = (await self.reader.readuntil(b"\r\n\r\n")).decode("latin-1")
+        status = int(response.split(" ", 2)[1])
+        length = 0
+        for line in response.split("\r\n")[1:]:
+            name, _, value = line.partition(":")
+            if name.strip().lower() == "content-length":
+                length = int(value)
+        payload = await self.reader.readexactly(length)
+        return status, json.loads(payload) if payload else None
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+async def login(url: str, user: str, password: str) -> str:
+    """Session token of a login through the API"""
+    conn = HttpConnection(url)
+    await conn.open()
+    try:
+        status, payload = await conn.request(
+            "POST", "/login", {"user_info": user, "password": password}
+        )
+    finally:
+        conn.close()
+    if status != 200:
+        raise ValueError(f"Login failed: {payload['error']['message']}")
+    return payload["token"]
+
+
+###############################   Load run   ##################################
+async def run_connection(
+    url: str, token: str, mix: dict, accounts: tuple, deadline: float, seed
+) -> list:
+    """(operation, status, seconds) of every request of one connection until the deadline"""
+    rng = random.Random(seed)
+    names = list(mix)
+    weights = list(mix.values())
+    samples = []
+
+    conn = HttpConnection(url, token)
+    await conn.open()
+    try:
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights)[0]
+            method, path, body = REQUESTS[name](rng, accounts)
+            started = time.perf_counter()
+            status, _ = await conn.request(method, path, body)
+            samples.append((name, status, time.perf_counter() - started))
+    finally:
+        conn.close()
+    return samples
+
+
+async def run_load(
+    url: str, token: str, mix: dict, accounts: tuple, connections: int, duration, seed
+) -> tuple:
+    """Samples of all the connections and the seconds they took"""
+    started = time.perf_counter()
+    runs = [
+        run_connection(url, token, mix, accounts, started + duration, f"{seed}-{i}")
+        for i in range(connections)
+    ]
+    samples = []
+    for result in await asyncio.gather(*runs):
+        samples.extend(result)
+    return samples, time.perf_counter() - started
+
+
+def _run_process(args: tuple) -> tuple:
+    return asyncio.run(run_load(*args))
+
+
+def report(samples: list, seconds: float) -> dict:
+    """Throughput, statuses and latency statistics of the samples of a run"""
+    results = {}
+    for name in sorted({sample[0] for sample in samples}):
+        timings = [elapsed for op, _, elapsed in samples if op == name]
+        if len(timings) >= 2:
+            results[name] = summarize(timings)
+    if len(samples) >= 2:
+        results["all"] = summarize([elapsed for _, _, elapsed in samples])
+
+    statuses = Counter(status for _, status, _ in samples)
+    return {
+        "requests": len(samples),
+        "seconds": seconds,
+        "requests_per_second": len(samples) / seconds,
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        "errors": sum(count for status, count in statuses.items() if status != 200),
+        "results": results,
+    }
+
+
+###############################   Main Program   ##############################
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Mo Bank HTTP API load generator")
+    parser.add_argument(
+        "--url", default=DEFAULT_URL, help="host:port or unix:/path of the API"
+    )
+    parser.add_argument("--user", default=DEFAULT_USER, help="Admin/SWO login")
+    parser.add_argument("--password", default=datagen.DEFAULT_PASSWORD)
+    parser.add_argument(
+        "--accounts",
+        default=f"{FIRST_ACC_NO}-{FIRST_ACC_NO + 998}",
+        help="range of account numbers used, first-last",
+    )
+    parser.add_argument(
+        "--mix",
+        default=DEFAULT_MIX,
+        help=f"operation weights, of {', '.join(REQUESTS)} (default {DEFAULT_MIX})",
+    )
+    parser.add_argument(
+        "--connections", type=int, default=32, help="concurrent connections per process"
+    )
+    parser.add_argument(
+        "--processes", type=int, default=1, help="client processes, for more load"
+    )
+    parser.add_argument("--duration", type=float, default=10, help="seconds to run")
+    parser.add_argument("--seed", type=int, default=2019)
+    parser.add_argument(
+        "--json", metavar="FILE", help="Write the results as JSON ('-' for stdout)"
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        parse_address(args.url.removeprefix("http://"))
+        args.mix = parse_mix(args.mix)
+        args.accounts = parse_accounts(args.accounts)
+    except ValueError as err:
+        parser.error(str(err))
+    if args.accounts[1] <= args.accounts[0]:
+        parser.error("--accounts should hold at least two accounts")
+    return args
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    try:
+        token = asyncio.run(login(args.url, args.user, args.password))
+    except (OSError, ValueError) as err:
+        print(err, file=sys.stderr)
+        return 1
+
+    jobs = [
+        (
+            args.url,
+            token,
+            args.mix,
+            args.accounts,
+            args.connections,
+            args.duration,
+            f"{args.seed}-{process}",
+        )
+        for process in range(args.processes)
+    ]
+    if args.processes == 1:
+        runs = [_run_process(jobs[0])]
+    else:
+        with Pool(args.processes) as pool:
+            runs = pool.map(_run_process, jobs)
+    samples = [sample for run_samples, _ in runs for sample in run_samples]
+    result = report(samples, max(seconds for _, seconds in runs))
+
+    if args.json != "-":
+        print(
+            f"{result['requests']} requests in {result['seconds']:.1f}s, "
+            f"{result['requests_per_second']:.0f} requests/s, statuses {result['statuses']}"
+        )
+        print_results(result["results"])
+    if args.json:
+        result.update(
+            url=args.url,
+            connections=args.connections * args.processes,
+            mix=args.mix,
+        )
+        if args.json == "-":
+            json.dump(result, sys.stdout, indent=2)
+            print()
+        else:
+            with open(args.json, "w") as file:
+                json.dump(result, file, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -28,33 +28,54 @@
 """
 
 ################################   Libraries   ################################
+import time
+
+STARTUP_BEGAN = time.perf_counter()  # before the other imports, for --profile-startup
+
+import argparse
 import ctypes
 from datetime import datetime
-from dateutil.relativedelta import relativedelta
 from functools import partial
-import hashlib
-import math
 import os
-import re
-import secrets
-import sqlite3 as sql
 import sys
-import tempfile
-import webbrowser
-
-from fpdf import FPDF
 
-from PyQt5 import uic, QtCore
-from PyQt5.QtCore import QDate
+from PyQt5 import QtCore
+from PyQt5.QtCore import QDate, QEvent, QObject, QTimer
 from PyQt5.QtGui import QIcon
 from PyQt5.QtWidgets import (
     QApplication,
     QMainWindow,
     QMessageBox,
-    QTableWidgetItem,
     QWidget,
 )
 
+from database import (
+    ConnectionManager,
+    create_schema,
+    rebuild_daily_balances,
+    rebuild_login_identifiers,
+    rebuild_operator_totals,
+)
+import ledger
+from money import Money
+from querystats import SLOW_QUERY_MS, QueryStats
+from service import (
+    BankService,
+    ServiceError,
+    generate_password,
+    name_prefix,
+    validate_account_no,
+)
+from trans_model import FETCH_SIZE, TransactionTableModel
+from ui_loader import load_ui
+from uitrace import PAGES_TID, STALL_MS, UITracer
+from workers import Cancelled, DebouncedLookup, PageWorker, Task
+
+# Printing (report: fpdf, PIL), the browser and batch posting are imported where they are used, as few sessions need
+# them and fpdf alone takes longer to import than the rest of the app
+
+IMPORTS_DONE = time.perf_counter()
+
 
 # https://stackoverflow.com/questions/31836104/pyinstaller-and-onefile-how-to-include-an-image-in-the-exe-file
 def resource_path(relative_path):
@@ -71,8 +92,21 @@ def resource_path(relative_path):
 
 #############################   Global variables   ############################
 DB_PATH = resource_path("assets\\mo_bank.db")
+BUSY_STRIP_HEIGHT = 34  # busy indicator laid over the bottom of the transaction tables
+REPORT_FETCH_SIZE = 1000  # rows read per query while gathering a report
+KYC_LOOKUP_DELAY = 300  # ms the KYC account number has to settle before lookup
+SLOW_QUERY_LOG = resource_path("assets\\slow_queries.log")
+query_stats = QueryStats(SLOW_QUERY_MS, SLOW_QUERY_LOG)
+db = ConnectionManager(DB_PATH, stats=query_stats)
+bank = BankService(db)
+ui_trace = UITracer()  # records once started by --trace-ui
+
+# Columns of the transaction views
+STATEMENT_COLUMNS = ["Date", "Details", "Amount", "Operation", "Balance"]
+OPERATOR_COLUMNS = ["Date", "Details", "Amount", "Operation"]
 
 main_win = None
+query_stats_dialog = None
 user_details = dict()
 last_login_time = None
 
@@ -81,419 +115,414 @@ last_login_time = None
 class Intro(QWidget):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        uic.loadUi(resource_path("assets\\pages\\intro.ui"), self)
+        load_ui(resource_path("assets\\pages\\intro.ui"), self)
+
+        self.pushButton.clicked.connect(openLoginPage)
+        self.pushButton_2.clicked.connect(openGithubRepo)
+        self.pushButton_3.clicked.connect(openGithubProfile)
 
 
 class Login(QWidget):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        uic.loadUi(resource_path("assets\\pages\\login.ui"), self)
+        load_ui(resource_path("assets\\pages\\login.ui"), self)
+        self.worker = PageWorker([self.pushButton], self.pushButton)
+
+        self.pushButton.clicked.connect(completeLogin)
+        self.pushButton_2.clicked.connect(openIntroPage)
 
 
 class AccountDetails(QWidget):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        uic.loadUi(resource_path("assets\\pages\\acc_details.ui"), self)
+        load_ui(resource_path("assets\\pages\\acc_details.ui"), self)
+
+        self.pushButton_2.clicked.connect(logout)
+        self.pushButton_3.clicked.connect(openNewCustomerPage)
+        self.pushButton_4.clicked.connect(openSWO_DepositPage)
+        self.pushButton_7.clicked.connect(openCustomerWithdrawlPage)
+        self.pushButton_8.clicked.connect(openCustomerTransPage)
 
 
 class HolderWithdrawl(QWidget):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        uic.loadUi(resource_path("assets\\pages\\holder_withdrawl.ui"), self)
+        load_ui(resource_path("assets\\pages\\holder_withdrawl.ui"), self)
+        self.worker = PageWorker([self.pushButton_20], self.pushButton_20)
+
+        self.pushButton_2.clicked.connect(logout)
+        self.pushButton_3.clicked.connect(openNewCustomerPage)
+        self.pushButton_4.clicked.connect(openSWO_DepositPage)
+        self.pushButton_6.clicked.connect(openAccountDetailsPage)
+        self.pushButton_8.clicked.connect(openCustomerTransPage)
+        self.pushButton.clicked.connect(partial(updateWithdrawlAmount, "1"))
+        self.pushButton_9.clicked.connect(partial(updateWithdrawlAmount, "2"))
+        self.pushButton_10.clicked.connect(partial(updateWithdrawlAmount, "3"))
+        self.pushButton_11.clicked.connect(partial(updateWithdrawlAmount, "4"))
+        self.pushButton_12.clicked.connect(partial(updateWithdrawlAmount, "5"))
+        self.pushButton_13.clicked.connect(partial(updateWithdrawlAmount, "6"))
+        self.pushButton_14.clicked.connect(partial(updateWithdrawlAmount, "7"))
+        self.pushButton_15.clicked.connect(partial(updateWithdrawlAmount, "8"))
+        self.pushButton_16.clicked.connect(partial(updateWithdrawlAmount, "9"))
+        self.pushButton_17.clicked.connect(partial(updateWithdrawlAmount, "."))
+        self.pushButton_18.clicked.connect(partial(updateWithdrawlAmount, "0"))
+        self.pushButton_19.clicked.connect(partial(updateWithdrawlAmount, "-1"))
+        self.pushButton_20.clicked.connect(selfWithdrawl)
+        self.pushButton_21.clicked.connect(partial(updateWithdrawlAmount, "-2"))
 
 
 class CustomerTransactions(QWidget):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        uic.loadUi(resource_path("assets\\pages\\holder_trans.ui"), self)
+        load_ui(resource_path("assets\\pages\\holder_trans.ui"), self)
+        self.model = TransactionTableModel(STATEMENT_COLUMNS, parent=self)
+        self.tableView.setModel(self.model)
+        self.worker = PageWorker(
+            [self.pushButton, self.pushButton_10], self.tableView, BUSY_STRIP_HEIGHT
+        )
+
+        self.pushButton.clicked.connect(showCustomerTrans)
+        self.pushButton_2.clicked.connect(logout)
+        self.pushButton_3.clicked.connect(openNewCustomerPage)
+        self.pushButton_4.clicked.connect(openSWO_DepositPage)
+        self.pushButton_6.clicked.connect(openAccountDetailsPage)
+        self.pushButton_7.clicked.connect(openCustomerWithdrawlPage)
+        self.pushButton_10.clicked.connect(printCustomerTrans)
 
 
 class SWO_Deposit(QWidget):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        uic.loadUi(resource_path("assets\\pages\\swo_deposit.ui"), self)
+        load_ui(resource_path("assets\\pages\\swo_deposit.ui"), self)
+        self.worker = PageWorker([self.pushButton], self.pushButton)
+
+        self.pushButton.clicked.connect(officeDeposit)
+        self.pushButton_2.clicked.connect(logout)
+        self.pushButton_3.clicked.connect(openNewCustomerPage)
+        self.pushButton_5.clicked.connect(openAccountDetailsPage)
+        self.pushButton_7.clicked.connect(openSWO_WithdrawlPage)
+        self.pushButton_8.clicked.connect(openSWO_TransferPage)
+        self.pushButton_9.clicked.connect(openSWO_TransPage)
+        self.pushButton_10.clicked.connect(partial(fetchCustomerDetails, "D"))
 
 
 class SWO_Withdrawl(QWidget):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        uic.loadUi(resource_path("assets\\pages\\swo_withdrawl.ui"), self)
+        load_ui(resource_path("assets\\pages\\swo_withdrawl.ui"), self)
+        self.worker = PageWorker([self.pushButton], self.pushButton)
+
+        self.pushButton.clicked.connect(officeWithdrawl)
+        self.pushButton_2.clicked.connect(logout)
+        self.pushButton_3.clicked.connect(openNewCustomerPage)
+        self.pushButton_5.clicked.connect(openAccountDetailsPage)
+        self.pushButton_6.clicked.connect(openSWO_DepositPage)
+        self.pushButton_8.clicked.connect(openSWO_TransferPage)
+        self.pushButton_9.clicked.connect(openSWO_TransPage)
+        self.pushButton_10.clicked.connect(partial(fetchCustomerDetails, "W"))
 
 
 class SWO_Transfer_Money(QWidget):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        uic.loadUi(resource_path("assets\\pages\\swo_transfer_money.ui"), self)
+        load_ui(resource_path("assets\\pages\\swo_transfer_money.ui"), self)
+        self.worker = PageWorker([self.pushButton], self.pushButton)
+
+        self.pushButton.clicked.connect(officeTransfer)
+        self.pushButton_2.clicked.connect(logout)
+        self.pushButton_3.clicked.connect(openNewCustomerPage)
+        self.pushButton_5.clicked.connect(openAccountDetailsPage)
+        self.pushButton_6.clicked.connect(openSWO_DepositPage)
+        self.pushButton_7.clicked.connect(openSWO_WithdrawlPage)
+        self.pushButton_9.clicked.connect(openSWO_TransPage)
+        self.pushButton_10.clicked.connect(partial(fetchCustomerDetails, "TM"))
 
 
 class SWO_Transactions(QWidget):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        uic.loadUi(resource_path("assets\\pages\\swo_trans.ui"), self)
+        load_ui(resource_path("assets\\pages\\swo_trans.ui"), self)
+        self.model = TransactionTableModel(STATEMENT_COLUMNS, parent=self)
+        self.tableView.setModel(self.model)
+        self.worker = PageWorker(
+            [self.pushButton, self.pushButton_10, self.pushButton_11],
+            self.tableView,
+            BUSY_STRIP_HEIGHT,
+        )
+
+        self.pushButton.clicked.connect(officeTrans)
+        self.pushButton_2.clicked.connect(logout)
+        self.pushButton_3.clicked.connect(openNewCustomerPage)
+        self.pushButton_5.clicked.connect(openAccountDetailsPage)
+        self.pushButton_6.clicked.connect(openSWO_DepositPage)
+        self.pushButton_7.clicked.connect(openSWO_WithdrawlPage)
+        self.pushButton_8.clicked.connect(openSWO_TransferPage)
+        self.pushButton_10.clicked.connect(customerTrans)
+        self.pushButton_11.clicked.connect(printCustomerTransFromSWO)
 
 
 class AdminCreateUser(QWidget):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        uic.loadUi(resource_path("assets\\pages\\admin_new_user.ui"), self)
+        load_ui(resource_path("assets\\pages\\admin_new_user.ui"), self)
+        self.worker = PageWorker([self.pushButton], self.pushButton)
+
+        self.pushButton.clicked.connect(addCustomer)
+        self.pushButton_2.clicked.connect(logout)
+        self.pushButton_4.clicked.connect(openSWO_DepositPage)
+        self.pushButton_5.clicked.connect(openAccountDetailsPage)
+        self.pushButton_7.clicked.connect(partial(openKYC_Page, True))
+        self.pushButton_8.clicked.connect(openTransactionPage)
+        self.pushButton_10.clicked.connect(openQueryStats)
 
 
 class AdminUpdateUser(QWidget):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        uic.loadUi(resource_path("assets\\pages\\admin_update_user.ui"), self)
+        load_ui(resource_path("assets\\pages\\admin_update_user.ui"), self)
+        self.lookup = DebouncedLookup(bank.get_account, KYC_LOOKUP_DELAY)
+        self.worker = PageWorker([self.pushButton], self.pushButton)
 
+        self.pushButton.clicked.connect(updateKYC)
+        self.pushButton_2.clicked.connect(logout)
+        self.pushButton_4.clicked.connect(openSWO_DepositPage)
+        self.pushButton_5.clicked.connect(openAccountDetailsPage)
+        self.pushButton_6.clicked.connect(openNewCustomerPage)
+        self.pushButton_8.clicked.connect(openTransactionPage)
+        self.pushButton_10.clicked.connect(openQueryStats)
+        self.lineEdit.textChanged.connect(fetchKYCdata)
+        self.pushButton_9.clicked.connect(fetchKYCdataWithError)
 
-class AdminTransactions(QWidget):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        uic.loadUi(resource_path("assets\\pages\\admin_trans.ui"), self)
 
-
-class MainWindow(QMainWindow):
+class AdminTransactions(QWidget):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        uic.loadUi(resource_path("assets\\pages\\main_win.ui"), self)
-
-        # Page 0
-        self.intro = Intro()
-        self.stackedWidget.addWidget(self.intro)
-
-        # Page 1
-        self.login = Login()
-        self.stackedWidget.addWidget(self.login)
-
-        # Page 2
-        self.acc_det = AccountDetails()
-        self.stackedWidget.addWidget(self.acc_det)
-
-        # Page 3
-        self.hldr_wdrl = HolderWithdrawl()
-        self.stackedWidget.addWidget(self.hldr_wdrl)
-
-        # Page 4
-        self.customer_trans = CustomerTransactions()
-        self.stackedWidget.addWidget(self.customer_trans)
+        load_ui(resource_path("assets\\pages\\admin_trans.ui"), self)
+        self.model = TransactionTableModel(OPERATOR_COLUMNS, parent=self)
+        self.tableView.setModel(self.model)
+        self.worker = PageWorker(
+            [self.pushButton, self.pushButton_9], self.tableView, BUSY_STRIP_HEIGHT
+        )
 
-        # Page 5
-        self.swo_dep = SWO_Deposit()
-        self.stackedWidget.addWidget(self.swo_dep)
+        self.pushButton.clicked.connect(showEmployeeTransactions)
+        self.pushButton_2.clicked.connect(logout)
+        self.pushButton_4.clicked.connect(openSWO_DepositPage)
+        self.pushButton_5.clicked.connect(openAccountDetailsPage)
+        self.pushButton_6.clicked.connect(openNewCustomerPage)
+        self.pushButton_7.clicked.connect(partial(openKYC_Page, True))
+        self.pushButton_9.clicked.connect(printTransactions)
+        self.pushButton_10.clicked.connect(openQueryStats)
+
+
+# Pages of the stackedWidget in index order, as MainWindow attribute and page class
+PAGES = [
+    ("intro", Intro),
+    ("login", Login),
+    ("acc_det", AccountDetails),
+    ("hldr_wdrl", HolderWithdrawl),
+    ("customer_trans", CustomerTransactions),
+    ("swo_dep", SWO_Deposit),
+    ("swo_wdrl", SWO_Withdrawl),
+    ("swo_tf_mn", SWO_Transfer_Money),
+    ("swo_trans", SWO_Transactions),
+    ("admin_new_user", AdminCreateUser),
+    ("admin_update", AdminUpdateUser),
+    ("admin_trans", AdminTransactions),
+]
+PAGE_INDEX = {name: index for index, (name, _) in enumerate(PAGES)}
 
-        # Page 6
-        self.swo_wdrl = SWO_Withdrawl()
-        self.stackedWidget.addWidget(self.swo_wdrl)
 
-        # Page 7
-        self.swo_tf_mn = SWO_Transfer_Money()
-        self.stackedWidget.addWidget(self.swo_tf_mn)
+class MainWindow(QMainWindow):
+    """
+    Main window holding the pages in a stackedWidget
 
-        # Page 8
-        self.swo_trans = SWO_Transactions()
-        self.stackedWidget.addWidget(self.swo_trans)
+    Pages are built on first use: the stackedWidget starts with an empty placeholder at every index, replaced by the
+    page when its attribute is first read (main_win.swo_dep) or its index is first shown.
+    """
 
-        # Page 9
-        self.admin_new_user = AdminCreateUser()
-        self.stackedWidget.addWidget(self.admin_new_user)
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        load_ui(resource_path("assets\\pages\\main_win.ui"), self)
+
+        for _ in PAGES:
+            self.stackedWidget.addWidget(QWidget())
+        self.stackedWidget.currentChanged.connect(self.showPage)
+        self.page(0)
+
+    def __getattr__(self, name):
+        # Only reached for attributes not set yet, i.e. pages not built so far
+        if name in PAGE_INDEX:
+            return self.page(PAGE_INDEX[name])
+        raise AttributeError(name)
+
+    def showPage(self, index: int):
+        began = time.perf_counter()
+        page = self.page(index)
+        if ui_trace.enabled:
+            # From the switch until the page is drawn, building it included
+            FirstFrameWatcher(
+                page,
+                partial(
+                    ui_trace.complete,
+                    f"show {PAGES[index][0]}",
+                    "page",
+                    began,
+                    tid=PAGES_TID,
+                ),
+            )
 
-        # Page 10
-        self.admin_update = AdminUpdateUser()
-        self.stackedWidget.addWidget(self.admin_update)
+    def is_built(self, name: str) -> bool:
+        return name in self.__dict__
 
-        # Page 11
-        self.admin_trans = AdminTransactions()
-        self.stackedWidget.addWidget(self.admin_trans)
+    def page(self, index: int) -> QWidget:
+        """Page at an index of the stackedWidget, built first if needed"""
+        name, page_class = PAGES[index]
+        if self.is_built(name):
+            return self.__dict__[name]
 
+        with ui_trace.span(f"build {name}", "page", tid=PAGES_TID):
+            page = page_class()
+        setattr(self, name, page)
 
-################################   Create PDF   ################################
-class PDF(FPDF):
-    # Page header
-    def header(self):
-        # Logo
-        self.image(
-            resource_path("assets\\images\\Mo Bank logo.JPG"), x=60, y=10, w=20, h=20
-        )
-        self.set_font("helvetica", style="B", size=32)
-        self.cell(80)
-        self.cell(
-            30, 20, self.title, border=0, new_x="LMARGIN", new_y="NEXT", align="C"
-        )
-        self.ln(10)
-
-    # Page footer
-    def footer(self):
-        # Position at 1.5 cm from bottom
-        self.set_y(-15)
-        self.set_font("helvetica", style="I", size=8)
-        # Page number
-        self.cell(
-            0,
-            10,
-            "Page " + str(self.page_no()) + "/{nb}",
-            border=0,
-            new_x="LMARGIN",
-            new_y="NEXT",
-            align="R",
-        )
+        # Swap the placeholder without reporting the index shifts as page changes
+        current = self.stackedWidget.currentIndex()
+        placeholder = self.stackedWidget.widget(index)
+        self.stackedWidget.blockSignals(True)
+        self.stackedWidget.insertWidget(index, page)
+        self.stackedWidget.removeWidget(placeholder)
+        self.stackedWidget.setCurrentIndex(current)
+        self.stackedWidget.blockSignals(False)
+        placeholder.deleteLater()
+        return page
 
 
 #############################   Helper functions   ############################
-def encrypt_password(pwd: str) -> str:
-    return hashlib.md5(pwd.encode()).hexdigest()
-
-
-def generate_password() -> str:
-    return secrets.token_urlsafe(nbytes=8)
-
-
 def initial_db_check():
     print(DB_PATH)
-    # Check or Create Database
-    conn = sql.Connection(DB_PATH)
-    conn.close()
-
-    # Create tables if doesn't exist
-    conn = sql.Connection(DB_PATH)
-    try:
-        query = "SELECT * FROM AccountDetails LIMIT 1;"
-        conn.execute(query)
-    except sql.OperationalError:
-        query = """CREATE TABLE IF NOT EXISTS AccountDetails( 
-        acc_no INTEGER PRIMARY KEY AUTOINCREMENT, 
-        acc_type TEXT DEFAULT "C", 
-        full_name TEXT NOT NULL, 
-        email TEXT NOT NULL UNIQUE, 
-        mobile TEXT NOT NULL UNIQUE, 
-        gender TEXT DEFAULT "O", 
-        dob TEXT, 
-        password TEXT NOT NULL, 
-        user_type TEXT NOT NULL DEFAULT "Holder", 
-        curr_bal NUMERIC NOT NULL);"""
-        conn.execute(query)
-        query = """INSERT INTO AccountDetails VALUES(100001, "C", "Admin", "admin@mobank.xy", "9999999999", "M", 
-        "2024-01-01", "e20f517179e9cd52ae29dae43c121b95", "A", 100000.0);"""  # password - Hello@123
-        conn.execute(query)
-        conn.commit()
-        print("Table AccountDetails created")
-    conn.close()
-
-    conn = sql.Connection(DB_PATH)
-    try:
-        query = "SELECT * FROM Transactions LIMIT 1;"
-        conn.execute(query)
-    except sql.OperationalError:
-        query = """CREATE TABLE IF NOT EXISTS Transactions(
-        txn_id INTEGER PRIMARY KEY AUTOINCREMENT, 
-        acc_no INTEGER, 
-        timestamp TEXT NOT NULL, 
-        operation TEXT NOT NULL, 
-        prev_bal NUMERIC NOT NULL, 
-        trans_amount NUMERIC NOT NULL, 
-        avail_bal NUMERIC NOT NULL, 
-        operation_details TEXT, 
-        operator INTEGER, 
-        CONSTRAINT fk_acc FOREIGN KEY (acc_no) REFERENCES AccountDetails(acc_no),
-        CONSTRAINT fk_operator FOREIGN KEY (operator) REFERENCES AccountDetails(acc_no));"""
-        conn.execute(query)
-        query = """INSERT INTO Transactions VALUES(30000001, 100001, "2024-01-01 12:57:01.564427", "Cr", 0.0, 100000.0, 
-        100000.0, "Account opening balance", 100001);"""
-        conn.execute(query)
-        conn.commit()
-        print("Table Transactions created")
-    conn.close()
-
-
-def validate_fullname(name: str) -> tuple:
-    # add your name validation logic here
-    if len(name) < 2:
-        return False, "Full name should have atleast 2 characters"
-    return True, ""
-
-
-def validate_email(email: str) -> bool:
-    regex = r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,7}\b"
-    return True if re.fullmatch(regex, email) else False
-
-
-def validate_mobile(mobile: str) -> bool:
-    regex = r"\b^\+?[6-9][0-9]{9}$\b"
-    return True if re.fullmatch(regex, mobile) else False
-
-
-def validate_password(pwd: str) -> tuple:
-    # add your password validation logic here
-    if len(pwd) < 6:
-        return False, "Password should have atleast 6 characters"
-    return True, ""
-
-
-def validate_account_no(acc_no: str) -> bool:
-    ret = False
-    if len(acc_no) >= 6:
-        try:
-            int(acc_no)
-            ret = True
-        except ValueError:
-            pass
-    return ret
+    # Check or Create Database, create tables and apply migrations
+    create_schema(db)
 
 
 def generate_report(
-    user_data, trans_data, from_date: str, to_date: str, is_emp: bool = False
-):
-    pdf = PDF()
-    pdf.title = "Mo Bank"
-    pdf.set_margins(left=12.7, top=12.7)
-    pdf.alias_nb_pages()
-    pdf.add_page()
-
-    TABLE_CELL_HEIGHT = 6
-
-    pdf.set_font("helvetica", style="B", size=16)
-    pdf.cell(40, 10, "Account Details")
-    pdf.ln(15)
-
-    pdf.set_font(style="", size=12)
-    pdf.cell(
-        pdf.epw / 2,
-        TABLE_CELL_HEIGHT,
-        f"**Account Number:** {user_data[0]}",
-        border=1,
-        align="L",
-        markdown=True,
-    )
-    print_msg = ""
-    if not is_emp:
-        print_msg = (
-            f"**Account Type:** {'Current' if user_data[1] == 'C' else 'Savings'}"
-        )
-    pdf.cell(
-        pdf.epw / 2, TABLE_CELL_HEIGHT, print_msg, border=1, align="L", markdown=True
-    )
-    pdf.ln(TABLE_CELL_HEIGHT)
-    pdf.cell(
-        pdf.epw,
-        TABLE_CELL_HEIGHT,
-        f"**Account Holder:** {user_data[2]}",
-        border=1,
-        align="L",
-        markdown=True,
-    )
-    pdf.ln(TABLE_CELL_HEIGHT)
-    if not is_emp:
-        pdf.cell(
-            pdf.epw / 2,
-            TABLE_CELL_HEIGHT,
-            f"**Email:** {user_data[3]}",
-            border=1,
-            align="L",
-            markdown=True,
-        )
-        pdf.cell(
-            pdf.epw / 2,
-            TABLE_CELL_HEIGHT,
-            f"**Mobile:** +91{user_data[4]}",
-            border=1,
-            align="L",
-            markdown=True,
-        )
-        pdf.ln(TABLE_CELL_HEIGHT)
-        pdf.cell(
-            pdf.epw / 2,
-            TABLE_CELL_HEIGHT,
-            f"**DoB:** {user_data[6]}",
-            border=1,
-            align="L",
-            markdown=True,
-        )
-        pdf.cell(pdf.epw / 2, TABLE_CELL_HEIGHT, "", border=1, align="L", markdown=True)
-        pdf.ln(TABLE_CELL_HEIGHT)
-        pdf.cell(pdf.epw / 2, TABLE_CELL_HEIGHT, "", border=1, align="L", markdown=True)
-        pdf.cell(
-            pdf.epw / 2,
-            TABLE_CELL_HEIGHT,
-            f"**Available Balance:** {user_data[9]:.2f}",
-            border=1,
-            align="L",
-            markdown=True,
-        )
-    pdf.ln(20)
-
-    pdf.set_font("helvetica", style="B", size=16)
-    pdf.cell(40, 10, "Account Statement")
-    pdf.ln(15)
-
-    pdf.set_font(style="", size=12)
-    pdf.cell(
-        pdf.epw / 2,
-        TABLE_CELL_HEIGHT,
-        f"**From Date:** {from_date}",
-        border=1,
-        align="L",
-        markdown=True,
-    )
-    pdf.cell(
-        pdf.epw / 2,
-        TABLE_CELL_HEIGHT,
-        f"**To Date:** {to_date}",
-        border=1,
-        align="L",
-        markdown=True,
+    user_data,
+    trans_data,
+    from_date: str,
+    to_date: str,
+    is_emp: bool = False,
+    balances: tuple = None,
+    totals: tuple = None,
+) -> str:
+    """Write the report to a temporary PDF file and return its path, trans_data can be any iterable of rows"""
+    import tempfile
+
+    from report import write_report
+
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as file:
+        try:
+            write_report(
+                file,
+                user_data,
+                trans_data,
+                from_date,
+                to_date,
+                is_emp,
+                logo_path=resource_path("assets\\images\\Mo Bank logo.JPG"),
+                balances=balances,
+                totals=totals,
+            )
+        except BaseException:
+            file.close()
+            os.remove(file.name)
+            raise
+    return file.name
+
+
+def report_rows(cursor, first_page: list, cancelled):
+    """Rows of a cursor read page by page while the report is written, stops when the task is cancelled"""
+    yield from first_page
+    while not cursor.exhausted:
+        if cancelled():
+            raise Cancelled()
+        yield from cursor.fetchmany(REPORT_FETCH_SIZE)
+
+
+def operator_summary(operator: int, from_date, to_date) -> list:
+    cr_val, db_val = bank.operator_totals(operator, from_date, to_date)
+    return [
+        {"Details": "Total Transaction", "Amount": str(Money(cr_val + db_val))},
+        {"Details": "Floating Amount", "Amount": str(Money(cr_val - db_val))},
+    ]
+
+
+#########################   Background page work   ##########################
+# These run on the worker threads, they only touch the database and never the widgets
+
+
+def load_statement(acc_no: int, from_date, to_date, cancelled) -> tuple:
+    """Cursor, first page and summary rows of an account statement"""
+    cursor = bank.statement_cursor(acc_no, from_date, to_date)
+    rows = cursor.fetchmany(FETCH_SIZE)
+    if not rows:
+        raise ServiceError("No Transactions found")
+    return cursor, rows, []
+
+
+def load_operator_transactions(operator: int, from_date, to_date, cancelled) -> tuple:
+    """Cursor, first page and summary rows of the transactions posted by an operator"""
+    cursor = bank.operator_cursor(operator, from_date, to_date)
+    rows = cursor.fetchmany(FETCH_SIZE)
+    if not rows:
+        raise ServiceError("No transactions found for today")
+    if cancelled():
+        raise Cancelled()
+    return cursor, rows, operator_summary(operator, from_date, to_date)
+
+
+def statement_report(acc_no: int, from_date, to_date, cancelled) -> str:
+    """Path of the PDF statement of an account"""
+    user_data = bank.get_account(acc_no)
+    cursor = bank.statement_cursor(acc_no, from_date, to_date)
+    rows = cursor.fetchmany(REPORT_FETCH_SIZE)
+    if not rows:
+        raise ServiceError("No Transactions found")
+    return generate_report(
+        user_data,
+        report_rows(cursor, rows, cancelled),
+        str(from_date),
+        str(to_date),
+        balances=bank.statement_balances(acc_no, from_date, to_date),
     )
-    pdf.ln(TABLE_CELL_HEIGHT)
 
-    pdf.cell(25, TABLE_CELL_HEIGHT, "**Date**", border=1, align="L", markdown=True)
-    pdf.cell(
-        69.60, TABLE_CELL_HEIGHT, "**Details**", border=1, align="L", markdown=True
+
+def operator_report(operator: int, from_date, to_date, cancelled) -> str:
+    """Path of the PDF report of the transactions posted by an employee"""
+    user_data = bank.get_employee(operator)
+    cursor = bank.operator_cursor(operator, from_date, to_date)
+    rows = cursor.fetchmany(REPORT_FETCH_SIZE)
+    if not rows:
+        raise ServiceError("No transactions found for today")
+    return generate_report(
+        user_data,
+        report_rows(cursor, rows, cancelled),
+        str(from_date),
+        str(to_date),
+        is_emp=True,
+        # The same cash-up as the operator's transaction view
+        totals=bank.operator_totals(operator, from_date, to_date),
     )
-    pdf.cell(30, TABLE_CELL_HEIGHT, "**Amount**", border=1, align="L", markdown=True)
-    pdf.cell(30, TABLE_CELL_HEIGHT, "**Operation**", border=1, align="L", markdown=True)
-    pdf.cell(30, TABLE_CELL_HEIGHT, "**Balance**", border=1, align="L", markdown=True)
-    pdf.ln(TABLE_CELL_HEIGHT)
-
-    pdf.set_font(size=11)
-    cr_val = 0
-    db_val = 0
-    for row in trans_data:
-        lines = math.ceil(pdf.get_string_width(row[7]) / 69.60)
-        row_height = TABLE_CELL_HEIGHT * lines
-        pdf.cell(25, row_height, row[2][:10], border=1, align="L")
-        pdf.cell(69.60, row_height, row[7], border=1, align="L")
-        pdf.cell(30, row_height, f"{row[5]:.2f}", border=1, align="L")
-        pdf.cell(30, row_height, row[3], border=1, align="L")
-        pdf.cell(30, row_height, f"{row[6]:.2f}", border=1, align="L")
-        pdf.ln(row_height)
-
-        if row[3] == "Cr":
-            cr_val += row[5]
-        elif row[3] == "Db":
-            db_val += row[5]
-
-    if is_emp:
-        pdf.ln(TABLE_CELL_HEIGHT)
-        pdf.cell(
-            pdf.epw / 2,
-            TABLE_CELL_HEIGHT,
-            f"**Total Transaction:** {cr_val + db_val:.2f}",
-            border=1,
-            align="L",
-            markdown=True,
-        )
-        pdf.cell(
-            pdf.epw / 2,
-            TABLE_CELL_HEIGHT,
-            f"**Floating Amount:** {cr_val - db_val:.2f}",
-            border=1,
-            align="L",
-            markdown=True,
-        )
-        pdf.ln(TABLE_CELL_HEIGHT)
 
-    # Create a temporary PDF file
-    temp_file_path = tempfile.NamedTemporaryFile(delete=False, suffix=".pdf").name
-    pdf.output(temp_file_path)
 
-    # Open the temporary PDF file in the default system PDF viewer
-    webbrowser.open(temp_file_path, new=2)
+def get_accounts(*acc_nos: int) -> list:
+    """AccountDetails rows of the accounts, None for those that don't exist"""
+    return [bank.get_account(acc_no) for acc_no in acc_nos]
+
+
+def update_kyc(acc_no: int, *details, own_account: bool = False):
+    """Update the KYC of an account, returns the fresh session when it is the logged in user's own"""
+    bank.update_kyc(acc_no, *details)
+    if own_account:
+        return bank.get_session(acc_no)
+    return None
 
 
 ########################   Function to open UI pages   ########################
@@ -524,13 +553,16 @@ def show_message_box(msg_type: str = "info", msg: str = ""):
         msg_box.setText("Information")
     msg_box.setInformativeText(msg)
     msg_box.setStandardButtons(QMessageBox.Close)
-    msg_box.exec_()
+    with ui_trace.modal("message box"):
+        msg_box.exec_()
 
 
+@ui_trace.handler
 def openIntroPage():
     main_win.stackedWidget.setCurrentIndex(0)
 
 
+@ui_trace.handler
 def openLoginPage():
     # Clear the input fields
     main_win.login.lineEdit.setText("")
@@ -539,12 +571,9 @@ def openLoginPage():
     main_win.stackedWidget.setCurrentIndex(1)
 
 
+@ui_trace.handler
 def openAccountDetailsPage():
-    conn = sql.Connection(DB_PATH)
-    query = f"""SELECT * FROM AccountDetails WHERE acc_no = {user_details["acc_no"]} LIMIT 1"""
-    ret = conn.execute(query)
-    data = ret.fetchone()
-    conn.close()
+    data = bank.get_account(user_details["acc_no"])
 
     main_win.acc_det.label_24.setText(str(user_details["acc_no"]))
     main_win.acc_det.label_17.setText(
@@ -573,7 +602,7 @@ def openAccountDetailsPage():
         acc_type = "Savings"
     main_win.acc_det.label_22.setText(acc_type)
 
-    main_win.acc_det.label_23.setText(f"₹{data[9]:.2f}")
+    main_win.acc_det.label_23.setText(f"₹{Money(data[9])}")
 
     main_win.acc_det.label_5.setText(
         user_details["prefix"] + " " + user_details["name"]
@@ -583,6 +612,7 @@ def openAccountDetailsPage():
     main_win.stackedWidget.setCurrentIndex(2)
 
 
+@ui_trace.handler
 def openCustomerWithdrawlPage():
     main_win.hldr_wdrl.label_9.setText("Enter Amount to Withdrawl")
 
@@ -594,10 +624,12 @@ def openCustomerWithdrawlPage():
     main_win.stackedWidget.setCurrentIndex(3)
 
 
+@ui_trace.handler
 def openCustomerTransPage():
-    main_win.customer_trans.dateEdit.setDate(datetime.now() - relativedelta(months=1))
+    main_win.customer_trans.dateEdit.setDate(QDate.currentDate().addMonths(-1))
     main_win.customer_trans.dateEdit_2.setDate(datetime.now())
-    main_win.customer_trans.tableWidget.setRowCount(0)
+    main_win.customer_trans.worker.cancel()
+    main_win.customer_trans.model.clear()
 
     main_win.customer_trans.label_5.setText(
         user_details["prefix"] + " " + user_details["name"]
@@ -607,6 +639,7 @@ def openCustomerTransPage():
     main_win.stackedWidget.setCurrentIndex(4)
 
 
+@ui_trace.handler
 def openSWO_DepositPage():
     if user_details["role"] == "C":
         show_message_box(
@@ -628,6 +661,7 @@ def openSWO_DepositPage():
     main_win.stackedWidget.setCurrentIndex(5)
 
 
+@ui_trace.handler
 def openSWO_WithdrawlPage():
     if user_details["role"] == "C":
         show_message_box(
@@ -649,6 +683,7 @@ def openSWO_WithdrawlPage():
     main_win.stackedWidget.setCurrentIndex(6)
 
 
+@ui_trace.handler
 def openSWO_TransferPage():
     if user_details["role"] == "C":
         show_message_box(
@@ -672,6 +707,7 @@ def openSWO_TransferPage():
     main_win.stackedWidget.setCurrentIndex(7)
 
 
+@ui_trace.handler
 def openSWO_TransPage():
     if user_details["role"] == "C":
         show_message_box(
@@ -680,10 +716,11 @@ def openSWO_TransPage():
         return
 
     main_win.swo_trans.lineEdit.setText("")
-    main_win.swo_trans.dateEdit.setDate(datetime.now() - relativedelta(months=1))
+    main_win.swo_trans.dateEdit.setDate(QDate.currentDate().addMonths(-1))
     main_win.swo_trans.dateEdit_2.setDate(datetime.now())
     main_win.swo_trans.label_12.setText("")
-    main_win.swo_trans.tableWidget.setRowCount(0)
+    main_win.swo_trans.worker.cancel()
+    main_win.swo_trans.model.clear()
 
     main_win.swo_trans.label_5.setText(
         user_details["prefix"] + " " + user_details["name"]
@@ -693,6 +730,7 @@ def openSWO_TransPage():
     main_win.stackedWidget.setCurrentIndex(8)
 
 
+@ui_trace.handler
 def openNewCustomerPage():
     if user_details["role"] != "A":
         show_message_box(msg_type="error", msg="Only Admins can access this page")
@@ -705,7 +743,7 @@ def openNewCustomerPage():
     main_win.admin_new_user.lineEdit_4.setText(generate_password())
     main_win.admin_new_user.comboBox.setCurrentIndex(0)
     main_win.admin_new_user.comboBox_2.setCurrentIndex(0)
-    main_win.admin_new_user.dateEdit.setDate(datetime.now() - relativedelta(years=18))
+    main_win.admin_new_user.dateEdit.setDate(QDate.currentDate().addYears(-18))
     main_win.admin_new_user.spinBox.setValue(100)
 
     main_win.admin_new_user.label_5.setText(
@@ -716,6 +754,7 @@ def openNewCustomerPage():
     main_win.stackedWidget.setCurrentIndex(9)
 
 
+@ui_trace.handler
 def openKYC_Page(clear_acc_no: bool = True):
     if user_details["role"] != "A":
         show_message_box(msg_type="error", msg="Only Admins can access this page")
@@ -731,7 +770,7 @@ def openKYC_Page(clear_acc_no: bool = True):
     main_win.admin_update.comboBox.setCurrentIndex(0)
     main_win.admin_update.comboBox_2.setCurrentIndex(0)
     main_win.admin_update.comboBox_3.setCurrentIndex(0)
-    main_win.admin_update.dateEdit.setDate(datetime.now() - relativedelta(years=18))
+    main_win.admin_update.dateEdit.setDate(QDate.currentDate().addYears(-18))
 
     main_win.admin_update.label_5.setText(
         user_details["prefix"] + " " + user_details["name"]
@@ -741,6 +780,7 @@ def openKYC_Page(clear_acc_no: bool = True):
     main_win.stackedWidget.setCurrentIndex(10)
 
 
+@ui_trace.handler
 def openTransactionPage():
     if user_details["role"] != "A":
         show_message_box(msg_type="error", msg="Only Admins can access this page")
@@ -749,9 +789,10 @@ def openTransactionPage():
     # Clear the input fields
     main_win.admin_trans.lineEdit.setText("")
     main_win.admin_trans.label_12.setText("")
-    main_win.admin_trans.dateEdit.setDate(datetime.now() - relativedelta(months=1))
+    main_win.admin_trans.dateEdit.setDate(QDate.currentDate().addMonths(-1))
     main_win.admin_trans.dateEdit_2.setDate(datetime.now())
-    main_win.admin_trans.tableWidget.setRowCount(0)
+    main_win.admin_trans.worker.cancel()
+    main_win.admin_trans.model.clear()
 
     main_win.admin_trans.label_5.setText(
         user_details["prefix"] + " " + user_details["name"]
@@ -762,36 +803,102 @@ def openTransactionPage():
 
 
 ########################   Functions used in UI pages   #######################
+def isCurrentPage(page: QWidget) -> bool:
+    return main_win.stackedWidget.currentWidget() is page
+
+
+@ui_trace.handler
+def showTransactions(page: QWidget, result: tuple, hide: tuple = ()):
+    cursor, rows, summary = result
+    page.model.load(cursor, summary, hide, first_page=rows)
+
+
+@ui_trace.handler
+def transactionsFailed(page: QWidget, err: Exception):
+    page.model.clear()
+    # show the error message
+    show_message_box(msg_type="error", msg=str(err))
+
+
+@ui_trace.handler
+def openQueryStats():
+    global query_stats_dialog
+
+    if user_details["role"] != "A":
+        show_message_box(msg_type="error", msg="Only Admins can access this page")
+        return
+
+    # One window kept open beside the pages, refreshed every time it is brought up
+    if query_stats_dialog is None:
+        from query_stats_dialog import QueryStatsDialog
+
+        query_stats_dialog = QueryStatsDialog(query_stats, main_win)
+        query_stats_dialog.setWindowIcon(
+            QIcon(resource_path("assets\\images\\Mo Bank logo.jpg"))
+        )
+    else:
+        query_stats_dialog.refresh()
+    query_stats_dialog.show()
+    query_stats_dialog.raise_()
+    query_stats_dialog.activateWindow()
+
+
+@ui_trace.handler
+def openReport(path: str):
+    # Open the temporary PDF file in the default system PDF viewer
+    import webbrowser
+
+    webbrowser.open(path, new=2)
+
+
+@ui_trace.handler
+def reportFailed(err: Exception):
+    # show the error message
+    show_message_box(msg_type="error", msg=str(err))
+
+
+@ui_trace.handler
 def openGithubRepo():
+    import webbrowser
+
     url = "https://github.com/AsutoshPati/MoBank"
     webbrowser.open(url, new=0, autoraise=True)
 
 
+@ui_trace.handler
 def openGithubProfile():
+    import webbrowser
+
     url = "https://github.com/AsutoshPati"
     webbrowser.open(url, new=0, autoraise=True)
 
 
+@ui_trace.handler
 def completeLogin():
-    global user_details, last_login_time
-
     user_info = main_win.login.lineEdit.text()
     password = main_win.login.lineEdit_2.text()
-    password = encrypt_password(password)
-
-    conn = sql.Connection(DB_PATH)
-    query = f"""SELECT * FROM AccountDetails WHERE (email = "{user_info}" OR mobile = "{user_info}") 
-    AND password = "{password}"  LIMIT 1;"""
-    ret = conn.execute(query)
-    det = ret.fetchone()
-    if det is not None:
-        user_details = {"acc_no": det[0], "name": det[2], "role": det[8]}
-        prefix = ""
-        if det[5] == "M":
-            prefix = "Mr. "
-        elif det[5] == "F":
-            prefix = "Mrs. "
-        user_details.update({"prefix": prefix})
+
+    main_win.login.worker.run(
+        bank.login,
+        user_info,
+        password,
+        on_result=loginDone,
+        on_error=loginFailed,
+    )
+
+
+@ui_trace.handler
+def loginDone(session):
+    global user_details, last_login_time
+
+    if not isCurrentPage(main_win.login):
+        # The user went back meanwhile, don't leave the session open
+        if session is not None:
+            bank.logout()
+        return
+
+    if session is not None:
+        user_details = session
 
         last_login_time = datetime.now().strftime("%d-%m-%Y %H:%M:%S")
 
@@ -801,17 +908,35 @@ def completeLogin():
     else:
         # show the error message
         show_message_box(msg_type="error", msg="Invalid credentials")
-    conn.close()
 
 
+@ui_trace.handler
+def loginFailed(err: Exception):
+    # show the error message
+    show_message_box(msg_type="error", msg=str(err))
+
+
+@ui_trace.handler
 def logout():
     global user_details, last_login_time
 
+    # Drop the statements and reports still being built for this user
+    for name in ["customer_trans", "swo_trans", "admin_trans"]:
+        if main_win.is_built(name):
+            getattr(main_win, name).worker.cancel()
+    if main_win.is_built("admin_update"):
+        main_win.admin_update.lookup.cancel()
+
+    if query_stats_dialog is not None:
+        query_stats_dialog.hide()
+
+    bank.logout()
     user_details = None
     last_login_time = None
     openIntroPage()
 
 
+@ui_trace.handler
 def updateWithdrawlAmount(val: str):
     amount = main_win.hldr_wdrl.label_9.text()
 
@@ -831,185 +956,144 @@ def updateWithdrawlAmount(val: str):
     main_win.hldr_wdrl.label_9.setText(amount)
 
 
+@ui_trace.handler
 def selfWithdrawl():
     try:
-        amount = float(main_win.hldr_wdrl.label_9.text())
+        amount = Money.from_rupees(main_win.hldr_wdrl.label_9.text())
     except ValueError:
         # show the error message
         show_message_box(msg_type="error", msg="Enter a valid amount")
         return
 
-    conn = sql.Connection(DB_PATH)
-    query = f"""SELECT * FROM AccountDetails WHERE acc_no = {user_details["acc_no"]} LIMIT 1;"""
-    ret = conn.execute(query)
-    data = ret.fetchone()
-    conn.close()
+    main_win.hldr_wdrl.worker.run(
+        bank.self_withdraw,
+        user_details["acc_no"],
+        amount,
+        on_result=selfWithdrawlDone,
+        on_error=selfWithdrawlFailed,
+    )
 
-    if data[9] < amount:
-        # show the error message
-        show_message_box(msg_type="error", msg="Insufficient Balance")
-        return
-    avail_bal = data[9] - amount
-
-    timestamp = str(datetime.now())
-    conn = sql.Connection(DB_PATH)
-    query = f"""INSERT INTO Transactions(acc_no, timestamp, operation, prev_bal, trans_amount, avail_bal, 
-    operation_details, operator) VALUES({user_details["acc_no"]}, "{timestamp}", "Db", {data[9]}, {amount}, {avail_bal}, 
-    "Withdrawl from ATM", {user_details["acc_no"]});"""
-    conn.execute(query)
-    query = f"""UPDATE AccountDetails SET curr_bal = {avail_bal} WHERE acc_no = {user_details["acc_no"]};"""
-    conn.execute(query)
-    conn.commit()
-    conn.close()
 
+@ui_trace.handler
+def selfWithdrawlDone(avail_bal: Money):
     show_message_box(msg=f"Transaction successful\nAvailable Balance: {avail_bal}")
-    openCustomerWithdrawlPage()
-
-
-def showCustomerTrans():
-    main_win.customer_trans.tableWidget.setRowCount(0)
-
-    from_dt = main_win.customer_trans.dateEdit.date().toString("yyyy-MM-dd")
-    to_dt = main_win.customer_trans.dateEdit_2.date().toString("yyyy-MM-dd")
-    to_dt += " 23:59:59"
+    if isCurrentPage(main_win.hldr_wdrl):
+        openCustomerWithdrawlPage()
 
-    py_from_dt = datetime.strptime(from_dt, "%Y-%m-%d")
-    py_to_dt = datetime.strptime(to_dt, "%Y-%m-%d %H:%M:%S")
 
-    if py_from_dt > py_to_dt:
-        # show the error message
-        show_message_box(msg_type="error", msg="From date can not exceed to date")
-        return
-
-    conn = sql.Connection(DB_PATH)
-    query = f"""SELECT * FROM Transactions WHERE acc_no = {user_details["acc_no"]} AND datetime(timestamp)
-    BETWEEN datetime("{py_from_dt}") AND datetime("{py_to_dt}");"""
-    ret = conn.execute(query)
-    data = ret.fetchall()
-    conn.close()
-
-    if not data:
-        # show the error message
-        show_message_box(msg_type="error", msg="No Transactions found")
-        return
+@ui_trace.handler
+def selfWithdrawlFailed(err: Exception):
+    if isinstance(err, ledger.InsufficientBalance):
+        msg = "Insufficient Balance"
+    elif isinstance(err, ledger.InvalidAmount):
+        msg = "Enter a valid amount"
+    else:
+        msg = str(err)
+    # show the error message
+    show_message_box(msg_type="error", msg=msg)
 
-    for row in data:
-        currentRow = main_win.customer_trans.tableWidget.rowCount()
-        main_win.customer_trans.tableWidget.setRowCount(currentRow + 1)
-        main_win.customer_trans.tableWidget.setItem(
-            currentRow, 0, QTableWidgetItem(str(row[2])[:10])
-        )
-        main_win.customer_trans.tableWidget.setItem(
-            currentRow, 1, QTableWidgetItem(str(row[7]))
-        )
-        main_win.customer_trans.tableWidget.setItem(
-            currentRow, 2, QTableWidgetItem(str(row[5]))
-        )
-        main_win.customer_trans.tableWidget.setItem(
-            currentRow, 3, QTableWidgetItem(str(row[3]))
-        )
-        main_win.customer_trans.tableWidget.setItem(
-            currentRow, 4, QTableWidgetItem(str(row[6]))
-        )
 
-    return data
+@ui_trace.handler
+def showCustomerTrans():
+    main_win.customer_trans.model.clear()
+    main_win.customer_trans.worker.run(
+        load_statement,
+        user_details["acc_no"],
+        main_win.customer_trans.dateEdit.date().toPyDate(),
+        main_win.customer_trans.dateEdit_2.date().toPyDate(),
+        on_result=partial(showTransactions, main_win.customer_trans),
+        on_error=partial(transactionsFailed, main_win.customer_trans),
+        cancellable=True,
+    )
 
 
+@ui_trace.handler
 def printCustomerTrans():
-    data = showCustomerTrans()
-
-    if not data:
-        return
-
-    conn = sql.Connection(DB_PATH)
-    query = f"""SELECT * FROM AccountDetails WHERE acc_no = {user_details["acc_no"]} LIMIT 1;"""
-    ret = conn.execute(query)
-    user_data = ret.fetchone()
-    conn.close()
-
-    generate_report(
-        user_data,
-        data,
-        main_win.customer_trans.dateEdit.date().toString("yyyy-MM-dd"),
-        main_win.customer_trans.dateEdit_2.date().toString("yyyy-MM-dd"),
+    main_win.customer_trans.worker.run(
+        statement_report,
+        user_details["acc_no"],
+        main_win.customer_trans.dateEdit.date().toPyDate(),
+        main_win.customer_trans.dateEdit_2.date().toPyDate(),
+        on_result=openReport,
+        on_error=reportFailed,
+        cancellable=True,
     )
 
 
-def fetchCustomerDetails(page: str):
-    acc_no = 0
-
+def holderAccounts(page: str) -> tuple:
+    """Page and the account numbers entered on it for a holder details lookup"""
     if page == "D":
-        acc_no = main_win.swo_dep.lineEdit.text()
+        return main_win.swo_dep, [main_win.swo_dep.lineEdit.text()]
     elif page == "W":
-        acc_no = main_win.swo_wdrl.lineEdit.text()
-    elif page == "TMS":
-        acc_no = main_win.swo_tf_mn.lineEdit.text()
-        if not validate_account_no(acc_no) or not validate_account_no(
-            main_win.swo_tf_mn.lineEdit_2.text()
-        ):
-            show_message_box(
-                msg_type="error", msg="Both Account Number should be valid"
-            )
-            return
-    elif page == "TMR":
-        acc_no = main_win.swo_tf_mn.lineEdit_2.text()
-        if not validate_account_no(acc_no) or not validate_account_no(
-            main_win.swo_tf_mn.lineEdit.text()
-        ):
-            return
+        return main_win.swo_wdrl, [main_win.swo_wdrl.lineEdit.text()]
+    elif page == "TM":
+        return main_win.swo_tf_mn, [
+            main_win.swo_tf_mn.lineEdit.text(),
+            main_win.swo_tf_mn.lineEdit_2.text(),
+        ]
     elif page == "T":
-        acc_no = main_win.swo_trans.lineEdit.text()
+        return main_win.swo_trans, [main_win.swo_trans.lineEdit.text()]
+
 
-    if not validate_account_no(acc_no) and page not in ["TMS", "TMR"]:
+@ui_trace.handler
+def fetchCustomerDetails(page: str, *, then=None):
+    _, acc_nos = holderAccounts(page)
+
+    if not all(validate_account_no(acc_no) for acc_no in acc_nos):
         # show the error message
-        show_message_box(msg_type="error", msg="Invalid Account Number")
+        if page == "TM":
+            show_message_box(
+                msg_type="error", msg="Both Account Number should be valid"
+            )
+        else:
+            show_message_box(msg_type="error", msg="Invalid Account Number")
         return
 
-    conn = sql.Connection(DB_PATH)
-    query = f"""SELECT * FROM AccountDetails WHERE acc_no = {acc_no} LIMIT 1;"""
-    ret = conn.execute(query)
-    data = ret.fetchone()
-    conn.close()
-
-    cust_name = ""
-    cust_mobile = ""
-    avail_bal = 0
-    if data is not None:
-        prefix = ""
-        if data[5] == "M":
-            prefix = "Mr. "
-        elif data[5] == "F":
-            prefix = "Mrs. "
-        cust_name += prefix
-        cust_name += data[2]
+    # Not on the page worker, the holder is refreshed while a failed posting still holds it
+    task = Task(get_accounts, *[int(acc_no) for acc_no in acc_nos])
+    task.succeeded.connect(partial(showCustomerDetails, page, acc_nos, then))
+    task.failed.connect(customerDetailsFailed)
+    task.start()
+
+
+@ui_trace.handler
+def showCustomerDetails(page: str, acc_nos: list, then, accounts: list):
+    page_widget, current_acc_nos = holderAccounts(page)
+    if not isCurrentPage(page_widget) or current_acc_nos != acc_nos:
+        return  # the page was left or the account numbers changed meanwhile
+
+    data = accounts[0]
+    if None not in accounts:
+        cust_name = name_prefix(data[5]) + data[2]
         cust_mobile = data[4]
-        avail_bal = float(data[9])
+        avail_bal = Money(data[9])
 
         if page == "D":
             main_win.swo_dep.label_10.setText(cust_name)
             main_win.swo_dep.label_11.setText(cust_mobile)
-            main_win.swo_dep.label_14.setText(f"₹{avail_bal:.2f}")
+            main_win.swo_dep.label_14.setText(f"₹{avail_bal}")
         elif page == "W":
             main_win.swo_wdrl.label_10.setText(cust_name)
             main_win.swo_wdrl.label_11.setText(cust_mobile)
-            main_win.swo_wdrl.label_14.setText(f"₹{avail_bal:.2f}")
-        elif page == "TMS":
+            main_win.swo_wdrl.label_14.setText(f"₹{avail_bal}")
+        elif page == "TM":
             main_win.swo_tf_mn.label_10.setText(cust_name)
             main_win.swo_tf_mn.label_11.setText(cust_mobile)
-            main_win.swo_tf_mn.label_14.setText(f"₹{avail_bal:.2f}")
-        elif page == "TMR":
-            main_win.swo_tf_mn.label_16.setText(cust_name)
+            main_win.swo_tf_mn.label_14.setText(f"₹{avail_bal}")
+            receiver = accounts[1]
+            main_win.swo_tf_mn.label_16.setText(name_prefix(receiver[5]) + receiver[2])
         elif page == "T":
             main_win.swo_trans.label_12.setText(cust_name)
 
+        if then is not None:
+            then()
+
     else:
         if page == "D":
             openSWO_DepositPage()
         elif page == "W":
             openSWO_WithdrawlPage()
-        elif page == "TMS":
-            openSWO_TransferPage()
-        elif page == "TMR":
+        elif page == "TM":
             openSWO_TransferPage()
         elif page == "T":
             openSWO_TransPage()
@@ -1017,10 +1101,17 @@ def fetchCustomerDetails(page: str):
         show_message_box(msg_type="error", msg="Account Not Found")
 
 
+@ui_trace.handler
+def customerDetailsFailed(err: Exception):
+    # show the error message
+    show_message_box(msg_type="error", msg=str(err))
+
+
+@ui_trace.handler
 def officeDeposit():
     acc_no = main_win.swo_dep.lineEdit.text()
     holder_name = main_win.swo_dep.label_10.text()
-    dep_amt = main_win.swo_dep.spinBox.value()
+    dep_amt = Money.from_rupees(main_win.swo_dep.spinBox.value())
 
     if not validate_account_no(acc_no):
         # show the error message
@@ -1032,49 +1123,42 @@ def officeDeposit():
         show_message_box(msg_type="error", msg="Check out holder details first")
         return
 
-    if user_details["acc_no"] == int(acc_no):
-        # show the error message
-        show_message_box(msg_type="error", msg="Transaction not allowed for self")
-        return
+    main_win.swo_dep.worker.run(
+        bank.deposit,
+        int(acc_no),
+        dep_amt,
+        user_details["acc_no"],
+        on_result=officeDepositDone,
+        on_error=partial(officeDepositFailed, acc_no),
+    )
 
-    conn = sql.Connection(DB_PATH)
-    query = f"""SELECT * FROM AccountDetails WHERE acc_no = {acc_no} LIMIT 1;"""
-    ret = conn.execute(query)
-    data = ret.fetchone()
-    conn.close()
 
-    if not data:
+@ui_trace.handler
+def officeDepositDone(avail_bal: Money):
+    show_message_box(msg=f"Transaction successful\nAvailable Balance: {avail_bal}")
+    if isCurrentPage(main_win.swo_dep):
+        openSWO_DepositPage()
+
+
+@ui_trace.handler
+def officeDepositFailed(acc_no: str, err: Exception):
+    if isinstance(err, ledger.AccountNotFound):
         # show the error message
         show_message_box(msg_type="error", msg="Account not found")
-        openSWO_DepositPage()
-        main_win.swo_dep.lineEdit.setText(str(acc_no))
+        if isCurrentPage(main_win.swo_dep):
+            openSWO_DepositPage()
+            main_win.swo_dep.lineEdit.setText(str(acc_no))
         return
-    else:
-        fetchCustomerDetails("D")
-
-    avail_bal = data[9] + dep_amt
-
-    timestamp = str(datetime.now())
-    conn = sql.Connection(DB_PATH)
-    query = f"""INSERT INTO Transactions(acc_no, timestamp, operation, prev_bal, trans_amount, avail_bal, 
-    operation_details, operator) VALUES({acc_no}, "{timestamp}", "Cr", {data[9]}, {dep_amt}, {avail_bal}, 
-    "Deposit at Bank", {user_details["acc_no"]});"""
-    conn.execute(query)
-    query = (
-        f"""UPDATE AccountDetails SET curr_bal = {avail_bal} WHERE acc_no = {acc_no};"""
-    )
-    conn.execute(query)
-    conn.commit()
-    conn.close()
 
-    show_message_box(msg=f"Transaction successful\nAvailable Balance: {avail_bal}")
-    openSWO_DepositPage()
+    # show the error message
+    show_message_box(msg_type="error", msg=str(err))
 
 
+@ui_trace.handler
 def officeWithdrawl():
     acc_no = main_win.swo_wdrl.lineEdit.text()
     holder_name = main_win.swo_wdrl.label_10.text()
-    wdrl_amt = main_win.swo_wdrl.spinBox.value()
+    wdrl_amt = Money.from_rupees(main_win.swo_wdrl.spinBox.value())
 
     if not validate_account_no(acc_no):
         # show the error message
@@ -1086,55 +1170,51 @@ def officeWithdrawl():
         show_message_box(msg_type="error", msg="Check out holder details first")
         return
 
-    if user_details["acc_no"] == int(acc_no):
-        # show the error message
-        show_message_box(msg_type="error", msg="Transaction not allowed for self")
-        return
+    main_win.swo_wdrl.worker.run(
+        bank.withdraw,
+        int(acc_no),
+        wdrl_amt,
+        user_details["acc_no"],
+        on_result=officeWithdrawlDone,
+        on_error=partial(officeWithdrawlFailed, acc_no),
+    )
+
+
+@ui_trace.handler
+def officeWithdrawlDone(avail_bal: Money):
+    show_message_box(msg=f"Transaction successful\nAvailable Balance: {avail_bal}")
+    if isCurrentPage(main_win.swo_wdrl):
+        openSWO_WithdrawlPage()
 
-    conn = sql.Connection(DB_PATH)
-    query = f"""SELECT * FROM AccountDetails WHERE acc_no = {acc_no} LIMIT 1;"""
-    ret = conn.execute(query)
-    data = ret.fetchone()
-    conn.close()
 
-    if not data:
+@ui_trace.handler
+def officeWithdrawlFailed(acc_no: str, err: Exception):
+    if isinstance(err, ledger.AccountNotFound):
         # show the error message
         show_message_box(msg_type="error", msg="Account not found")
-        openSWO_WithdrawlPage()
-        main_win.swo_wdrl.lineEdit.setText(str(acc_no))
+        if isCurrentPage(main_win.swo_wdrl):
+            openSWO_WithdrawlPage()
+            main_win.swo_wdrl.lineEdit.setText(str(acc_no))
         return
-    else:
-        fetchCustomerDetails("W")
 
-    if data[9] < wdrl_amt:
-        # show the error message
+    if isinstance(err, ledger.InsufficientBalance):
+        # refresh the holder details and show the error message
+        if isCurrentPage(main_win.swo_wdrl):
+            fetchCustomerDetails("W")
         show_message_box(msg_type="error", msg="Insufficient Balance")
         return
-    avail_bal = data[9] - wdrl_amt
-
-    timestamp = str(datetime.now())
-    conn = sql.Connection(DB_PATH)
-    query = f"""INSERT INTO Transactions(acc_no, timestamp, operation, prev_bal, trans_amount, avail_bal, 
-    operation_details, operator) VALUES({acc_no}, "{timestamp}", "Db", {data[9]}, {wdrl_amt}, {avail_bal}, 
-    "Withdrawl at Bank", {user_details["acc_no"]});"""
-    conn.execute(query)
-    query = (
-        f"""UPDATE AccountDetails SET curr_bal = {avail_bal} WHERE acc_no = {acc_no};"""
-    )
-    conn.execute(query)
-    conn.commit()
-    conn.close()
 
-    show_message_box(msg=f"Transaction successful\nAvailable Balance: {avail_bal}")
-    openSWO_WithdrawlPage()
+    # show the error message
+    show_message_box(msg_type="error", msg=str(err))
 
 
+@ui_trace.handler
 def officeTransfer():
     sender_acc_no = main_win.swo_tf_mn.lineEdit.text()
     receiver_acc_no = main_win.swo_tf_mn.lineEdit_2.text()
     sender_name = main_win.swo_tf_mn.label_10.text()
     receiver_name = main_win.swo_tf_mn.label_16.text()
-    transfer_amt = main_win.swo_tf_mn.spinBox.value()
+    transfer_amt = Money.from_rupees(main_win.swo_tf_mn.spinBox.value())
 
     if not validate_account_no(sender_acc_no) or not validate_account_no(
         receiver_acc_no
@@ -1148,224 +1228,103 @@ def officeTransfer():
         show_message_box(msg_type="error", msg="Check out holder details first")
         return
 
-    if user_details["acc_no"] == int(sender_acc_no):
-        # show the error message
-        show_message_box(msg_type="error", msg="Transaction not allowed for self")
-        return
-
-    if int(sender_acc_no) == int(receiver_acc_no):
-        # show the error message
-        show_message_box(msg_type="error", msg="Can not transfer to same account")
-        return
+    main_win.swo_tf_mn.worker.run(
+        bank.transfer,
+        int(sender_acc_no),
+        int(receiver_acc_no),
+        transfer_amt,
+        user_details["acc_no"],
+        on_result=officeTransferDone,
+        on_error=partial(officeTransferFailed, sender_acc_no, receiver_acc_no),
+    )
 
-    conn = sql.Connection(DB_PATH)
-    query = f"""SELECT * FROM AccountDetails WHERE acc_no = {sender_acc_no} LIMIT 1;"""
-    ret = conn.execute(query)
-    sender_data = ret.fetchone()
-    conn.close()
 
-    if not sender_data:
-        # show the error message
-        show_message_box(msg_type="error", msg="Sender account not found")
+@ui_trace.handler
+def officeTransferDone(sender_avail_bal: Money):
+    show_message_box(
+        msg=f"Transaction successful\nAvailable Balance: {sender_avail_bal}"
+    )
+    if isCurrentPage(main_win.swo_tf_mn):
         openSWO_TransferPage()
-        main_win.swo_tf_mn.lineEdit.setText(str(sender_acc_no))
-        main_win.swo_tf_mn.lineEdit_2.setText(str(receiver_acc_no))
-        return
-    else:
-        fetchCustomerDetails("TMS")
 
-    conn = sql.Connection(DB_PATH)
-    query = (
-        f"""SELECT * FROM AccountDetails WHERE acc_no = {receiver_acc_no} LIMIT 1;"""
-    )
-    ret = conn.execute(query)
-    receiver_data = ret.fetchone()
-    conn.close()
 
-    if not receiver_data:
+@ui_trace.handler
+def officeTransferFailed(sender_acc_no: str, receiver_acc_no: str, err: Exception):
+    if isinstance(err, ledger.AccountNotFound):
         # show the error message
-        show_message_box(msg_type="error", msg="Receiver account not found")
-        openSWO_TransferPage()
-        main_win.swo_tf_mn.lineEdit.setText(str(sender_acc_no))
-        main_win.swo_tf_mn.lineEdit_2.setText(str(receiver_acc_no))
+        if err.acc_no == int(sender_acc_no):
+            show_message_box(msg_type="error", msg="Sender account not found")
+        else:
+            show_message_box(msg_type="error", msg="Receiver account not found")
+        if isCurrentPage(main_win.swo_tf_mn):
+            openSWO_TransferPage()
+            main_win.swo_tf_mn.lineEdit.setText(str(sender_acc_no))
+            main_win.swo_tf_mn.lineEdit_2.setText(str(receiver_acc_no))
         return
-    else:
-        fetchCustomerDetails("TMR")
 
-    if sender_data[9] < transfer_amt:
-        # show the error message
+    if isinstance(err, ledger.InsufficientBalance):
+        # refresh the holder details and show the error message
+        if isCurrentPage(main_win.swo_tf_mn):
+            fetchCustomerDetails("TM")
         show_message_box(msg_type="error", msg="Insufficient Balance")
         return
 
-    sender_avail_bal = sender_data[9] - transfer_amt
-    receiver_avail_bal = receiver_data[9] + transfer_amt
-
-    timestamp = str(datetime.now())
-    conn = sql.Connection(DB_PATH)
-    query = f"""INSERT INTO Transactions(acc_no, timestamp, operation, prev_bal, trans_amount, avail_bal, 
-    operation_details, operator) VALUES({sender_acc_no}, "{timestamp}", "Db", {sender_data[9]}, {transfer_amt}, 
-    {sender_avail_bal}, "Transferred to {receiver_acc_no}", {user_details["acc_no"]});"""
-    conn.execute(query)
-    query = f"""UPDATE AccountDetails SET curr_bal = {sender_avail_bal} WHERE acc_no = {sender_acc_no};"""
-    conn.execute(query)
-    query = f"""INSERT INTO Transactions(acc_no, timestamp, operation, prev_bal, trans_amount, avail_bal, 
-    operation_details, operator) VALUES({receiver_acc_no}, "{timestamp}", "Cr", {receiver_data[9]}, {transfer_amt}, 
-    {receiver_avail_bal}, "Transferred from {sender_acc_no}", {user_details["acc_no"]});"""
-    conn.execute(query)
-    query = f"""UPDATE AccountDetails SET curr_bal = {receiver_avail_bal} WHERE acc_no = {receiver_acc_no};"""
-    conn.execute(query)
-    conn.commit()
-    conn.close()
-
-    show_message_box(
-        msg=f"Transaction successful\nAvailable Balance: {sender_avail_bal}"
-    )
-    openSWO_TransferPage()
+    # show the error message
+    show_message_box(msg_type="error", msg=str(err))
 
 
+@ui_trace.handler
 def officeTrans():
     openSWO_TransPage()
 
     today = datetime.now().date()
-    start_of_day = datetime.combine(today, datetime.min.time())
-    end_of_day = datetime.combine(today, datetime.max.time())
-
-    conn = sql.Connection(DB_PATH)
-    query = f"""SELECT * FROM Transactions WHERE operator = {user_details["acc_no"]} AND datetime(timestamp)
-    BETWEEN datetime("{start_of_day}") AND datetime("{end_of_day}");"""
-    ret = conn.execute(query)
-    data = ret.fetchall()
-    conn.close()
-
-    if not data:
-        # show the error message
-        show_message_box(msg_type="error", msg="No transactions found for today")
-        return
-
-    cr_val = 0
-    db_val = 0
-    for row in data:
-        currentRow = main_win.swo_trans.tableWidget.rowCount()
-        main_win.swo_trans.tableWidget.setRowCount(currentRow + 1)
-        main_win.swo_trans.tableWidget.setItem(
-            currentRow, 0, QTableWidgetItem(str(row[2])[:10])
-        )
-        main_win.swo_trans.tableWidget.setItem(
-            currentRow, 1, QTableWidgetItem(str(row[7]))
-        )
-        main_win.swo_trans.tableWidget.setItem(
-            currentRow, 2, QTableWidgetItem(str(row[5]))
-        )
-        main_win.swo_trans.tableWidget.setItem(
-            currentRow, 3, QTableWidgetItem(str(row[3]))
-        )
-        main_win.swo_trans.tableWidget.setItem(currentRow, 4, QTableWidgetItem(""))
-
-        if row[3] == "Cr":
-            cr_val += row[5]
-        elif row[3] == "Db":
-            db_val += row[5]
-
-    currentRow = main_win.swo_trans.tableWidget.rowCount()
-    main_win.swo_trans.tableWidget.setRowCount(currentRow + 1)
-    main_win.swo_trans.tableWidget.setItem(currentRow, 0, QTableWidgetItem(""))
-    main_win.swo_trans.tableWidget.setItem(
-        currentRow, 1, QTableWidgetItem("Total Transaction")
-    )
-    main_win.swo_trans.tableWidget.setItem(
-        currentRow, 2, QTableWidgetItem(str(cr_val + db_val))
-    )
-    main_win.swo_trans.tableWidget.setItem(currentRow, 3, QTableWidgetItem(""))
-    main_win.swo_trans.tableWidget.setItem(currentRow, 4, QTableWidgetItem(""))
-
-    currentRow = main_win.swo_trans.tableWidget.rowCount()
-    main_win.swo_trans.tableWidget.setRowCount(currentRow + 1)
-    main_win.swo_trans.tableWidget.setItem(currentRow, 0, QTableWidgetItem(""))
-    main_win.swo_trans.tableWidget.setItem(
-        currentRow, 1, QTableWidgetItem("Floating Amount")
+    main_win.swo_trans.worker.run(
+        load_operator_transactions,
+        user_details["acc_no"],
+        today,
+        today,
+        on_result=partial(showTransactions, main_win.swo_trans, hide=["Balance"]),
+        on_error=partial(transactionsFailed, main_win.swo_trans),
+        cancellable=True,
     )
-    main_win.swo_trans.tableWidget.setItem(
-        currentRow, 2, QTableWidgetItem(str(cr_val - db_val))
-    )
-    main_win.swo_trans.tableWidget.setItem(currentRow, 3, QTableWidgetItem(""))
-    main_win.swo_trans.tableWidget.setItem(currentRow, 4, QTableWidgetItem(""))
 
 
+@ui_trace.handler
 def customerTrans():
-    fetchCustomerDetails("T")
-    main_win.swo_trans.tableWidget.setRowCount(0)
-
-    if not main_win.swo_trans.label_12.text():
-        return
-
-    acc_no = main_win.swo_trans.lineEdit.text()
-
-    from_dt = main_win.swo_trans.dateEdit.date().toString("yyyy-MM-dd")
-    to_dt = main_win.swo_trans.dateEdit_2.date().toString("yyyy-MM-dd")
-    to_dt += " 23:59:59"
-
-    py_from_dt = datetime.strptime(from_dt, "%Y-%m-%d")
-    py_to_dt = datetime.strptime(to_dt, "%Y-%m-%d %H:%M:%S")
-
-    if py_from_dt > py_to_dt:
-        # show the error message
-        show_message_box(msg_type="error", msg="From date can not exceed to date")
-        return
-
-    conn = sql.Connection(DB_PATH)
-    query = f"""SELECT * FROM Transactions WHERE acc_no = {acc_no} AND datetime(timestamp)
-    BETWEEN datetime("{py_from_dt}") AND datetime("{py_to_dt}");"""
-    ret = conn.execute(query)
-    data = ret.fetchall()
-    conn.close()
-
-    if not data:
-        # show the error message
-        show_message_box(msg_type="error", msg="No Transactions found")
-        return
-
-    for row in data:
-        currentRow = main_win.swo_trans.tableWidget.rowCount()
-        main_win.swo_trans.tableWidget.setRowCount(currentRow + 1)
-        main_win.swo_trans.tableWidget.setItem(
-            currentRow, 0, QTableWidgetItem(str(row[2])[:10])
-        )
-        main_win.swo_trans.tableWidget.setItem(
-            currentRow, 1, QTableWidgetItem(str(row[7]))
-        )
-        main_win.swo_trans.tableWidget.setItem(
-            currentRow, 2, QTableWidgetItem(str(row[5]))
-        )
-        main_win.swo_trans.tableWidget.setItem(
-            currentRow, 3, QTableWidgetItem(str(row[3]))
-        )
-        main_win.swo_trans.tableWidget.setItem(
-            currentRow, 4, QTableWidgetItem(str(row[6]))
-        )
-
-    return data
+    main_win.swo_trans.model.clear()
+    fetchCustomerDetails("T", then=loadCustomerTransFromSWO)
+
+
+def loadCustomerTransFromSWO():
+    main_win.swo_trans.worker.run(
+        load_statement,
+        int(main_win.swo_trans.lineEdit.text()),
+        main_win.swo_trans.dateEdit.date().toPyDate(),
+        main_win.swo_trans.dateEdit_2.date().toPyDate(),
+        on_result=partial(showTransactions, main_win.swo_trans),
+        on_error=partial(transactionsFailed, main_win.swo_trans),
+        cancellable=True,
+    )
 
 
+@ui_trace.handler
 def printCustomerTransFromSWO():
-    data = customerTrans()
-
-    if not data:
-        return
-
-    conn = sql.Connection(DB_PATH)
-    query = f"""SELECT * FROM AccountDetails WHERE acc_no = {main_win.swo_trans.lineEdit.text()} LIMIT 1;"""
-    ret = conn.execute(query)
-    user_data = ret.fetchone()
-    conn.close()
-
-    generate_report(
-        user_data,
-        data,
-        main_win.swo_trans.dateEdit.date().toString("yyyy-MM-dd"),
-        main_win.swo_trans.dateEdit_2.date().toString("yyyy-MM-dd"),
+    fetchCustomerDetails("T", then=reportCustomerTransFromSWO)
+
+
+def reportCustomerTransFromSWO():
+    main_win.swo_trans.worker.run(
+        statement_report,
+        int(main_win.swo_trans.lineEdit.text()),
+        main_win.swo_trans.dateEdit.date().toPyDate(),
+        main_win.swo_trans.dateEdit_2.date().toPyDate(),
+        on_result=openReport,
+        on_error=reportFailed,
+        cancellable=True,
     )
 
 
+@ui_trace.handler
 def addCustomer():
     cust_name = main_win.admin_new_user.lineEdit.text()
     cust_email = main_win.admin_new_user.lineEdit_2.text()
@@ -1373,22 +1332,9 @@ def addCustomer():
     cust_gender = main_win.admin_new_user.comboBox.currentText()
     cust_dob = main_win.admin_new_user.dateEdit.date().toString("yyyy-MM-dd")
     acc_type = main_win.admin_new_user.comboBox_2.currentText()
-    open_bal = main_win.admin_new_user.spinBox.value()
+    open_bal = Money.from_rupees(main_win.admin_new_user.spinBox.value())
     cust_pwd = main_win.admin_new_user.lineEdit_4.text()
 
-    ret, err_msg = validate_fullname(cust_name)
-    if not ret:
-        show_message_box(msg_type="error", msg=err_msg)
-        return
-
-    if not validate_email(cust_email):
-        show_message_box(msg_type="error", msg="Please provide a valid mail")
-        return
-
-    if not validate_mobile(cust_mobile):
-        show_message_box(msg_type="error", msg="Please provide a valid mobile number")
-        return
-
     if cust_gender == "Male":
         cust_gender = "M"
     elif cust_gender == "Female":
@@ -1401,59 +1347,80 @@ def addCustomer():
     else:
         acc_type = "S"
 
-    ret, err_msg = validate_password(cust_pwd)
-    if not ret:
-        show_message_box(msg_type="error", msg=err_msg)
-        return
+    main_win.admin_new_user.worker.run(
+        bank.open_account,
+        cust_name,
+        cust_email,
+        cust_mobile,
+        cust_gender,
+        cust_dob,
+        acc_type,
+        open_bal,
+        cust_pwd,
+        operator=user_details["acc_no"],
+        on_result=partial(addCustomerDone, cust_pwd),
+        on_error=addCustomerFailed,
+    )
 
-    conn = sql.Connection(DB_PATH)
-    try:
-        # Add information to DB
-        query = f"""INSERT INTO AccountDetails(acc_type, full_name, email, mobile, gender, dob, password, user_type, 
-        curr_bal) VALUES("{acc_type}", "{cust_name}", "{cust_email}", "{cust_mobile}", "{cust_gender}", 
-        "{cust_dob}", "{encrypt_password(cust_pwd)}", "C", {open_bal});"""
-        conn.execute(query)
-        query = "SELECT last_insert_rowid()"
-        ret = conn.execute(query)
-        cust_acc_no = ret.fetchone()[0]
-        timestamp = str(datetime.now())
-        query = f"""INSERT INTO Transactions(acc_no, timestamp, operation, prev_bal, trans_amount, avail_bal, 
-        operation_details, operator) VALUES({cust_acc_no}, "{timestamp}", "Cr", 0.0, {open_bal}, {open_bal}, 
-        "Account opening balance", {user_details["acc_no"]});"""
-        conn.execute(query)
-        conn.commit()
-    except sql.IntegrityError as err:
-        if "AccountDetails.mobile" in str(err):
-            show_message_box(msg_type="error", msg="Mobile number already exists")
-        if "AccountDetails.email" in str(err):
-            show_message_box(msg_type="error", msg="Email already exists")
-    else:
+
+@ui_trace.handler
+def addCustomerDone(cust_pwd: str, cust_acc_no: int):
+    # An earlier lookup may have found no account under the new number
+    if main_win.is_built("admin_update"):
+        main_win.admin_update.lookup.clear()
+    if isCurrentPage(main_win.admin_new_user):
         openNewCustomerPage()
-        show_message_box(
-            msg=f"Customer Account created\nAccount No. {cust_acc_no}\nPassword: {cust_pwd}"
-        )
-    conn.close()
+    show_message_box(
+        msg=f"Customer Account created\nAccount No. {cust_acc_no}\nPassword: {cust_pwd}"
+    )
+
+
+@ui_trace.handler
+def addCustomerFailed(err: Exception):
+    # show the error message
+    show_message_box(msg_type="error", msg=str(err))
 
 
+@ui_trace.handler
 def fetchKYCdata():
+    requestKYCdata()
+
+
+@ui_trace.handler
+def fetchKYCdataWithError():
+    requestKYCdata(delay=0, report_missing=True)
+
+
+def requestKYCdata(delay: int = None, report_missing: bool = False):
     acc_no = main_win.admin_update.lineEdit.text()
     if len(acc_no) < 6:
+        main_win.admin_update.lookup.cancel()
         return
 
     if not validate_account_no(acc_no):
+        main_win.admin_update.lookup.cancel()
         openKYC_Page(clear_acc_no=False)
         # show the error message
         show_message_box(msg_type="error", msg="Invalid Account Number")
         return
 
-    conn = sql.Connection(DB_PATH)
-    query = f"""SELECT * FROM AccountDetails WHERE acc_no = {acc_no} LIMIT 1"""
-    ret = conn.execute(query)
-    data = ret.fetchone()
-    conn.close()
+    main_win.admin_update.lookup.request(
+        int(acc_no),
+        on_result=partial(showKYCdata, report_missing),
+        on_error=kycLookupFailed,
+        delay=delay,
+    )
+
+
+@ui_trace.handler
+def showKYCdata(report_missing: bool, data):
+    if not isCurrentPage(main_win.admin_update):
+        return
 
     if data is None:
         openKYC_Page(clear_acc_no=False)
+        if report_missing:
+            show_message_box(msg_type="error", msg="Account not found")
         return
 
     main_win.admin_update.lineEdit_2.setText(data[2])
@@ -1489,15 +1456,14 @@ def fetchKYCdata():
     main_win.admin_update.dateEdit.setDate(QDate.fromString(data[6], "yyyy-MM-dd"))
 
 
-def fetchKYCdataWithError():
-    fetchKYCdata()
-    if not main_win.admin_update.lineEdit_2.text():
-        show_message_box(msg_type="error", msg="Account not found")
+@ui_trace.handler
+def kycLookupFailed(err: Exception):
+    # show the error message
+    show_message_box(msg_type="error", msg=str(err))
 
 
+@ui_trace.handler
 def updateKYC():
-    global user_details
-
     acc_no = main_win.admin_update.lineEdit.text()
     if not validate_account_no(acc_no):
         openKYC_Page(clear_acc_no=False)
@@ -1514,19 +1480,6 @@ def updateKYC():
     user_type = main_win.admin_update.comboBox_3.currentText()
     cust_pwd = main_win.admin_update.lineEdit_5.text()
 
-    ret, err_msg = validate_fullname(cust_name)
-    if not ret:
-        show_message_box(msg_type="error", msg=err_msg)
-        return
-
-    if not validate_email(cust_email):
-        show_message_box(msg_type="error", msg="Please provide a valid mail")
-        return
-
-    if not validate_mobile(cust_mobile):
-        show_message_box(msg_type="error", msg="Please provide a valid mobile number")
-        return
-
     if cust_gender == "Male":
         cust_gender = "M"
     elif cust_gender == "Female":
@@ -1546,46 +1499,47 @@ def updateKYC():
     else:
         user_type = "S"
 
-    ret, err_msg = validate_password(cust_pwd)
-    if not ret:
-        show_message_box(msg_type="error", msg=err_msg)
-        return
+    main_win.admin_update.worker.run(
+        update_kyc,
+        int(acc_no),
+        cust_name,
+        cust_email,
+        cust_mobile,
+        cust_gender,
+        cust_dob,
+        acc_type,
+        user_type,
+        cust_pwd,
+        # Refresh the session if the logged in user updates their own details
+        own_account=int(acc_no) == user_details["acc_no"],
+        on_result=updateKYCDone,
+        on_error=updateKYCFailed,
+    )
 
-    conn = sql.Connection(DB_PATH)
-    try:
-        query = f"""UPDATE AccountDetails SET acc_type = "{acc_type}", full_name = "{cust_name}", 
-        email = "{cust_email}", mobile = "{cust_mobile}", gender = "{cust_gender}", dob = "{cust_dob}", 
-        password = "{encrypt_password(cust_pwd)}", user_type = "{user_type}" WHERE acc_no = {acc_no};"""
-        conn.execute(query)
-        conn.commit()
-    except sql.IntegrityError as err:
-        if "AccountDetails.mobile" in str(err):
-            show_message_box(msg_type="error", msg="Mobile number already exists")
-        if "AccountDetails.email" in str(err):
-            show_message_box(msg_type="error", msg="Email already exists")
-    else:
+
+@ui_trace.handler
+def updateKYCDone(session):
+    global user_details
+
+    if session is not None and user_details is not None:
+        if session["acc_no"] == user_details["acc_no"]:
+            user_details = session
+
+    main_win.admin_update.lookup.clear()
+    if isCurrentPage(main_win.admin_update):
         openKYC_Page()
-        show_message_box(msg="Customer Details Updated")
-    conn.close()
-
-    if acc_no == user_details["acc_no"]:
-        conn = sql.Connection(DB_PATH)
-        query = f"""SELECT * FROM AccountDetails WHERE acc_no = {acc_no}  LIMIT 1;"""
-        ret = conn.execute(query)
-        det = ret.fetchone()
-        if det is not None:
-            user_details = {"acc_no": det[0], "name": det[2], "role": det[8]}
-            prefix = ""
-            if det[5] == "M":
-                prefix = "Mr. "
-            elif det[5] == "F":
-                prefix = "Mrs. "
-            user_details.update({"prefix": prefix})
-        conn.close()
+    show_message_box(msg="Customer Details Updated")
+
+
+@ui_trace.handler
+def updateKYCFailed(err: Exception):
+    # show the error message
+    show_message_box(msg_type="error", msg=str(err))
 
 
+@ui_trace.handler
 def showEmployeeTransactions():
-    main_win.admin_trans.tableWidget.setRowCount(0)
+    main_win.admin_trans.model.clear()
 
     acc_no = main_win.admin_trans.lineEdit.text()
 
@@ -1593,115 +1547,194 @@ def showEmployeeTransactions():
         show_message_box(msg_type="error", msg="Invalid Account Number")
         return
 
-    conn = sql.Connection(DB_PATH)
-    query = f"""SELECT * FROM AccountDetails WHERE acc_no = {acc_no}  LIMIT 1;"""
-    ret = conn.execute(query)
-    user_data = ret.fetchone()
-    conn.close()
-
-    if user_data and user_data[8] in ["A", "S"]:
-        pass
-    else:
-        show_message_box(
-            msg_type="error",
-            msg="Only employees (Admin/SWO) transanctions can be checked here",
-        )
+    try:
+        user_data = bank.get_employee(int(acc_no))
+    except ServiceError as err:
+        show_message_box(msg_type="error", msg=str(err))
         return
 
-    from_dt = main_win.admin_trans.dateEdit.date().toString("yyyy-MM-dd")
-    to_dt = main_win.admin_trans.dateEdit_2.date().toString("yyyy-MM-dd")
-    to_dt += " 23:59:59"
+    main_win.admin_trans.label_12.setText(user_data[2])
 
-    py_from_dt = datetime.strptime(from_dt, "%Y-%m-%d")
-    py_to_dt = datetime.strptime(to_dt, "%Y-%m-%d %H:%M:%S")
+    main_win.admin_trans.worker.run(
+        load_operator_transactions,
+        int(acc_no),
+        main_win.admin_trans.dateEdit.date().toPyDate(),
+        main_win.admin_trans.dateEdit_2.date().toPyDate(),
+        on_result=partial(showTransactions, main_win.admin_trans),
+        on_error=partial(transactionsFailed, main_win.admin_trans),
+        cancellable=True,
+    )
 
-    if py_from_dt > py_to_dt:
-        # show the error message
-        show_message_box(msg_type="error", msg="From date can not exceed to date")
+
+@ui_trace.handler
+def printTransactions():
+    acc_no = main_win.admin_trans.lineEdit.text()
+
+    if not validate_account_no(acc_no):
+        show_message_box(msg_type="error", msg="Invalid Account Number")
         return
 
-    main_win.admin_trans.label_12.setText(user_data[2])
+    main_win.admin_trans.worker.run(
+        operator_report,
+        int(acc_no),
+        main_win.admin_trans.dateEdit.date().toPyDate(),
+        main_win.admin_trans.dateEdit_2.date().toPyDate(),
+        on_result=openReport,
+        on_error=reportFailed,
+        cancellable=True,
+    )
 
-    conn = sql.Connection(DB_PATH)
-    query = f"""SELECT * FROM Transactions WHERE operator = {acc_no} AND datetime(timestamp)
-    BETWEEN datetime("{py_from_dt}") AND datetime("{py_to_dt}");"""
-    ret = conn.execute(query)
-    data = ret.fetchall()
-    conn.close()
 
-    if not data:
-        # show the error message
-        show_message_box(msg_type="error", msg="No transactions found for today")
-        return
+############################   Startup profiling   ############################
+startup_phases = [("imports", IMPORTS_DONE)]
 
-    cr_val = 0
-    db_val = 0
-    for row in data:
-        currentRow = main_win.admin_trans.tableWidget.rowCount()
-        main_win.admin_trans.tableWidget.setRowCount(currentRow + 1)
-        main_win.admin_trans.tableWidget.setItem(
-            currentRow, 0, QTableWidgetItem(str(row[2])[:10])
-        )
-        main_win.admin_trans.tableWidget.setItem(
-            currentRow, 1, QTableWidgetItem(str(row[7]))
-        )
-        main_win.admin_trans.tableWidget.setItem(
-            currentRow, 2, QTableWidgetItem(str(row[5]))
-        )
-        main_win.admin_trans.tableWidget.setItem(
-            currentRow, 3, QTableWidgetItem(str(row[3]))
+
+def mark_startup(phase: str):
+    """Record the end of a startup phase"""
+    startup_phases.append((phase, time.perf_counter()))
+
+
+def print_startup_profile():
+    print(f"{'Startup phase':<24}{'ms':>10}{'total ms':>10}")
+    previous = STARTUP_BEGAN
+    for phase, ended in startup_phases:
+        print(
+            f"{phase:<24}{(ended - previous) * 1000:>10.1f}"
+            f"{(ended - STARTUP_BEGAN) * 1000:>10.1f}"
         )
+        previous = ended
+
+
+class FirstFrameWatcher(QObject):
+    """Calls back once, after the first paint of a widget"""
 
-        if row[3] == "Cr":
-            cr_val += row[5]
-        elif row[3] == "Db":
-            db_val += row[5]
+    def __init__(self, widget: QWidget, callback):
+        super().__init__(widget)
+        self.callback = callback
+        widget.installEventFilter(self)
 
-    currentRow = main_win.admin_trans.tableWidget.rowCount()
-    main_win.admin_trans.tableWidget.setRowCount(currentRow + 1)
-    main_win.admin_trans.tableWidget.setItem(currentRow, 0, QTableWidgetItem(""))
-    main_win.admin_trans.tableWidget.setItem(
-        currentRow, 1, QTableWidgetItem("Total Transaction")
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint and self.callback is not None:
+            obj.removeEventFilter(self)
+            # Queued, so the frame is finished when the callback runs
+            QTimer.singleShot(0, self.callback)
+            self.callback = None
+            self.deleteLater()
+        return False
+
+
+###############################   Main Program   ##############################
+def parse_args():
+    parser = argparse.ArgumentParser(description="Mo Bank - A dummy banking system")
+    parser.add_argument(
+        "--server",
+        metavar="ADDRESS",
+        help="work through the ledger server at host:port or unix:/path instead of opening the database",
     )
-    main_win.admin_trans.tableWidget.setItem(
-        currentRow, 2, QTableWidgetItem(str(cr_val + db_val))
+    parser.add_argument(
+        "--post-batch",
+        metavar="CSV_FILE",
+        help="post a CSV file of deposits, withdrawals and transfers, then exit",
     )
-    main_win.admin_trans.tableWidget.setItem(currentRow, 3, QTableWidgetItem(""))
-
-    currentRow = main_win.admin_trans.tableWidget.rowCount()
-    main_win.admin_trans.tableWidget.setRowCount(currentRow + 1)
-    main_win.admin_trans.tableWidget.setItem(currentRow, 0, QTableWidgetItem(""))
-    main_win.admin_trans.tableWidget.setItem(
-        currentRow, 1, QTableWidgetItem("Floating Amount")
+    parser.add_argument(
+        "--operator",
+        type=int,
+        help="account number of the Admin/SWO posting the batch",
     )
-    main_win.admin_trans.tableWidget.setItem(
-        currentRow, 2, QTableWidgetItem(str(cr_val - db_val))
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        help="rows committed per transaction while posting a batch",
     )
-    main_win.admin_trans.tableWidget.setItem(currentRow, 3, QTableWidgetItem(""))
-
-    return user_data, data
+    parser.add_argument(
+        "--rebuild-summaries",
+        action="store_true",
+        help="rebuild the daily balances, operator totals and login identifiers, then exit",
+    )
+    parser.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="print how long each startup phase took once the window is drawn, then exit",
+    )
+    parser.add_argument(
+        "--slow-query-ms",
+        type=float,
+        default=SLOW_QUERY_MS,
+        help="log the queries taking longer to assets/slow_queries.log with their plan",
+    )
+    parser.add_argument(
+        "--trace-ui",
+        metavar="JSON_FILE",
+        help="trace the GUI handlers, page switches and event loop stalls into a Chrome trace file written on exit",
+    )
+    parser.add_argument(
+        "--stall-ms",
+        type=float,
+        default=STALL_MS,
+        help="event loop stalls longer than this are traced",
+    )
+    args = parser.parse_args()
+    if args.post_batch and args.operator is None:
+        parser.error("--post-batch requires --operator")
+    if args.server and (args.post_batch or args.rebuild_summaries):
+        parser.error("--post-batch and --rebuild-summaries open the database itself")
+    if args.server:
+        from server import parse_address
 
+        try:
+            parse_address(args.server)
+        except ValueError as err:
+            parser.error(str(err))
+    return args
 
-def printTransactions():
-    data = showEmployeeTransactions()
 
-    if not data:
-        return
+def run_batch(args) -> int:
+    import batch
 
-    user_data, data = data
-    generate_report(
-        user_data,
-        data,
-        main_win.admin_trans.dateEdit.date().toString("yyyy-MM-dd"),
-        main_win.admin_trans.dateEdit_2.date().toString("yyyy-MM-dd"),
-        is_emp=True,
-    )
+    try:
+        result = batch.post_batch(
+            db,
+            args.post_batch,
+            args.operator,
+            args.chunk_size or batch.BATCH_CHUNK_SIZE,
+            progress=print,
+        )
+    except (OSError, ValueError) as err:
+        print(f"Batch not posted: {err}")
+        return 1
+    batch.print_report(result)
+    return 0
 
 
-###############################   Main Program   ##############################
 if __name__ == "__main__":
-    # Verify database
-    initial_db_check()
+    args = parse_args()
+    query_stats.slow_ms = args.slow_query_ms
+
+    if args.server:
+        # The ledger server owns the database, every call goes to it
+        from client import RemoteBank
+
+        bank = RemoteBank(args.server)
+    else:
+        # Verify database
+        initial_db_check()
+        mark_startup("initial_db_check")
+
+    # Headless maintenance
+    if args.rebuild_summaries:
+        with db.writer() as conn:
+            rebuild_daily_balances(conn)
+            rebuild_operator_totals(conn)
+            rebuild_login_identifiers(conn)
+        print("Daily balances, operator totals and login identifiers rebuilt")
+        db.close()
+        sys.exit(0)
+
+    # Headless batch posting
+    if args.post_batch:
+        exit_code = run_batch(args)
+        db.close()
+        sys.exit(exit_code)
 
     # Configure application
     if hasattr(QtCore.Qt, "AA_EnableHighDepiScaling"):
@@ -1710,6 +1743,10 @@ if __name__ == "__main__":
         QApplication.setAttribute(QtCore.Qt.AA_UseHighDpiPixmaps, True)
 
     app = QApplication([])
+    mark_startup("QApplication")
+    if args.trace_ui:
+        ui_trace.stall_ms = args.stall_ms
+        ui_trace.start()
 
     # https://stackoverflow.com/questions/67599432/setting-the-same-icon-as-application-icon-in-task-bar-for-pyqt5-application
     MY_APP_ID = "cttc.mb.v2.0.0"  # arbitrary string
@@ -1717,139 +1754,30 @@ if __name__ == "__main__":
 
     main_win = MainWindow()
     main_win.setWindowIcon(QIcon(resource_path("assets\\images\\Mo Bank logo.jpg")))
+    mark_startup("MainWindow")
     main_win.show()
+    mark_startup("show")
 
-    main_win.intro.pushButton.clicked.connect(openLoginPage)
-    main_win.intro.pushButton_2.clicked.connect(openGithubRepo)
-    main_win.intro.pushButton_3.clicked.connect(openGithubProfile)
-
-    main_win.login.pushButton.clicked.connect(completeLogin)
-    main_win.login.pushButton_2.clicked.connect(openIntroPage)
-
-    main_win.acc_det.pushButton_2.clicked.connect(logout)
-    main_win.acc_det.pushButton_3.clicked.connect(openNewCustomerPage)
-    main_win.acc_det.pushButton_4.clicked.connect(openSWO_DepositPage)
-    main_win.acc_det.pushButton_7.clicked.connect(openCustomerWithdrawlPage)
-    main_win.acc_det.pushButton_8.clicked.connect(openCustomerTransPage)
-
-    main_win.hldr_wdrl.pushButton_2.clicked.connect(logout)
-    main_win.hldr_wdrl.pushButton_3.clicked.connect(openNewCustomerPage)
-    main_win.hldr_wdrl.pushButton_4.clicked.connect(openSWO_DepositPage)
-    main_win.hldr_wdrl.pushButton_6.clicked.connect(openAccountDetailsPage)
-    main_win.hldr_wdrl.pushButton_8.clicked.connect(openCustomerTransPage)
-    main_win.hldr_wdrl.pushButton.clicked.connect(partial(updateWithdrawlAmount, "1"))
-    main_win.hldr_wdrl.pushButton_9.clicked.connect(partial(updateWithdrawlAmount, "2"))
-    main_win.hldr_wdrl.pushButton_10.clicked.connect(
-        partial(updateWithdrawlAmount, "3")
-    )
-    main_win.hldr_wdrl.pushButton_11.clicked.connect(
-        partial(updateWithdrawlAmount, "4")
-    )
-    main_win.hldr_wdrl.pushButton_12.clicked.connect(
-        partial(updateWithdrawlAmount, "5")
-    )
-    main_win.hldr_wdrl.pushButton_13.clicked.connect(
-        partial(updateWithdrawlAmount, "6")
-    )
-    main_win.hldr_wdrl.pushButton_14.clicked.connect(
-        partial(updateWithdrawlAmount, "7")
-    )
-    main_win.hldr_wdrl.pushButton_15.clicked.connect(
-        partial(updateWithdrawlAmount, "8")
-    )
-    main_win.hldr_wdrl.pushButton_16.clicked.connect(
-        partial(updateWithdrawlAmount, "9")
-    )
-    main_win.hldr_wdrl.pushButton_17.clicked.connect(
-        partial(updateWithdrawlAmount, ".")
-    )
-    main_win.hldr_wdrl.pushButton_18.clicked.connect(
-        partial(updateWithdrawlAmount, "0")
-    )
-    main_win.hldr_wdrl.pushButton_19.clicked.connect(
-        partial(updateWithdrawlAmount, "-1")
-    )
-    main_win.hldr_wdrl.pushButton_20.clicked.connect(selfWithdrawl)
-    main_win.hldr_wdrl.pushButton_21.clicked.connect(
-        partial(updateWithdrawlAmount, "-2")
-    )
-
-    main_win.customer_trans.pushButton.clicked.connect(showCustomerTrans)
-    main_win.customer_trans.pushButton_2.clicked.connect(logout)
-    main_win.customer_trans.pushButton_3.clicked.connect(openNewCustomerPage)
-    main_win.customer_trans.pushButton_4.clicked.connect(openSWO_DepositPage)
-    main_win.customer_trans.pushButton_6.clicked.connect(openAccountDetailsPage)
-    main_win.customer_trans.pushButton_7.clicked.connect(openCustomerWithdrawlPage)
-    main_win.customer_trans.pushButton_10.clicked.connect(printCustomerTrans)
-
-    main_win.swo_dep.pushButton.clicked.connect(officeDeposit)
-    main_win.swo_dep.pushButton_2.clicked.connect(logout)
-    main_win.swo_dep.pushButton_3.clicked.connect(openNewCustomerPage)
-    main_win.swo_dep.pushButton_5.clicked.connect(openAccountDetailsPage)
-    main_win.swo_dep.pushButton_7.clicked.connect(openSWO_WithdrawlPage)
-    main_win.swo_dep.pushButton_8.clicked.connect(openSWO_TransferPage)
-    main_win.swo_dep.pushButton_9.clicked.connect(openSWO_TransPage)
-    main_win.swo_dep.pushButton_10.clicked.connect(partial(fetchCustomerDetails, "D"))
-
-    main_win.swo_wdrl.pushButton.clicked.connect(officeWithdrawl)
-    main_win.swo_wdrl.pushButton_2.clicked.connect(logout)
-    main_win.swo_wdrl.pushButton_3.clicked.connect(openNewCustomerPage)
-    main_win.swo_wdrl.pushButton_5.clicked.connect(openAccountDetailsPage)
-    main_win.swo_wdrl.pushButton_6.clicked.connect(openSWO_DepositPage)
-    main_win.swo_wdrl.pushButton_8.clicked.connect(openSWO_TransferPage)
-    main_win.swo_wdrl.pushButton_9.clicked.connect(openSWO_TransPage)
-    main_win.swo_wdrl.pushButton_10.clicked.connect(partial(fetchCustomerDetails, "W"))
-
-    main_win.swo_tf_mn.pushButton.clicked.connect(officeTransfer)
-    main_win.swo_tf_mn.pushButton_2.clicked.connect(logout)
-    main_win.swo_tf_mn.pushButton_3.clicked.connect(openNewCustomerPage)
-    main_win.swo_tf_mn.pushButton_5.clicked.connect(openAccountDetailsPage)
-    main_win.swo_tf_mn.pushButton_6.clicked.connect(openSWO_DepositPage)
-    main_win.swo_tf_mn.pushButton_7.clicked.connect(openSWO_WithdrawlPage)
-    main_win.swo_tf_mn.pushButton_9.clicked.connect(openSWO_TransPage)
-    main_win.swo_tf_mn.pushButton_10.clicked.connect(
-        partial(fetchCustomerDetails, "TMS")
-    )
-    main_win.swo_tf_mn.pushButton_10.clicked.connect(
-        partial(fetchCustomerDetails, "TMR")
-    )
+    def first_frame():
+        mark_startup("first frame")
+        if args.profile_startup:
+            print_startup_profile()
+            app.quit()
 
-    main_win.swo_trans.pushButton.clicked.connect(officeTrans)
-    main_win.swo_trans.pushButton_2.clicked.connect(logout)
-    main_win.swo_trans.pushButton_3.clicked.connect(openNewCustomerPage)
-    main_win.swo_trans.pushButton_5.clicked.connect(openAccountDetailsPage)
-    main_win.swo_trans.pushButton_6.clicked.connect(openSWO_DepositPage)
-    main_win.swo_trans.pushButton_7.clicked.connect(openSWO_WithdrawlPage)
-    main_win.swo_trans.pushButton_8.clicked.connect(openSWO_TransferPage)
-    main_win.swo_trans.pushButton_10.clicked.connect(customerTrans)
-    main_win.swo_trans.pushButton_11.clicked.connect(printCustomerTransFromSWO)
-
-    main_win.admin_new_user.pushButton.clicked.connect(addCustomer)
-    main_win.admin_new_user.pushButton_2.clicked.connect(logout)
-    main_win.admin_new_user.pushButton_4.clicked.connect(openSWO_DepositPage)
-    main_win.admin_new_user.pushButton_5.clicked.connect(openAccountDetailsPage)
-    main_win.admin_new_user.pushButton_7.clicked.connect(partial(openKYC_Page, True))
-    main_win.admin_new_user.pushButton_8.clicked.connect(openTransactionPage)
-
-    main_win.admin_update.pushButton.clicked.connect(updateKYC)
-    main_win.admin_update.pushButton_2.clicked.connect(logout)
-    main_win.admin_update.pushButton_4.clicked.connect(openSWO_DepositPage)
-    main_win.admin_update.pushButton_5.clicked.connect(openAccountDetailsPage)
-    main_win.admin_update.pushButton_6.clicked.connect(openNewCustomerPage)
-    main_win.admin_update.pushButton_8.clicked.connect(openTransactionPage)
-    main_win.admin_update.lineEdit.textChanged.connect(fetchKYCdata)
-    main_win.admin_update.pushButton_9.clicked.connect(fetchKYCdataWithError)
-
-    main_win.admin_trans.pushButton.clicked.connect(showEmployeeTransactions)
-    main_win.admin_trans.pushButton_2.clicked.connect(logout)
-    main_win.admin_trans.pushButton_4.clicked.connect(openSWO_DepositPage)
-    main_win.admin_trans.pushButton_5.clicked.connect(openAccountDetailsPage)
-    main_win.admin_trans.pushButton_6.clicked.connect(openNewCustomerPage)
-    main_win.admin_trans.pushButton_7.clicked.connect(partial(openKYC_Page, True))
-    main_win.admin_trans.pushButton_9.clicked.connect(printTransactions)
+    first_frame_watcher = FirstFrameWatcher(main_win, first_frame)
 
     app.exec()
     app.quit()
+    bank.logout()
+    db.close()
+    query_stats.close()
+
+    if args.trace_ui:
+        ui_trace.stop()
+        with open(args.trace_ui, "w", encoding="utf-8") as file:
+            ui_trace.dump(file)
+        ui_trace.print_summary()
+        print(f"UI trace written to {args.trace_ui}")
 
     # delete the application
     del app
@@ -0,0 +1,92 @@
+"""
+    Project Name:       Mo Bank (A dummy banking system)
+    Module:             money
+    Purpose:            Fixed-point money type
+    Description:
+        Balances and ledger amounts are stored in the database as integer paise (1 rupee = 100 paise). The Money type
+        wraps that integer on the Python side so sums stay exact and amounts are always shown with two decimals.
+        Money values can be bound directly as SQLite query parameters.
+"""
+
+################################   Libraries   ################################
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from functools import total_ordering
+import sqlite3 as sql
+
+
+#############################   Global variables   ############################
+PAISE_PER_RUPEE = 100
+
+
+################################   Money type   ###############################
+@total_ordering
+class Money:
+    """Amount of money held as an integer number of paise"""
+
+    __slots__ = ("paise",)
+
+    def __init__(self, paise: int = 0):
+        self.paise = int(paise)
+
+    @classmethod
+    def from_rupees(cls, rupees) -> "Money":
+        """
+        Convert a rupee amount (str, int, float or Decimal) to Money, rounding half up to the nearest paisa
+
+        Raises
+        ------
+        ValueError
+            If the value is not a finite number.
+
+        """
+        try:
+            value = Decimal(str(rupees).strip())
+        except InvalidOperation:
+            raise ValueError(f"Invalid amount {rupees!r}") from None
+        if not value.is_finite():
+            raise ValueError(f"Invalid amount {rupees!r}")
+        return cls(int((value * PAISE_PER_RUPEE).to_integral_value(ROUND_HALF_UP)))
+
+    def to_rupees(self) -> Decimal:
+        return Decimal(self.paise) / PAISE_PER_RUPEE
+
+    def __add__(self, other):
+        if not isinstance(other, Money):
+            return NotImplemented
+        return Money(self.paise + other.paise)
+
+    def __sub__(self, other):
+        if not isinstance(other, Money):
+            return NotImplemented
+        return Money(self.paise - other.paise)
+
+    def __neg__(self):
+        return Money(-self.paise)
+
+    def __eq__(self, other):
+        if not isinstance(other, Money):
+            return NotImplemented
+        return self.paise == other.paise
+
+    def __lt__(self, other):
+        if not isinstance(other, Money):
+            return NotImplemented
+        return self.paise < other.paise
+
+    def __hash__(self):
+        return hash(self.paise)
+
+    def __bool__(self):
+        return self.paise != 0
+
+    def __repr__(self):
+        return f"Money({self.paise})"
+
+    def __str__(self):
+        sign = "-" if self.paise < 0 else ""
+        rupees, paise = divmod(abs(self.paise), PAISE_PER_RUPEE)
+        return f"{sign}{rupees}.{paise:02d}"
+
+
+# Money is stored as its integer paise value
+sql.register_adapter(Money, lambda money: money.paise)
@@ -0,0 +1,114 @@
+"""
+    Project Name:       Mo Bank (A dummy banking system)
+    Module:             queries
+    Purpose:            Catalogue of the SQL statements run by the app
+    Description:
+        Every statement run on the hot paths is defined here once, with ? placeholders for all of its values. Values
+        are always bound, never formatted into the SQL: the text of a statement is then the same on every call, so
+        the sqlite3 statement cache of each connection (sized by database.STATEMENT_CACHE_SIZE) hands back the
+        statement SQLite already parsed and planned instead of compiling it again, and user input can never change
+        the SQL that runs.
+
+        Schema creation and migrations stay in the database module, as they run once.
+"""
+
+################################   Libraries   ################################
+from functools import lru_cache
+
+
+################################   Accounts   #################################
+ACCOUNT_BY_NO = "SELECT * FROM AccountDetails WHERE acc_no = ? LIMIT 1;"
+
+# Accounts of a login identifier (service.login_identifier), one seek on LoginIdentifiers then the account row
+ACCOUNTS_BY_LOGIN = """SELECT AccountDetails.* FROM LoginIdentifiers
+JOIN AccountDetails ON AccountDetails.acc_no = LoginIdentifiers.acc_no WHERE identifier = ?;"""
+
+ACCOUNT_ROLE = "SELECT user_type FROM AccountDetails WHERE acc_no = ?;"
+
+CUSTOMER_ACCOUNTS = (
+    "SELECT acc_no FROM AccountDetails WHERE user_type = 'C' ORDER BY acc_no;"
+)
+
+INSERT_ACCOUNT = """INSERT INTO AccountDetails(acc_type, full_name, email, mobile, gender, dob, password,
+user_type, curr_bal) VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?);"""
+
+UPDATE_KYC = """UPDATE AccountDetails SET acc_type = ?, full_name = ?, email = ?, mobile = ?, gender = ?, dob = ?,
+password = ?, user_type = ? WHERE acc_no = ?;"""
+
+
+################################   Postings   #################################
+ACCOUNT_BALANCE = "SELECT curr_bal FROM AccountDetails WHERE acc_no = ?;"
+
+ACCOUNT_EXISTS = "SELECT 1 FROM AccountDetails WHERE acc_no = ?;"
+
+CREDIT_BALANCE = "UPDATE AccountDetails SET curr_bal = curr_bal + ? WHERE acc_no = ?;"
+
+# Only debits when the balance covers the amount
+DEBIT_BALANCE = """UPDATE AccountDetails SET curr_bal = curr_bal - ? WHERE acc_no = ?
+AND curr_bal >= ?;"""
+
+SET_BALANCE = "UPDATE AccountDetails SET curr_bal = ? WHERE acc_no = ?;"
+
+INSERT_TRANSACTION = """INSERT INTO Transactions(acc_no, timestamp, operation, prev_bal, trans_amount, avail_bal,
+operation_details, operator) VALUES(?, ?, ?, ?, ?, ?, ?, ?);"""
+
+# Each posting of a group commit runs in a savepoint, so a refused one is undone alone
+SAVEPOINT_POSTING = "SAVEPOINT posting;"
+
+ROLLBACK_POSTING = "ROLLBACK TO posting;"
+
+RELEASE_POSTING = "RELEASE posting;"
+
+
+###############################   Statements   ################################
+ACCOUNT_TRANSACTIONS = """SELECT * FROM Transactions WHERE acc_no = ? AND timestamp >= ? AND timestamp < ?
+ORDER BY timestamp;"""
+
+OPERATOR_TRANSACTIONS = """SELECT * FROM Transactions WHERE operator = ? AND timestamp >= ? AND timestamp < ?
+ORDER BY timestamp;"""
+
+# Keyset pages of the transactions after the last (timestamp, txn_id) read, by the column paged on
+TRANSACTION_PAGES = {
+    "acc_no": """SELECT * FROM Transactions WHERE acc_no = ? AND timestamp >= ? AND timestamp < ?
+    AND (timestamp > ? OR txn_id > ?) ORDER BY timestamp, txn_id LIMIT ?;""",
+    "operator": """SELECT * FROM Transactions WHERE operator = ? AND timestamp >= ? AND timestamp < ?
+    AND (timestamp > ? OR txn_id > ?) ORDER BY timestamp, txn_id LIMIT ?;""",
+}
+
+OPERATOR_TOTALS = """SELECT coalesce(sum(cr_total), 0), coalesce(sum(db_total), 0) FROM OperatorDailyTotals
+WHERE operator = ? AND day >= ? AND day <= ?;"""
+
+BALANCE_AS_OF = """SELECT closing_bal FROM DailyBalances WHERE acc_no = ? AND day <= ?
+ORDER BY day DESC LIMIT 1;"""
+
+
+#############################   Batch posting   ###############################
+INSERT_BATCH_RUN = """INSERT OR IGNORE INTO BatchRuns(batch_id, file_name, operator, started_at, updated_at)
+VALUES(?, ?, ?, ?, ?);"""
+
+BATCH_RUN_STATE = "SELECT rows_done, completed FROM BatchRuns WHERE batch_id = ?;"
+
+BATCH_RUN_PROGRESS = """UPDATE BatchRuns SET rows_done = ?, posted = posted + ?, updated_at = ?
+WHERE batch_id = ?;"""
+
+BATCH_RUN_COMPLETED = (
+    "UPDATE BatchRuns SET completed = 1, updated_at = ? WHERE batch_id = ?;"
+)
+
+BATCH_RUN_RESULT = "SELECT rows_done, posted FROM BatchRuns WHERE batch_id = ?;"
+
+INSERT_BATCH_FAILURE = """INSERT OR REPLACE INTO BatchFailures(batch_id, line_no, reason)
+VALUES(?, ?, ?);"""
+
+BATCH_FAILURES = (
+    "SELECT line_no, reason FROM BatchFailures WHERE batch_id = ? ORDER BY line_no;"
+)
+
+
+@lru_cache(maxsize=None)
+def account_balances(count: int) -> str:
+    """Balances of `count` accounts, one ? per account number"""
+    placeholders = ", ".join("?" * count)
+    return (
+        f"SELECT acc_no, curr_bal FROM AccountDetails WHERE acc_no IN ({placeholders});"
+    )
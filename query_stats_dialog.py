@@ -0,0 +1,135 @@
+"""
+    Project Name:       Mo Bank (A dummy banking system)
+    Module:             query_stats_dialog
+    Purpose:            Admin screen of the query statistics
+    Description:
+        Lists every query shape recorded by a QueryStats with its count, rows and p50/p95/p99/max latency, the most
+        total time first, with the handlers that ran it. The table is refreshed on demand, the statistics can be
+        reset and the snapshot exported to a JSON file.
+"""
+
+################################   Libraries   ################################
+from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import (
+    QAbstractItemView,
+    QDialog,
+    QFileDialog,
+    QHBoxLayout,
+    QHeaderView,
+    QLabel,
+    QPushButton,
+    QTableWidget,
+    QTableWidgetItem,
+    QVBoxLayout,
+)
+
+from querystats import QueryStats
+
+
+#############################   Global variables   ############################
+# Columns of the table as title and snapshot key
+COLUMNS = [
+    ("Query", "shape"),
+    ("Handlers", "handlers"),
+    ("Count", "count"),
+    ("Rows", "rows"),
+    ("Slow", "slow"),
+    ("p50 ms", "p50_ms"),
+    ("p95 ms", "p95_ms"),
+    ("p99 ms", "p99_ms"),
+    ("Max ms", "max_ms"),
+    ("Total ms", "total_ms"),
+]
+
+
+###############################   Query stats   ###############################
+class NumberItem(QTableWidgetItem):
+    """Table item showing formatted text but sorting by its number"""
+
+    def __init__(self, text: str, value):
+        super().__init__(text)
+        self.value = value
+        self.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+
+    def __lt__(self, other):
+        return self.value < getattr(other, "value", 0)
+
+
+class QueryStatsDialog(QDialog):
+    def __init__(self, stats: QueryStats, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = stats
+        self.setWindowTitle("Query Stats")
+        self.resize(1100, 500)
+
+        self.label = QLabel()
+        self.table = QTableWidget(0, len(COLUMNS))
+        self.table.setHorizontalHeaderLabels([title for title, _ in COLUMNS])
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setWordWrap(False)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Interactive)
+        self.table.setColumnWidth(0, 420)
+        self.table.setColumnWidth(1, 180)
+        # Most total time first until another column is clicked
+        self.table.horizontalHeader().setSortIndicator(
+            len(COLUMNS) - 1, Qt.DescendingOrder
+        )
+
+        refresh_button = QPushButton("Refresh")
+        reset_button = QPushButton("Reset")
+        export_button = QPushButton("Export JSON")
+        refresh_button.clicked.connect(self.refresh)
+        reset_button.clicked.connect(self.reset)
+        export_button.clicked.connect(self.export)
+
+        buttons = QHBoxLayout()
+        buttons.addWidget(self.label, 1)
+        buttons.addWidget(refresh_button)
+        buttons.addWidget(reset_button)
+        buttons.addWidget(export_button)
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.table)
+        layout.addLayout(buttons)
+
+        self.refresh()
+
+    def refresh(self):
+        shapes = self.stats.snapshot()
+        self.table.setSortingEnabled(False)
+        self.table.setRowCount(len(shapes))
+        for row, shape in enumerate(shapes):
+            for column, (_, key) in enumerate(COLUMNS):
+                value = shape[key]
+                if key == "handlers":
+                    text = ", ".join(f"{name} ({n})" for name, n in value.items())
+                elif isinstance(value, float):
+                    text = f"{value:.2f}"
+                else:
+                    text = str(value)
+
+                if column > 1:
+                    item = NumberItem(text, value)
+                else:
+                    item = QTableWidgetItem(text)
+                    item.setToolTip(text)
+                self.table.setItem(row, column, item)
+        self.table.setSortingEnabled(True)
+
+        self.label.setText(
+            f"{sum(shape['count'] for shape in shapes)} queries since "
+            f"{self.stats.started_at:%d-%m-%Y %H:%M:%S}, "
+            f"slow above {self.stats.slow_ms} ms"
+        )
+
+    def reset(self):
+        self.stats.reset()
+        self.refresh()
+
+    def export(self):
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Export Query Stats", "query_stats.json", "JSON (*.json)"
+        )
+        if path:
+            with open(path, "w", encoding="utf-8") as file:
+                self.stats.dump(file)
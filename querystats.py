@@ -0,0 +1,361 @@
+"""
+    Project Name:       Mo Bank (A dummy banking system)
+    Module:             querystats
+    Purpose:            Latency statistics and slow-query log of the SQL run by the app
+    Description:
+        A ConnectionManager given a QueryStats opens its connections as InstrumentedConnection, so every statement
+        run through execute() is timed from execute() to its last fetched row. Each execution is recorded under
+        its shape (the SQL with literals replaced by ?, so the f-string queries with inlined values group together)
+        with the handler that ran it, the rows returned and the time taken, in a latency histogram per shape.
+
+        Executions slower than the threshold are written to a rotating log file together with their EXPLAIN QUERY
+        PLAN. snapshot() returns count, rows and p50/p95/p99 per shape for the admin screen or a dump.
+"""
+
+################################   Libraries   ################################
+from bisect import bisect_left
+from collections import Counter
+from datetime import datetime
+import json
+import logging
+from logging.handlers import RotatingFileHandler
+import re
+import sqlite3 as sql
+import sys
+import threading
+import time
+
+
+#############################   Global variables   ############################
+SLOW_QUERY_MS = 100  # executions slower than this are logged
+SLOW_LOG_MAX_BYTES = 1_000_000
+SLOW_LOG_BACKUPS = 3
+
+# Upper bounds in ms of the histogram buckets, 4 per doubling from 10 µs to about a minute
+BUCKET_BOUNDS = [0.01 * 2 ** (i / 4) for i in range(92)]
+
+# Modules of the data layer, skipped when looking for the handler that ran a query
+DATA_LAYER_MODULES = {
+    "querystats",
+    "database",
+    "service",
+    "ledger",
+    "trans_model",
+    "contextlib",
+}
+
+# Statements logged with their query plan, by their first keyword
+EXPLAINED_STATEMENTS = {"SELECT", "WITH", "INSERT", "UPDATE", "DELETE"}
+
+SHAPE_CACHE_SIZE = 2000
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|\b\d+(?:\.\d+)?\b")
+_SPACES = re.compile(r"\s+")
+_shapes = {}
+
+
+#############################   Helper functions   ############################
+def query_shape(query: str) -> str:
+    """The query on one line with its string and number literals replaced by ?"""
+    shape = _shapes.get(query)
+    if shape is None:
+        shape = _SPACES.sub(" ", _LITERALS.sub("?", query)).strip()
+        if len(_shapes) >= SHAPE_CACHE_SIZE:
+            _shapes.clear()
+        _shapes[query] = shape
+    return shape
+
+
+def calling_handler() -> str:
+    """Name of the function outside the data layer that ran the current query"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if module not in DATA_LAYER_MODULES:
+            if module in ("__main__", "main"):
+                return frame.f_code.co_name
+            return f"{module}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return "?"
+
+
+###############################   Statistics   ################################
+class ShapeStats:
+    """Latency histogram and totals of one query shape"""
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.rows = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.slow = 0
+        self.handlers = Counter()
+
+    def add(self, elapsed_ms: float, rows: int, handler: str, slow: bool):
+        self.buckets[bisect_left(BUCKET_BOUNDS, elapsed_ms)] += 1
+        self.count += 1
+        self.rows += rows
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.slow += slow
+        self.handlers[handler] += 1
+
+    def percentile(self, fraction: float) -> float:
+        """Upper bound of the bucket holding the given fraction of the executions, capped by the slowest one"""
+        wanted = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= wanted and count:
+                if index == len(BUCKET_BOUNDS):
+                    return self.max_ms
+                return min(BUCKET_BOUNDS[index], self.max_ms)
+        return self.max_ms
+
+
+class QueryStats:
+    """
+    Per query shape latency histograms and a slow-query log
+
+    Parameters
+    ----------
+    slow_ms : float, optional
+        Executions taking longer are logged with their query plan. The default is SLOW_QUERY_MS.
+    log_path : str, optional
+        Rotating log file of the slow queries. The default logs nothing to a file.
+
+    """
+
+    def __init__(self, slow_ms: float = SLOW_QUERY_MS, log_path: str = None):
+        self.slow_ms = slow_ms
+        self.log_path = log_path
+        self.started_at = datetime.now()
+        self._shapes = {}
+        self._plans = {}  # EXPLAIN QUERY PLAN text by shape
+        self._lock = threading.Lock()
+
+        self.log = logging.getLogger("mobank.slow_queries")
+        self.log.propagate = False
+        self._handler = None
+        if log_path:
+            self._handler = RotatingFileHandler(
+                log_path,
+                maxBytes=SLOW_LOG_MAX_BYTES,
+                backupCount=SLOW_LOG_BACKUPS,
+                encoding="utf-8",
+                delay=True,
+            )
+            self._handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            self.log.addHandler(self._handler)
+            self.log.setLevel(logging.INFO)
+
+    def record(
+        self,
+        conn: sql.Connection,
+        query: str,
+        params,
+        handler: str,
+        rows: int,
+        elapsed_ms: float,
+    ):
+        """Add one execution, logging it with its plan if it was slow"""
+        shape = query_shape(query)
+        slow = elapsed_ms >= self.slow_ms
+        with self._lock:
+            stats = self._shapes.get(shape)
+            if stats is None:
+                stats = self._shapes[shape] = ShapeStats()
+            stats.add(elapsed_ms, rows, handler, slow)
+
+        if slow and self._handler is not None:
+            self.log.info(
+                "%.1f ms, %d rows, %s: %s\n    params: %r\n    plan: %s",
+                elapsed_ms,
+                rows,
+                handler,
+                _SPACES.sub(" ", query).strip(),
+                params,
+                self._plan(conn, shape, query, params),
+            )
+
+    def _plan(self, conn: sql.Connection, shape: str, query: str, params) -> str:
+        # The plan of a shape doesn't depend on its literals, so it is looked up once
+        plan = self._plans.get(shape)
+        if plan is not None:
+            return plan
+        keyword = query.split(None, 1)[0].upper() if query.strip() else ""
+        if params is None or keyword not in EXPLAINED_STATEMENTS:
+            return "-"
+        try:
+            # Run through the base class, the plan lookup itself is not recorded
+            steps = sql.Connection.execute(conn, "EXPLAIN QUERY PLAN " + query, params)
+            plan = "; ".join(step[3] for step in steps.fetchall())
+        except sql.Error as err:
+            return f"not available ({err})"
+        self._plans[shape] = plan
+        return plan
+
+    def snapshot(self) -> list:
+        """
+        Statistics of every query shape, the most total time first
+
+        Returns
+        -------
+        list
+            dicts of shape, count, rows, slow, total_ms, mean_ms, p50_ms, p95_ms, p99_ms, max_ms and handlers (name
+            to executions).
+
+        """
+        with self._lock:
+            shapes = [
+                {
+                    "shape": shape,
+                    "count": stats.count,
+                    "rows": stats.rows,
+                    "slow": stats.slow,
+                    "total_ms": stats.total_ms,
+                    "mean_ms": stats.total_ms / stats.count,
+                    "p50_ms": stats.percentile(0.50),
+                    "p95_ms": stats.percentile(0.95),
+                    "p99_ms": stats.percentile(0.99),
+                    "max_ms": stats.max_ms,
+                    "handlers": dict(stats.handlers.most_common()),
+                }
+                for shape, stats in self._shapes.items()
+            ]
+        return sorted(shapes, key=lambda item: item["total_ms"], reverse=True)
+
+    def dump(self, file):
+        """Write the snapshot as JSON to an open text file"""
+        json.dump(
+            {
+                "since": str(self.started_at),
+                "slow_query_ms": self.slow_ms,
+                "queries": self.snapshot(),
+            },
+            file,
+            indent=2,
+        )
+
+    def reset(self):
+        with self._lock:
+            self._shapes = {}
+            self.started_at = datetime.now()
+
+    def close(self):
+        if self._handler is not None:
+            self.log.removeHandler(self._handler)
+            self._handler.close()
+            self._handler = None
+
+
+##########################   Instrumented sqlite3   ###########################
+class InstrumentedCursor(sql.Cursor):
+    """
+    Cursor recording its statement to the QueryStats of its connection
+
+    The time spent in execute() and in the fetches is added up, and the execution is recorded once its rows are
+    exhausted, the cursor runs another statement or it is closed or dropped.
+    """
+
+    _query = None
+
+    def execute(self, query, params=()):
+        self._finish()
+        self._query = query
+        self._params = params
+        self._handler = calling_handler()
+        self._rows = 0
+        started = time.perf_counter()
+        try:
+            super().execute(query, params)
+        finally:
+            self._elapsed = time.perf_counter() - started
+        if self.description is None:
+            self._finish()
+        return self
+
+    def executemany(self, query, params_seq):
+        self._finish()
+        self._query = query
+        self._params = None  # one statement, many parameter sets
+        self._handler = calling_handler()
+        self._rows = 0
+        started = time.perf_counter()
+        try:
+            super().executemany(query, params_seq)
+        finally:
+            self._elapsed = time.perf_counter() - started
+        self._finish()
+        return self
+
+    def _timed(self, fetch, *args):
+        started = time.perf_counter()
+        try:
+            return fetch(*args)
+        finally:
+            self._elapsed += time.perf_counter() - started
+
+    def fetchone(self):
+        row = self._timed(super().fetchone)
+        if row is None:
+            self._finish()
+        else:
+            self._rows += 1
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self._timed(super().fetchmany, self.arraysize if size is None else size)
+        self._rows += len(rows)
+        if len(rows) < (self.arraysize if size is None else size):
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        rows = self._timed(super().fetchall)
+        self._rows += len(rows)
+        self._finish()
+        return rows
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        row = self.fetchone()
+        if row is None:
+            raise StopIteration
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        self._finish()
+
+    def _finish(self):
+        if self._query is None:
+            return
+        query, self._query = self._query, None
+        stats = getattr(self.connection, "stats", None)
+        if stats is not None:
+            stats.record(
+                self.connection,
+                query,
+                self._params,
+                self._handler,
+                self._rows,
+                self._elapsed * 1000,
+            )
+
+
+class InstrumentedConnection(sql.Connection):
+    """sqlite3 connection whose execute() and executemany() go through an InstrumentedCursor"""
+
+    stats = None  # QueryStats set by the ConnectionManager
+
+    def execute(self, query, params=()):
+        return self.cursor(InstrumentedCursor).execute(query, params)
+
+    def executemany(self, query, params_seq):
+        return self.cursor(InstrumentedCursor).executemany(query, params_seq)
@@ -0,0 +1,508 @@
+"""
+    Project Name:       Mo Bank (A dummy banking system)
+    Module:             report
+    Purpose:            PDF account statements
+    Description:
+        Lays out account statements and employee transaction reports as PDF without any GUI, so they can be produced
+        by the Qt pages, by scripts and by the benchmarks alike; main.generate_report writes one to a temporary file
+        and opens it in the system viewer.
+
+        Statements are streamed: rows are taken one by one from any iterable (a list, or a generator reading a
+        TransactionCursor page by page) and every page is written to the file as soon as it is full. Only the page
+        being drawn is held in memory, so a statement of 500k rows needs no more memory than one of 50 rows and its
+        first page is on disk right away. The Cr/Db totals are summed while the rows go by; an employee report prints
+        the OperatorDailyTotals figures instead when the caller passes them, the cash-up the transaction view shows.
+
+        The document uses the standard Helvetica fonts, with the character widths shipped by fpdf2, and the logo is
+        embedded as is when it is a JPEG.
+"""
+
+################################   Libraries   ################################
+from array import array
+from collections import namedtuple
+import zlib
+
+from fpdf.fonts import CORE_FONTS, CORE_FONTS_CHARWIDTHS
+from PIL import Image
+
+from money import Money
+
+
+#############################   Global variables   ############################
+# Page geometry in millimetres (A4), PDF coordinates are in points
+PAGE_WIDTH = 210.0
+PAGE_HEIGHT = 297.0
+SCALE = 72 / 25.4
+MARGIN = 12.7
+PAGE_BREAK_MARGIN = 20  # rows never go lower than this above the page bottom
+CELL_MARGIN = 1
+TABLE_CELL_HEIGHT = 6
+
+# (width, title) of the statement table columns
+STATEMENT_COLUMNS = [
+    (25, "Date"),
+    (69.60, "Details"),
+    (30, "Amount"),
+    (30, "Operation"),
+    (30, "Balance"),
+]
+
+# Resource name and widths (by WinAnsi code) of every Helvetica style used
+FONTS = {"": "F1", "B": "F2", "I": "F3"}
+
+ReportStats = namedtuple("ReportStats", ["pages", "transactions", "cr_val", "db_val"])
+CHAR_WIDTHS = {
+    style: [CORE_FONTS_CHARWIDTHS["helvetica" + style][chr(i)] for i in range(256)]
+    for style in FONTS
+}
+
+
+###############################   PDF stream   ################################
+class PDFStream:
+    """
+    Minimal PDF writer that sends every page to the file as soon as it is complete
+
+    Only the file offsets of the objects are kept until close(). The total page count, which is unknown until
+    then, is drawn on the pages through the form XObject /NB written last.
+
+    Parameters
+    ----------
+    file : binary file
+        Destination of the document.
+    logo_path : str, optional
+        Image available to the pages as the XObject /Logo.
+
+    """
+
+    # Numbers of the objects written outside of the pages
+    CATALOG = 1
+    PAGES = 2
+    TOTAL_PAGES = 3
+    LOGO = 4
+    FIRST_FONT = 5
+    # Every page uses two objects, its content stream and the page itself
+    FIRST_PAGE = FIRST_FONT + len(FONTS)
+
+    def __init__(self, file, logo_path: str = None):
+        self.file = file
+        self.position = 0
+        self.pages = 0
+        self.offsets = array("Q", [0] * (self.FIRST_PAGE - 1))
+        self.has_logo = logo_path is not None
+
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        for number, style in enumerate(FONTS, self.FIRST_FONT):
+            name = CORE_FONTS["helvetica" + style]
+            self._object(
+                number,
+                f"<< /Type /Font /Subtype /Type1 /BaseFont /{name} "
+                f"/Encoding /WinAnsiEncoding >>".encode(),
+            )
+        if self.has_logo:
+            self._image(self.LOGO, logo_path)
+
+        font_refs = " ".join(
+            f"/{font} {number} 0 R"
+            for number, font in enumerate(FONTS.values(), self.FIRST_FONT)
+        )
+        self.font_resources = f"/Font << {font_refs} >>"
+        xobjects = f"/NB {self.TOTAL_PAGES} 0 R"
+        if self.has_logo:
+            xobjects += f" /Logo {self.LOGO} 0 R"
+        self.page_resources = f"<< {self.font_resources} /XObject << {xobjects} >> >>"
+
+    def _write(self, data: bytes):
+        self.file.write(data)
+        self.position += len(data)
+
+    def _object(self, number: int, body: bytes):
+        if number > len(self.offsets):
+            self.offsets.append(self.position)
+        else:
+            self.offsets[number - 1] = self.position
+        self._write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+
+    def _stream(self, number: int, entries: str, data: bytes):
+        body = b"<< %s /Length %d >>\nstream\n%s\nendstream" % (
+            entries.encode(),
+            len(data),
+            data,
+        )
+        self._object(number, body)
+
+    def _image(self, number: int, path: str):
+        with Image.open(path) as image:
+            width, height = image.size
+            if image.format == "JPEG" and image.mode in ("RGB", "L", "CMYK"):
+                color_space = {"RGB": "RGB", "L": "Gray", "CMYK": "CMYK"}[image.mode]
+                with open(path, "rb") as file:
+                    data, decode = file.read(), "DCTDecode"
+            else:
+                color_space = "RGB"
+                data = zlib.compress(image.convert("RGB").tobytes())
+                decode = "FlateDecode"
+
+        self._stream(
+            number,
+            f"/Type /XObject /Subtype /Image /Width {width} /Height {height} "
+            f"/ColorSpace /Device{color_space} /BitsPerComponent 8 /Filter /{decode}",
+            data,
+        )
+
+    def add_page(self, content: bytes):
+        number = self.FIRST_PAGE + 2 * self.pages
+        self._stream(number, "/Filter /FlateDecode", zlib.compress(content))
+        self._object(
+            number + 1,
+            f"<< /Type /Page /Parent {self.PAGES} 0 R "
+            f"/MediaBox [0 0 {PAGE_WIDTH * SCALE:.2f} {PAGE_HEIGHT * SCALE:.2f}] "
+            f"/Resources {self.page_resources} /Contents {number} 0 R >>".encode(),
+        )
+        self.pages += 1
+
+    def close(self, total_pages_font: tuple):
+        """Write the objects that refer to all the pages, total_pages_font is the (font, size) of /NB"""
+        font, size = total_pages_font
+        self._stream(
+            self.TOTAL_PAGES,
+            f"/Type /XObject /Subtype /Form /BBox [0 -{size} {size * 10} {size * 2}] "
+            f"/Resources << {self.font_resources} >>",
+            f"BT /{font} {size:.2f} Tf ({self.pages}) Tj ET".encode(),
+        )
+
+        kids = " ".join(
+            f"{self.FIRST_PAGE + 2 * page + 1} 0 R" for page in range(self.pages)
+        )
+        self._object(
+            self.PAGES,
+            f"<< /Type /Pages /Kids [{kids}] /Count {self.pages} >>".encode(),
+        )
+        self._object(
+            self.CATALOG, f"<< /Type /Catalog /Pages {self.PAGES} 0 R >>".encode()
+        )
+
+        xref = self.position
+        self._write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(self.offsets) + 1))
+        for offset in self.offsets:
+            if offset:
+                self._write(b"%010d 00000 n \n" % offset)
+            else:  # no logo
+                self._write(b"0000000000 65535 f \n")
+        self._write(
+            b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+            % (len(self.offsets) + 1, self.CATALOG, xref)
+        )
+
+
+def string_width(text: str, style: str = "", size: float = 12) -> float:
+    """Width in millimetres of a text in Helvetica"""
+    widths = CHAR_WIDTHS[style]
+    encoded = text.encode("cp1252", errors="replace")
+    return sum(widths[code] for code in encoded) * size / 1000 / SCALE
+
+
+def wrap_text(text: str, width: float, style: str = "", size: float = 12) -> list:
+    """Lines of a text that fit in the given width, broken between words"""
+    if string_width(text, style, size) <= width:
+        return [text]
+
+    lines = []
+    line = ""
+    for word in text.split(" "):
+        candidate = f"{line} {word}" if line else word
+        if line and string_width(candidate, style, size) > width:
+            lines.append(line)
+            line = word
+        else:
+            line = candidate
+    lines.append(line)
+    return lines
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+##############################   Page layout   ################################
+class ReportPDF:
+    """
+    Pages of a report drawn top to bottom, each written out once full
+
+    Coordinates are in millimetres from the top left corner, like FPDF. Every page gets the logo and title as
+    header and its page number as footer.
+    """
+
+    def __init__(self, file, title: str = "Mo Bank", logo_path: str = None):
+        self.stream = PDFStream(file, logo_path)
+        self.title = title
+        self.content = None
+        self.x = MARGIN
+        self.y = MARGIN
+        self.font = ("", 12)
+        self.page_no = 0
+
+    def set_font(self, style: str = "", size: float = 12):
+        self.font = (style, size)
+
+    def add_page(self):
+        if self.content is not None:
+            self._end_page()
+        self.page_no += 1
+        self.content = ["0.57 w"]
+        self.x = MARGIN
+        self.y = MARGIN
+        self.header()
+
+    def _end_page(self):
+        self.footer()
+        self.stream.add_page("\n".join(self.content).encode("cp1252", errors="replace"))
+        self.content = None
+
+    def header(self):
+        if self.stream.has_logo:
+            self.content.append(
+                f"q {20 * SCALE:.2f} 0 0 {20 * SCALE:.2f} {60 * SCALE:.2f} "
+                f"{(PAGE_HEIGHT - 30) * SCALE:.2f} cm /Logo Do Q"
+            )
+        self.set_font("B", 32)
+        self.x += 80
+        self.cell(30, 20, self.title, border=False, align="C")
+        self.ln(30)
+
+    def footer(self):
+        # "Page n/" right aligned, followed by the total page count
+        self.set_font("I", 8)
+        text = f"Page {self.page_no}/"
+        total_width = string_width(str(self.page_no), "I", 8)
+        self.x = PAGE_WIDTH - MARGIN - total_width - string_width(text, "I", 8)
+        self.y = PAGE_HEIGHT - 15
+        self.text(text, 5 + 0.3 * 8 / SCALE)
+        self.content.append(
+            f"q 1 0 0 1 {(PAGE_WIDTH - MARGIN - total_width) * SCALE:.2f} "
+            f"{(PAGE_HEIGHT - self.y - 5 - 0.3 * 8 / SCALE) * SCALE:.2f} cm /NB Do Q"
+        )
+
+    def text(self, text: str, baseline: float, style: str = None):
+        """Draw a text at self.x, baseline millimetres below self.y"""
+        style = self.font[0] if style is None else style
+        self.content.append(
+            f"BT /{FONTS[style]} {self.font[1]:.2f} Tf "
+            f"{self.x * SCALE:.2f} {(PAGE_HEIGHT - self.y - baseline) * SCALE:.2f} Td "
+            f"({_escape(text)}) Tj ET"
+        )
+
+    def cell(
+        self,
+        width: float,
+        height: float,
+        text: str = "",
+        border: bool = True,
+        align: str = "L",
+        label: str = None,
+    ):
+        """
+        Draw a one line cell at the current position and move right of it
+
+        A label is drawn in bold before the text, like the "**Label:** text" markdown of FPDF. A None text (a NULL
+        column) leaves the cell empty.
+        """
+        style, size = self.font
+        text = "" if text is None else text
+        if border:
+            self.content.append(
+                f"{self.x * SCALE:.2f} {(PAGE_HEIGHT - self.y) * SCALE:.2f} "
+                f"{width * SCALE:.2f} {-height * SCALE:.2f} re S"
+            )
+
+        if text or label:
+            label_width = string_width(label, "B", size) if label else 0
+            text_width = label_width + string_width(text, style, size)
+            if align == "C":
+                offset = (width - text_width) / 2
+            elif align == "R":
+                offset = width - CELL_MARGIN - text_width
+            else:
+                offset = CELL_MARGIN
+
+            x = self.x
+            baseline = height / 2 + 0.3 * size / SCALE
+            self.x += offset
+            if label:
+                self.text(label, baseline, style="B")
+                self.x += label_width
+            if text:
+                self.text(text, baseline)
+            self.x = x
+
+        self.x += width
+
+    def lines_cell(self, width: float, line_height: float, lines: list):
+        """Draw a cell holding several lines of text and move right of it"""
+        x, y = self.x, self.y
+        self.cell(width, line_height * len(lines))
+        for line in lines:
+            self.x = x
+            self.cell(width, line_height, line, border=False)
+            self.y += line_height
+        self.y = y
+
+    def ln(self, height: float):
+        self.x = MARGIN
+        self.y += height
+
+    def fits(self, height: float) -> bool:
+        return self.y + height <= PAGE_HEIGHT - PAGE_BREAK_MARGIN
+
+    def close(self):
+        self._end_page()
+        self.stream.close((FONTS["I"], 8))
+
+
+#############################   Statement layout   ############################
+def _table_header(pdf: ReportPDF):
+    pdf.set_font("B", 12)
+    for width, title in STATEMENT_COLUMNS:
+        pdf.cell(width, TABLE_CELL_HEIGHT, title)
+    pdf.ln(TABLE_CELL_HEIGHT)
+    pdf.set_font("", 11)
+
+
+def _table_row(pdf: ReportPDF, row):
+    details_width = STATEMENT_COLUMNS[1][0]
+    lines = wrap_text(row[7] or "", details_width - 2 * CELL_MARGIN, size=11)
+    row_height = TABLE_CELL_HEIGHT * len(lines)
+    if not pdf.fits(row_height):
+        pdf.add_page()
+        _table_header(pdf)
+
+    pdf.cell(25, row_height, row[2][:10])
+    pdf.lines_cell(details_width, TABLE_CELL_HEIGHT, lines)
+    pdf.cell(30, row_height, str(Money(row[5])))
+    pdf.cell(30, row_height, row[3])
+    pdf.cell(30, row_height, str(Money(row[6])))
+    pdf.ln(row_height)
+
+
+def write_report(
+    file,
+    user_data,
+    trans_data,
+    from_date: str,
+    to_date: str,
+    is_emp: bool = False,
+    logo_path: str = None,
+    balances: tuple = None,
+    totals: tuple = None,
+) -> ReportStats:
+    """
+    Write the account details and statement of an account (or the postings of an employee) as a PDF
+
+    Parameters
+    ----------
+    file : binary file
+        Destination of the document, written page by page.
+    user_data : tuple
+        AccountDetails row of the account.
+    trans_data : iterable
+        Transactions rows to list in the statement, read only once and in order.
+    from_date, to_date : str
+        Statement period as shown on the report.
+    is_emp : bool, optional
+        Report of the postings made by an employee (adds the totals, hides the customer details).
+    logo_path : str, optional
+        Image drawn in the page header.
+    balances : tuple, optional
+        Opening and closing balance (Money) of the period, shown above the transactions.
+    totals : tuple, optional
+        Credit and debit totals (paise) printed on an employee report, as given by BankService.operator_totals.
+        Summed from trans_data when not given.
+
+    Returns
+    -------
+    ReportStats
+        Pages written, number of transactions and their credit and debit totals (paise).
+
+    """
+    pdf = ReportPDF(file, logo_path=logo_path)
+    pdf.add_page()
+
+    pdf.set_font("B", 16)
+    pdf.cell(40, 10, "Account Details", border=False)
+    pdf.ln(15)
+
+    half = (PAGE_WIDTH - 2 * MARGIN) / 2
+    pdf.set_font("", 12)
+    pdf.cell(half, TABLE_CELL_HEIGHT, str(user_data[0]), label="Account Number: ")
+    if is_emp:
+        pdf.cell(half, TABLE_CELL_HEIGHT)
+    else:
+        acc_type = "Current" if user_data[1] == "C" else "Savings"
+        pdf.cell(half, TABLE_CELL_HEIGHT, acc_type, label="Account Type: ")
+    pdf.ln(TABLE_CELL_HEIGHT)
+    pdf.cell(2 * half, TABLE_CELL_HEIGHT, user_data[2], label="Account Holder: ")
+    pdf.ln(TABLE_CELL_HEIGHT)
+    if not is_emp:
+        pdf.cell(half, TABLE_CELL_HEIGHT, user_data[3], label="Email: ")
+        pdf.cell(half, TABLE_CELL_HEIGHT, f"+91{user_data[4]}", label="Mobile: ")
+        pdf.ln(TABLE_CELL_HEIGHT)
+        pdf.cell(half, TABLE_CELL_HEIGHT, user_data[6], label="DoB: ")
+        pdf.cell(half, TABLE_CELL_HEIGHT)
+        pdf.ln(TABLE_CELL_HEIGHT)
+        pdf.cell(half, TABLE_CELL_HEIGHT)
+        pdf.cell(
+            half,
+            TABLE_CELL_HEIGHT,
+            str(Money(user_data[9])),
+            label="Available Balance: ",
+        )
+    pdf.ln(20)
+
+    pdf.set_font("B", 16)
+    pdf.cell(40, 10, "Account Statement", border=False)
+    pdf.ln(15)
+
+    pdf.set_font("", 12)
+    pdf.cell(half, TABLE_CELL_HEIGHT, str(from_date), label="From Date: ")
+    pdf.cell(half, TABLE_CELL_HEIGHT, str(to_date), label="To Date: ")
+    pdf.ln(TABLE_CELL_HEIGHT)
+    if balances is not None:
+        opening_bal, closing_bal = balances
+        pdf.cell(half, TABLE_CELL_HEIGHT, str(opening_bal), label="Opening Balance: ")
+        pdf.cell(half, TABLE_CELL_HEIGHT, str(closing_bal), label="Closing Balance: ")
+        pdf.ln(TABLE_CELL_HEIGHT)
+    _table_header(pdf)
+
+    transactions = 0
+    cr_val = 0
+    db_val = 0
+    for row in trans_data:
+        _table_row(pdf, row)
+        transactions += 1
+
+        if row[3] == "Cr":
+            cr_val += row[5]
+        elif row[3] == "Db":
+            db_val += row[5]
+
+    if is_emp:
+        total_cr, total_db = (cr_val, db_val) if totals is None else totals
+        if not pdf.fits(2 * TABLE_CELL_HEIGHT):
+            pdf.add_page()
+        pdf.set_font("", 12)
+        pdf.ln(TABLE_CELL_HEIGHT)
+        pdf.cell(
+            half,
+            TABLE_CELL_HEIGHT,
+            str(Money(total_cr + total_db)),
+            label="Total Transaction: ",
+        )
+        pdf.cell(
+            half,
+            TABLE_CELL_HEIGHT,
+            str(Money(total_cr - total_db)),
+            label="Floating Amount: ",
+        )
+        pdf.ln(TABLE_CELL_HEIGHT)
+
+    pdf.close()
+    return ReportStats(pdf.page_no, transactions, cr_val, db_val)
@@ -0,0 +1,574 @@
+"""
+    Project Name:       Mo Bank (A dummy banking system)
+    Module:             server
+    Purpose:            Ledger server shared by every counter
+    Description:
+        When every copy of main.py opens the database file itself, every counter is a separate SQLite writer: their
+        BEGIN IMMEDIATE transactions queue on the file lock, and with dozens of counters a posting can wait out
+        busy_timeout and fail with SQLITE_BUSY. The ledger server is the one process that opens the database. It owns
+        the ConnectionManager and the BankService and serves any number of sessions over a local socket; main.py
+        started with --server is a client of it (client.RemoteBank) and never touches the file.
+
+        Connections are handled by an asyncio loop. Reads run on a pool of reader threads. The postings of all
+        counters go through one ledger.PostingQueue, whose writer thread applies them on the single write connection
+        in batches of up to --batch-size postings per transaction (group commit), so they never contend for the file
+        lock and a burst costs one commit per batch instead of one per posting. The account cache of the service is
+        shared by all sessions and stays current, as no other process writes.
+
+        Protocol, one JSON object per line each way (UTF-8):
+            request:    {"id": 7, "op": "deposit", "token": "...", "args": {"acc_no": 100002, "amount": 50000, ...}}
+            reply:      {"id": 7, "result": 1250000}
+                        {"id": 7, "error": {"type": "InsufficientBalance", "message": "...", "arg": 100002}}
+        Amounts are integer paise, dates ISO strings and rows JSON arrays. login returns a session token that is sent
+        with every later request, and the server checks the role of the session for each operation; postings are
+        always made in the name of the logged in user. Requests of one connection may be pipelined, replies then come
+        in completion order and are matched by id. With --http the same operations are also served as the HTTP JSON
+        API of api.py.
+
+            python server.py --db assets/mo_bank.db --listen 127.0.0.1:7219
+            python server.py --db assets/mo_bank.db --listen unix:/tmp/mobank.sock --http 127.0.0.1:8080
+"""
+
+################################   Libraries   ################################
+import argparse
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from functools import partial
+import json
+import logging
+import os
+import secrets
+import signal
+import stat
+import sys
+import time
+
+from database import MAX_INTEGER, READ_POOL_SIZE, ConnectionManager, create_schema
+import ledger
+from money import Money
+from service import BankService, ServiceError, TransactionCursor
+
+
+#############################   Global variables   ############################
+DEFAULT_ADDRESS = "127.0.0.1:7219"
+DEFAULT_DB_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "assets", "mo_bank.db"
+)
+MAX_LINE_BYTES = 1_000_000  # longest request line accepted
+MAX_PENDING = 32  # requests of one connection handled at the same time
+MAX_PAGE_SIZE = 5000  # transaction rows per page
+SESSION_IDLE_SECONDS = 8 * 60 * 60  # sessions unused for longer have to log in again
+
+PASSWORD_COLUMN = 7  # of AccountDetails rows, never sent to clients
+
+# Roles allowed to run an operation
+ADMINS = ("A",)
+STAFF = ("A", "S")
+EVERYONE = ("A", "S", "C")
+
+log = logging.getLogger("mobank.server")
+
+
+###############################   Exceptions   ################################
+class BadRequest(Exception):
+    """A request that doesn't follow the protocol"""
+
+
+class NotAuthenticated(ServiceError):
+    """A request without a valid session"""
+
+
+class NotAllowed(ServiceError):
+    """A request the role of its session doesn't allow"""
+
+
+#############################   Helper functions   ############################
+def parse_address(address: str) -> tuple:
+    """
+    Family and location of a server address
+
+    Returns
+    -------
+    tuple
+        ("unix", path) for unix:/path, ("tcp", (host, port)) for host:port.
+
+    """
+    if address.startswith("unix:"):
+        if len(address) == 5:
+            raise ValueError("Socket path missing in unix: address")
+        return "unix", address[5:]
+
+    host, _, port = address.rpartition(":")
+    if not host or not port.isdigit():
+        raise ValueError(
+            f"Invalid server address {address!r}, expected host:port or unix:/path"
+        )
+    return "tcp", (host, int(port))
+
+
+async def listen(address: str, client_connected, limit: int):
+    """asyncio server accepting connections on a host:port or unix:/path address"""
+    family, location = parse_address(address)
+    if family == "unix":
+        # Socket file left behind by an earlier run
+        if os.path.exists(location) and stat.S_ISSOCK(os.stat(location).st_mode):
+            os.remove(location)
+        return await asyncio.start_unix_server(client_connected, location, limit=limit)
+    return await asyncio.start_server(client_connected, *location, limit=limit)
+
+
+async def stop_listening(address: str, server, connections: dict):
+    """Close a server made by listen() and its connections (StreamWriter by handler task), then wait for them"""
+    server.close()
+    # Closed connections read to their end, so their requests still in flight are answered
+    for writer in connections.values():
+        writer.close()
+    await asyncio.gather(*connections, return_exceptions=True)
+    await server.wait_closed()
+
+    family, location = parse_address(address)
+    if family == "unix" and os.path.exists(location):
+        os.remove(location)
+
+
+def encode_message(message: dict) -> bytes:
+    return json.dumps(message, separators=(",", ":")).encode() + b"\n"
+
+
+def error_details(err: Exception) -> dict:
+    """Type, message and argument of a refused request, as sent in its reply"""
+    details = {"type": type(err).__name__, "message": str(err)}
+    if isinstance(err, ledger.InvalidAmount):
+        amount = err.amount
+        details["arg"] = amount.paise if isinstance(amount, Money) else amount
+    elif isinstance(err, (ledger.AccountNotFound, ledger.InsufficientBalance)):
+        details["arg"] = err.acc_no
+    return details
+
+
+def paise_amount(value, name: str = "amount") -> Money:
+    """Money of an amount sent in paise, which has to be a JSON integer"""
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise BadRequest(f"{name} should be an integer number of paise")
+    if abs(value) > MAX_INTEGER:
+        raise BadRequest(f"{name} out of range")
+    return Money(value)
+
+
+def public_row(row):
+    """AccountDetails row with its password hash blanked"""
+    if row is None:
+        return None
+    return row[:PASSWORD_COLUMN] + ("",) + row[PASSWORD_COLUMN + 1 :]
+
+
+def check_own_account(session: dict, acc_no: int):
+    # Customers only reach their own account, employees reach every account
+    if session["role"] == "C" and acc_no != session["acc_no"]:
+        raise NotAllowed("Not allowed for this account")
+
+
+def check_operator(session: dict, operator: int):
+    # Admins see the postings of every employee, others only their own
+    if session["role"] != "A" and operator != session["acc_no"]:
+        raise NotAllowed("Not allowed for this employee")
+
+
+def posting_operator(session: dict, operator: int = None) -> int:
+    """Operator of a posting, always the logged in user"""
+    if operator is not None and operator != session["acc_no"]:
+        raise NotAllowed("Postings can only be made by the logged in user")
+    return session["acc_no"]
+
+
+################################   Server   ###################################
+class LedgerServer:
+    """
+    Serves a BankService over a local socket to many sessions
+
+    Parameters
+    ----------
+    db_path : str
+        Path of the SQLite database file, only opened by this process.
+    read_threads : int, optional
+        Threads running the reads, also the size of the read connection pool. The default is READ_POOL_SIZE.
+    batch_size : int, optional
+        Postings committed together at most. The default is ledger.POSTING_BATCH_SIZE.
+    linger_ms : float, optional
+        Milliseconds a batch waits for more postings. The default is ledger.POSTING_LINGER_MS.
+
+    """
+
+    # Operation: (roles allowed, None if no session is needed; writes the database)
+    OPERATIONS = {
+        "login": (None, False),
+        "logout": (EVERYONE, False),
+        "get_account": (EVERYONE, False),
+        "get_session": (EVERYONE, False),
+        "get_employee": (STAFF, False),
+        "open_account": (ADMINS, True),
+        "update_kyc": (ADMINS, True),
+        "self_withdraw": (EVERYONE, True),
+        "deposit": (STAFF, True),
+        "withdraw": (STAFF, True),
+        "transfer": (STAFF, True),
+        "transaction_page": (EVERYONE, False),
+        "operator_totals": (STAFF, False),
+        "balance_as_of": (EVERYONE, False),
+        "statement_balances": (EVERYONE, False),
+    }
+
+    def __init__(
+        self,
+        db_path: str,
+        read_threads: int = READ_POOL_SIZE,
+        batch_size: int = ledger.POSTING_BATCH_SIZE,
+        linger_ms: float = ledger.POSTING_LINGER_MS,
+    ):
+        self.db = ConnectionManager(db_path, read_pool_size=read_threads)
+        self.postings = ledger.PostingQueue(self.db, batch_size, linger_ms)
+        self.bank = BankService(self.db, postings=self.postings)
+        self.sessions = {}  # by token, only used on the event loop thread
+        self.served = 0
+
+        self._reads = ThreadPoolExecutor(read_threads, thread_name_prefix="ledger-read")
+        # Write requests wait on the posting queue here; enough of them to fill the batch being committed and the next
+        self._writes = ThreadPoolExecutor(
+            2 * batch_size, thread_name_prefix="ledger-write"
+        )
+        self._connections = {}  # StreamWriter of every open connection, by its task
+
+    async def serve(self, address: str, stop: asyncio.Event):
+        """Accept connections on address until stop is set"""
+        server = await listen(address, self._connection, MAX_LINE_BYTES)
+        log.info("Serving %s on %s", self.db.db_path, address)
+        try:
+            await stop.wait()
+        finally:
+            await stop_listening(address, server, self._connections)
+
+    def close(self):
+        self._reads.shutdown()
+        self._writes.shutdown()
+        self.postings.close()
+        self.db.close()
+
+    ##########################   Connections   ##########################
+    async def _connection(self, reader, writer):
+        self._connections[asyncio.current_task()] = writer
+        send_lock = asyncio.Lock()
+        pending = asyncio.Semaphore(MAX_PENDING)
+        tasks = set()
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # Longer than MAX_LINE_BYTES, the rest of the stream can't be framed any more
+                    error = {"type": "BadRequest", "message": "Request too long"}
+                    await self._send(writer, send_lock, {"id": None, "error": error})
+                    break
+                if not line:
+                    break
+
+                await pending.acquire()
+                task = asyncio.create_task(
+                    self._respond(line, writer, send_lock, pending)
+                )
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except ConnectionError:
+            pass
+        finally:
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            del self._connections[asyncio.current_task()]
+            writer.close()
+
+    async def _respond(self, line: bytes, writer, send_lock, pending):
+        try:
+            await self._send(writer, send_lock, await self.handle(line))
+        except ConnectionError:
+            pass
+        finally:
+            pending.release()
+
+    @staticmethod
+    async def _send(writer, send_lock, message: dict):
+        async with send_lock:
+            writer.write(encode_message(message))
+            await writer.drain()
+
+    ##########################   Requests   ##########################
+    async def handle(self, line: bytes) -> dict:
+        """Reply to one request line"""
+        try:
+            request = json.loads(line)
+        except ValueError as err:
+            return {"id": None, "error": {"type": "BadRequest", "message": str(err)}}
+        if not isinstance(request, dict):
+            error = {"type": "BadRequest", "message": "Request should be a JSON object"}
+            return {"id": None, "error": error}
+
+        result, error = await self.call(
+            request.get("op"), request.get("token"), request.get("args", {})
+        )
+        if error is not None:
+            return {"id": request.get("id"), "error": error}
+        return {"id": request.get("id"), "result": result}
+
+    async def call(self, op, token, args) -> tuple:
+        """
+        Run an operation for any front end
+
+        Returns
+        -------
+        tuple
+            Result and None, or None and the error details of the refused or failed operation.
+
+        """
+        try:
+            result = await self.run(op, token, args)
+        except (ServiceError, ledger.PostingError) as err:
+            return None, error_details(err)
+        except (BadRequest, TypeError, ValueError, KeyError, OverflowError) as err:
+            # OverflowError: a number too large for an SQLite INTEGER
+            return None, {"type": "BadRequest", "message": str(err)}
+        except Exception:
+            log.exception("Operation %r failed", op)
+            return None, {"type": "ServerError", "message": "Internal server error"}
+
+        self.served += 1
+        return result, None
+
+    async def run(self, op, token, args):
+        """Result of an operation, raises the error refusing it"""
+        if op not in self.OPERATIONS:
+            raise BadRequest(f"Unknown operation {op!r}")
+        if not isinstance(args, dict):
+            raise BadRequest("args should be a JSON object")
+
+        roles, writes = self.OPERATIONS[op]
+        session = None
+        if roles is not None:
+            session = self._session(token)
+            if session["role"] not in roles:
+                raise NotAllowed("Not allowed for your role")
+        if op == "logout":
+            del self.sessions[token]
+            return None
+
+        result = await asyncio.get_running_loop().run_in_executor(
+            self._writes if writes else self._reads,
+            partial(getattr(self, f"_{op}"), session, **args),
+        )
+
+        if op == "login":
+            return self._open_session(result)
+        if op == "update_kyc":
+            self._set_role(args["acc_no"], args["user_type"])
+        return result
+
+    ##########################   Sessions   ##########################
+    def _session(self, token) -> dict:
+        if token is None:
+            raise NotAuthenticated("Please login first")
+        session = self.sessions.get(token) if isinstance(token, str) else None
+        now = time.monotonic()
+        if session is None or now - session["seen"] > SESSION_IDLE_SECONDS:
+            if session is not None:
+                del self.sessions[token]
+            raise NotAuthenticated("Session expired, please login again")
+        session["seen"] = now
+        return session
+
+    def _open_session(self, details):
+        """Token and session details of a login, None for invalid credentials"""
+        if details is None:
+            return None
+
+        now = time.monotonic()
+        for token, session in list(self.sessions.items()):
+            if now - session["seen"] > SESSION_IDLE_SECONDS:
+                del self.sessions[token]
+
+        token = secrets.token_urlsafe(24)
+        self.sessions[token] = {
+            "acc_no": details["acc_no"],
+            "role": details["role"],
+            "seen": now,
+        }
+        return {"token": token, "session": details}
+
+    def _set_role(self, acc_no: int, role: str):
+        # A KYC update may change the role of users already logged in
+        for session in self.sessions.values():
+            if session["acc_no"] == acc_no:
+                session["role"] = role
+
+    ##########################   Operations   ##########################
+    # Run on the database threads with the session of the request and its args, amounts come and go as paise
+
+    def _login(self, session, user_info: str, password: str):
+        return self.bank.login(user_info, password)
+
+    def _get_account(self, session, acc_no: int):
+        check_own_account(session, acc_no)
+        return public_row(self.bank.get_account(acc_no))
+
+    def _get_session(self, session, acc_no: int):
+        check_own_account(session, acc_no)
+        return self.bank.get_session(acc_no)
+
+    def _get_employee(self, session, acc_no: int):
+        check_operator(session, acc_no)
+        return public_row(self.bank.get_employee(acc_no))
+
+    def _open_account(self, session, opening_balance: int, operator=None, **kyc):
+        return self.bank.open_account(
+            opening_balance=paise_amount(opening_balance, "opening_balance"),
+            operator=posting_operator(session, operator),
+            **kyc,
+        )
+
+    def _update_kyc(self, session, **kyc):
+        self.bank.update_kyc(**kyc)
+
+    def _self_withdraw(self, session, acc_no: int, amount: int):
+        if acc_no != session["acc_no"]:
+            raise NotAllowed("Only the account holder can withdraw at the ATM")
+        return self.bank.self_withdraw(acc_no, paise_amount(amount)).paise
+
+    def _deposit(self, session, acc_no: int, amount: int, operator=None):
+        operator = posting_operator(session, operator)
+        return self.bank.deposit(acc_no, paise_amount(amount), operator).paise
+
+    def _withdraw(self, session, acc_no: int, amount: int, operator=None):
+        operator = posting_operator(session, operator)
+        return self.bank.withdraw(acc_no, paise_amount(amount), operator).paise
+
+    def _transfer(
+        self,
+        session,
+        sender_acc_no: int,
+        receiver_acc_no: int,
+        amount: int,
+        operator=None,
+    ):
+        operator = posting_operator(session, operator)
+        return self.bank.transfer(
+            sender_acc_no, receiver_acc_no, paise_amount(amount), operator
+        ).paise
+
+    def _transaction_page(
+        self, session, column: str, key: int, bounds: list, after: list, size: int
+    ):
+        """Rows after `after` (timestamp, txn_id) of an account or operator, as TransactionCursor.fetchmany"""
+        if column == "acc_no":
+            check_own_account(session, key)
+        else:
+            check_operator(session, key)
+        if not 0 < size <= MAX_PAGE_SIZE:
+            raise BadRequest(f"Page size should be 1 to {MAX_PAGE_SIZE}")
+        cursor = TransactionCursor(self.db, column, key, tuple(bounds), after=after)
+        return cursor.fetchmany(size)
+
+    def _operator_totals(self, session, operator: int, from_date: str, to_date: str):
+        check_operator(session, operator)
+        return self.bank.operator_totals(
+            operator, date.fromisoformat(from_date), date.fromisoformat(to_date)
+        )
+
+    def _balance_as_of(self, session, acc_no: int, day: str):
+        check_own_account(session, acc_no)
+        return self.bank.balance_as_of(acc_no, date.fromisoformat(day)).paise
+
+    def _statement_balances(self, session, acc_no: int, from_date: str, to_date: str):
+        check_own_account(session, acc_no)
+        balances = self.bank.statement_balances(
+            acc_no, date.fromisoformat(from_date), date.fromisoformat(to_date)
+        )
+        return [balance.paise for balance in balances]
+
+
+###############################   Main Program   ##############################
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Mo Bank ledger server")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="database file")
+    parser.add_argument(
+        "--listen",
+        default=DEFAULT_ADDRESS,
+        metavar="ADDRESS",
+        help=f"host:port or unix:/path to listen on (default {DEFAULT_ADDRESS})",
+    )
+    parser.add_argument(
+        "--http",
+        metavar="ADDRESS",
+        help="also serve the HTTP JSON API (api.py) on host:port or unix:/path",
+    )
+    parser.add_argument(
+        "--read-threads",
+        type=int,
+        default=READ_POOL_SIZE,
+        help="threads and connections serving the reads",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=ledger.POSTING_BATCH_SIZE,
+        help="postings committed together at most, 1 commits each on its own",
+    )
+    parser.add_argument(
+        "--linger-ms",
+        type=float,
+        default=ledger.POSTING_LINGER_MS,
+        help="milliseconds a batch of postings waits for more before it commits",
+    )
+    args = parser.parse_args(argv)
+    if args.batch_size < 1:
+        parser.error("--batch-size should be at least 1")
+    try:
+        for address in filter(None, (args.listen, args.http)):
+            parse_address(address)
+    except ValueError as err:
+        parser.error(str(err))
+    return args
+
+
+async def run_server(server: LedgerServer, address: str, http_address: str = None):
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop.set)
+
+    listeners = [server.serve(address, stop)]
+    if http_address:
+        from api import HttpApi
+
+        listeners.append(HttpApi(server).serve(http_address, stop))
+        log.info("HTTP API on %s", http_address)
+    await asyncio.gather(*listeners)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+    server = LedgerServer(args.db, args.read_threads, args.batch_size, args.linger_ms)
+    try:
+        create_schema(server.db)
+        asyncio.run(run_server(server, args.listen, args.http))
+    finally:
+        server.close()
+    log.info(
+        "Stopped after %d requests, %d postings committed in %d batches",
+        server.served,
+        server.postings.applied,
+        server.postings.batches,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
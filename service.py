@@ -0,0 +1,573 @@
+"""
+    Project Name:       Mo Bank (A dummy banking system)
+    Module:             service
+    Purpose:            Headless banking service layer
+    Description:
+        BankService holds the banking operations (login, account lookup, deposit, withdrawal, transfer, statements,
+        account opening and KYC update) behind plain arguments and plain results, so the ledger can be driven from
+        scripts, benchmarks or other front ends without a QApplication. The Qt slots in main.py read their widgets,
+        call the service and display what it returns.
+
+        Rule violations are raised as ServiceError (its message is meant to be shown to the user); posting failures
+        are raised as the ledger module's PostingError subclasses.
+"""
+
+################################   Libraries   ################################
+from collections import OrderedDict
+from datetime import date, datetime, time, timedelta
+from functools import partial
+import hashlib
+import hmac
+import re
+import secrets
+import sqlite3 as sql
+import threading
+
+from database import ConnectionManager
+import ledger
+from money import Money
+import queries
+
+
+#############################   Global variables   ############################
+ACCOUNT_CACHE_SIZE = 10_000  # AccountDetails rows kept by a BankService
+
+
+###############################   Exceptions   ################################
+class ServiceError(Exception):
+    """A request was refused, the message can be shown to the user as is"""
+
+
+#############################   Helper functions   ############################
+def encrypt_password(pwd: str) -> str:
+    return hashlib.md5(pwd.encode()).hexdigest()
+
+
+def login_identifier(user_info: str) -> str:
+    """Email or mobile number as stored in LoginIdentifiers (see database.LOGIN_EMAIL and LOGIN_MOBILE)"""
+    user_info = user_info.strip()
+    if "@" in user_info:
+        return user_info.lower()
+    return user_info.lstrip("+")
+
+
+def generate_password() -> str:
+    return secrets.token_urlsafe(nbytes=8)
+
+
+def timestamp_bounds(from_dt: datetime, to_dt: datetime) -> tuple:
+    """
+    Bounds for a date range filter on Transactions.timestamp
+
+    The timestamp is stored as str(datetime), which sorts in time order, so it is compared directly (not through
+    datetime()) to let SQLite seek the (acc_no, timestamp) and (operator, timestamp) indexes. The upper bound is
+    exclusive and rounded up to the next second so fractional seconds at to_dt are still included.
+    """
+    return str(from_dt), str(to_dt.replace(microsecond=0) + timedelta(seconds=1))
+
+
+def day_range(from_date: date, to_date: date) -> tuple:
+    """Start of from_date and end of to_date, refusing ranges that run backwards"""
+    from_dt = datetime.combine(from_date, time.min)
+    to_dt = datetime.combine(to_date, time.max)
+    if from_dt > to_dt:
+        raise ServiceError("From date can not exceed to date")
+    return from_dt, to_dt
+
+
+def name_prefix(gender: str) -> str:
+    if gender == "M":
+        return "Mr. "
+    elif gender == "F":
+        return "Mrs. "
+    return ""
+
+
+def validate_fullname(name: str) -> tuple:
+    # add your name validation logic here
+    if len(name) < 2:
+        return False, "Full name should have atleast 2 characters"
+    return True, ""
+
+
+def validate_email(email: str) -> bool:
+    regex = r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,7}\b"
+    return True if re.fullmatch(regex, email) else False
+
+
+def validate_mobile(mobile: str) -> bool:
+    regex = r"\b^\+?[6-9][0-9]{9}$\b"
+    return True if re.fullmatch(regex, mobile) else False
+
+
+def validate_password(pwd: str) -> tuple:
+    # add your password validation logic here
+    if len(pwd) < 6:
+        return False, "Password should have atleast 6 characters"
+    return True, ""
+
+
+def validate_account_no(acc_no: str) -> bool:
+    ret = False
+    if len(acc_no) >= 6:
+        try:
+            int(acc_no)
+            ret = True
+        except ValueError:
+            pass
+    return ret
+
+
+def validate_kyc(full_name: str, email: str, mobile: str, password: str):
+    """Raise ServiceError for the first invalid KYC field"""
+    ret, err_msg = validate_fullname(full_name)
+    if not ret:
+        raise ServiceError(err_msg)
+
+    if not validate_email(email):
+        raise ServiceError("Please provide a valid mail")
+
+    if not validate_mobile(mobile):
+        raise ServiceError("Please provide a valid mobile number")
+
+    ret, err_msg = validate_password(password)
+    if not ret:
+        raise ServiceError(err_msg)
+
+
+def _duplicate_error(err: sql.IntegrityError) -> ServiceError:
+    if "AccountDetails.mobile" in str(err):
+        return ServiceError("Mobile number already exists")
+    if "AccountDetails.email" in str(err):
+        return ServiceError("Email already exists")
+    return ServiceError(str(err))
+
+
+#############################   Account cache   ###############################
+class AccountCache:
+    """
+    Least recently used cache of AccountDetails rows by account number
+
+    Thread safe, as lookups come from the GUI thread and from the background pool. Rows of accounts that don't
+    exist are not cached. Every change made through the cache bumps its generation, so a row read from the database
+    before a posting committed can be refused by put() instead of caching a stale balance.
+
+    Parameters
+    ----------
+    maxsize : int, optional
+        Most rows kept, the least recently used row is dropped beyond it. 0 disables the cache.
+
+    """
+
+    def __init__(self, maxsize: int = ACCOUNT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0
+        self._rows = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, acc_no: int):
+        """Cached row of an account, None on a miss"""
+        with self._lock:
+            row = self._rows.get(acc_no)
+            if row is None:
+                self.misses += 1
+                return None
+            self._rows.move_to_end(acc_no)
+            self.hits += 1
+            return row
+
+    def put(self, row: tuple, generation: int = None):
+        """Cache a row, unless the cache changed since `generation` was read"""
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._rows[row[0]] = row
+            self._rows.move_to_end(row[0])
+            if len(self._rows) > self.maxsize:
+                self._rows.popitem(last=False)
+
+    def set_balance(self, acc_no: int, balance: Money):
+        """Write a posted balance through to the cached row, if any"""
+        with self._lock:
+            self.generation += 1
+            row = self._rows.get(acc_no)
+            if row is not None:
+                self._rows[acc_no] = row[:9] + (balance.paise,) + row[10:]
+
+    def invalidate(self, *acc_nos: int):
+        with self._lock:
+            self.generation += 1
+            for acc_no in acc_nos:
+                self._rows.pop(acc_no, None)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._rows.clear()
+
+    def stats(self) -> dict:
+        """Size and hit/miss counters of the cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._rows),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+##########################   Transaction cursor   #############################
+class TransactionCursor:
+    """
+    Lazy cursor over the Transactions rows of an account or an operator between two timestamps
+
+    Rows come in (timestamp, txn_id) order, one page per fetchmany(). Every page is a keyset query that seeks the
+    (acc_no, timestamp) or (operator, timestamp) index just after the last row read, on a reader borrowed only for
+    that query, so an open cursor never holds a pooled connection. A cursor given `after`, the (timestamp, txn_id)
+    of a row already read, carries on from that row.
+    """
+
+    def __init__(
+        self,
+        db: ConnectionManager,
+        column: str,
+        key: int,
+        bounds: tuple,
+        after: tuple = None,
+    ):
+        if column not in queries.TRANSACTION_PAGES:
+            raise ValueError(f"Can not page Transactions by {column}")
+        self.db = db
+        self.exhausted = False
+        self._query = queries.TRANSACTION_PAGES[column]
+        self._key = key
+        self._upper = bounds[1]
+        self._last = tuple(after) if after else (bounds[0], 0)
+
+    def fetchmany(self, size: int) -> list:
+        if self.exhausted:
+            return []
+
+        last_ts, last_id = self._last
+        params = (self._key, last_ts, self._upper, last_ts, last_id, size)
+        with self.db.reader() as conn:
+            rows = conn.execute(self._query, params).fetchall()
+
+        if len(rows) < size:
+            self.exhausted = True
+        if rows:
+            self._last = (rows[-1][2], rows[-1][0])
+        return rows
+
+    def fetchall(self, page_size: int = 1000) -> list:
+        rows = []
+        while not self.exhausted:
+            rows.extend(self.fetchmany(page_size))
+        return rows
+
+
+###############################   Bank service   ##############################
+class BankService:
+    """
+    Banking operations over a Mo Bank database
+
+    Account and transaction rows are returned as plain tuples in table column order:
+        AccountDetails: acc_no, acc_type, full_name, email, mobile, gender, dob, password, user_type, curr_bal
+        Transactions:   txn_id, acc_no, timestamp, operation, prev_bal, trans_amount, avail_bal, operation_details,
+                        operator
+    Amounts in rows are integer paise; amounts passed in and returned by postings are Money.
+
+    Parameters
+    ----------
+    db : ConnectionManager
+        Connection manager of an initialised database.
+    cache_size : int, optional
+        AccountDetails rows kept in the account cache, 0 to disable it. The default is ACCOUNT_CACHE_SIZE.
+    postings : ledger.PostingQueue, optional
+        Queue applying the postings with group commit. The default is None, postings are committed one by one on
+        the calling thread.
+
+    Account rows are cached in process. Postings and KYC updates made through the service keep the cache current;
+    call accounts.clear() after changing AccountDetails any other way (another process, batch.post_batch).
+
+    """
+
+    def __init__(
+        self,
+        db: ConnectionManager,
+        cache_size: int = ACCOUNT_CACHE_SIZE,
+        postings: ledger.PostingQueue = None,
+    ):
+        self.db = db
+        self.accounts = AccountCache(cache_size)
+        self.postings = postings
+
+    ##############################   Accounts   ###############################
+    def get_account(self, acc_no: int):
+        """AccountDetails row of an account, None if it doesn't exist"""
+        data = self.accounts.get(acc_no)
+        if data is not None:
+            return data
+
+        generation = self.accounts.generation
+        with self.db.reader() as conn:
+            data = conn.execute(queries.ACCOUNT_BY_NO, (acc_no,)).fetchone()
+        if data is not None:
+            self.accounts.put(data, generation)
+        return data
+
+    @staticmethod
+    def _session(data) -> dict:
+        return {
+            "acc_no": data[0],
+            "name": data[2],
+            "role": data[8],
+            "prefix": name_prefix(data[5]),
+        }
+
+    def get_session(self, acc_no: int):
+        """Session details (acc_no, name, role, prefix) of an account, None if it doesn't exist"""
+        data = self.get_account(acc_no)
+        if data is None:
+            return None
+        return self._session(data)
+
+    def login(self, user_info: str, password: str):
+        """
+        Check the credentials of a user
+
+        The identifier is resolved to its account through the LoginIdentifiers index, then the password is checked.
+        Emails are matched regardless of case and mobile numbers with or without a leading +.
+
+        Parameters
+        ----------
+        user_info : str
+            Email or mobile number of the user.
+        password : str
+            Plain text password.
+
+        Returns
+        -------
+        dict or None
+            Session details of the user, None if the credentials are invalid.
+
+        """
+        generation = self.accounts.generation
+        with self.db.reader() as conn:
+            query = queries.ACCOUNTS_BY_LOGIN
+            accounts = conn.execute(query, (login_identifier(user_info),)).fetchall()
+
+        password = encrypt_password(password)
+        for det in accounts:
+            if hmac.compare_digest(det[7], password):
+                self.accounts.put(det, generation)
+                return self._session(det)
+        return None
+
+    def logout(self):
+        """End the session of the logged in user, nothing to do for a local service"""
+
+    def get_employee(self, acc_no: int):
+        """AccountDetails row of an Admin or SWO account"""
+        data = self.get_account(acc_no)
+        if data is None or data[8] not in ["A", "S"]:
+            raise ServiceError(
+                "Only employees (Admin/SWO) transanctions can be checked here"
+            )
+        return data
+
+    def open_account(
+        self,
+        full_name: str,
+        email: str,
+        mobile: str,
+        gender: str,
+        dob: str,
+        acc_type: str,
+        opening_balance: Money,
+        password: str,
+        operator: int,
+    ) -> int:
+        """
+        Open a customer account with its opening balance
+
+        Returns
+        -------
+        int
+            Account number of the new account.
+
+        """
+        validate_kyc(full_name, email, mobile, password)
+
+        try:
+            with self.db.writer() as conn:
+                # Add information to DB
+                params = (acc_type, full_name, email, mobile, gender, dob)
+                params += (encrypt_password(password), "C", opening_balance.paise)
+                acc_no = conn.execute(queries.INSERT_ACCOUNT, params).lastrowid
+                params = (acc_no, str(datetime.now()), "Cr", 0, opening_balance.paise)
+                params += (opening_balance.paise, "Account opening balance", operator)
+                conn.execute(queries.INSERT_TRANSACTION, params)
+        except sql.IntegrityError as err:
+            raise _duplicate_error(err) from None
+        return acc_no
+
+    def update_kyc(
+        self,
+        acc_no: int,
+        full_name: str,
+        email: str,
+        mobile: str,
+        gender: str,
+        dob: str,
+        acc_type: str,
+        user_type: str,
+        password: str,
+    ):
+        """Update the KYC details, role and password of an account"""
+        validate_kyc(full_name, email, mobile, password)
+
+        try:
+            with self.db.writer() as conn:
+                params = (acc_type, full_name, email, mobile, gender, dob)
+                params += (encrypt_password(password), user_type, acc_no)
+                conn.execute(queries.UPDATE_KYC, params)
+        except sql.IntegrityError as err:
+            raise _duplicate_error(err) from None
+        finally:
+            self.accounts.invalidate(acc_no)
+
+    ##############################   Postings   ###############################
+    def _post(self, posting, acc_no: int, *args, **kwargs) -> Money:
+        # A refused posting may be due to a balance changed elsewhere, so the cached row is dropped
+        try:
+            if self.postings is None:
+                avail_bal = posting(self.db, acc_no, *args, **kwargs)
+                self.accounts.set_balance(acc_no, avail_bal)
+                return avail_bal
+            # The queue writes the balance through once the batch committed, so a lookup that misses the cache
+            # meanwhile can't cache the balance from before the commit under the new generation
+            future = self.postings.submit(
+                posting,
+                acc_no,
+                *args,
+                committed=partial(self.accounts.set_balance, acc_no),
+                **kwargs,
+            )
+            return future.result()
+        except ledger.PostingError:
+            self.accounts.invalidate(acc_no)
+            raise
+
+    def self_withdraw(self, acc_no: int, amount: Money) -> Money:
+        """Withdrawal by the account holder at the ATM, returns the available balance"""
+        return self._post(
+            ledger.withdraw,
+            acc_no,
+            amount,
+            operator=acc_no,
+            details="Withdrawl from ATM",
+        )
+
+    def deposit(self, acc_no: int, amount: Money, operator: int) -> Money:
+        """Deposit at the bank counter, returns the available balance"""
+        if acc_no == operator:
+            raise ServiceError("Transaction not allowed for self")
+        return self._post(ledger.deposit, acc_no, amount, operator=operator)
+
+    def withdraw(self, acc_no: int, amount: Money, operator: int) -> Money:
+        """Withdrawal at the bank counter, returns the available balance"""
+        if acc_no == operator:
+            raise ServiceError("Transaction not allowed for self")
+        return self._post(ledger.withdraw, acc_no, amount, operator=operator)
+
+    def transfer(
+        self, sender_acc_no: int, receiver_acc_no: int, amount: Money, operator: int
+    ) -> Money:
+        """Transfer at the bank counter, returns the available balance of the sender"""
+        if sender_acc_no == operator:
+            raise ServiceError("Transaction not allowed for self")
+        if sender_acc_no == receiver_acc_no:
+            raise ServiceError("Can not transfer to same account")
+        try:
+            return self._post(
+                ledger.transfer,
+                sender_acc_no,
+                receiver_acc_no,
+                amount,
+                operator=operator,
+            )
+        finally:
+            # Only the sender's balance comes back, the receiver is read again on its next lookup
+            self.accounts.invalidate(receiver_acc_no)
+
+    #############################   Statements   ##############################
+    def statement(self, acc_no: int, from_date: date, to_date: date) -> list:
+        """Transactions of an account between two dates (both inclusive)"""
+        bounds = timestamp_bounds(*day_range(from_date, to_date))
+        with self.db.reader() as conn:
+            params = (acc_no,) + bounds
+            return conn.execute(queries.ACCOUNT_TRANSACTIONS, params).fetchall()
+
+    def operator_transactions(
+        self, operator: int, from_date: date, to_date: date
+    ) -> list:
+        """Transactions posted by an operator between two dates (both inclusive)"""
+        bounds = timestamp_bounds(*day_range(from_date, to_date))
+        with self.db.reader() as conn:
+            params = (operator,) + bounds
+            return conn.execute(queries.OPERATOR_TRANSACTIONS, params).fetchall()
+
+    def statement_cursor(
+        self, acc_no: int, from_date: date, to_date: date
+    ) -> TransactionCursor:
+        """Lazy cursor over the transactions of an account between two dates (both inclusive)"""
+        bounds = timestamp_bounds(*day_range(from_date, to_date))
+        return TransactionCursor(self.db, "acc_no", acc_no, bounds)
+
+    def operator_cursor(
+        self, operator: int, from_date: date, to_date: date
+    ) -> TransactionCursor:
+        """Lazy cursor over the transactions posted by an operator between two dates (both inclusive)"""
+        bounds = timestamp_bounds(*day_range(from_date, to_date))
+        return TransactionCursor(self.db, "operator", operator, bounds)
+
+    def operator_totals(self, operator: int, from_date: date, to_date: date) -> tuple:
+        """
+        Credit and debit totals (paise) of the transactions posted by an operator between two dates
+
+        Read from OperatorDailyTotals, one row per day of the period however many postings were made.
+        """
+        day_range(from_date, to_date)  # refuses ranges that run backwards
+        with self.db.reader() as conn:
+            params = (operator, str(from_date), str(to_date))
+            return conn.execute(queries.OPERATOR_TOTALS, params).fetchone()
+
+    def balance_as_of(self, acc_no: int, day: date) -> Money:
+        """Balance of an account at the end of a day, one seek on the DailyBalances snapshots"""
+        with self.db.reader() as conn:
+            ret = conn.execute(queries.BALANCE_AS_OF, (acc_no, str(day))).fetchone()
+        return Money(ret[0] if ret else 0)
+
+    def statement_balances(self, acc_no: int, from_date: date, to_date: date) -> tuple:
+        """Opening (end of the day before from_date) and closing balance of a statement period"""
+        opening_bal = self.balance_as_of(acc_no, from_date - timedelta(days=1))
+        return opening_bal, self.balance_as_of(acc_no, to_date)
+
+    @staticmethod
+    def transaction_totals(trans_data) -> tuple:
+        """Credit and debit totals (paise) of a list of transaction rows"""
+        cr_val = 0
+        db_val = 0
+        for row in trans_data:
+            if row[3] == "Cr":
+                cr_val += row[5]
+            elif row[3] == "Db":
+                db_val += row[5]
+        return cr_val, db_val
@@ -0,0 +1,324 @@
+"""
+    Project Name:       Mo Bank (A dummy banking system)
+    Module:             statements
+    Purpose:            Month-end PDF statements of every customer
+    Description:
+        Writes the statement of one calendar month for every customer account into an output directory, one PDF per
+        account, without the GUI. The account list is split into chunks handed to a pool of worker processes. Every
+        worker opens its own read only ConnectionManager on the database and streams each statement through
+        report.write_report, so workers share nothing but the database file and the run scales with the cores.
+
+        Each finished statement is appended to manifest.csv in the output directory (account, file, transactions,
+        pages, totals). PDFs are written under a temporary name and renamed once complete, so running the same
+        command again after an interruption skips the accounts already in the manifest and writes the rest.
+
+            python statements.py --db assets/mo_bank.db --month 2024-03 --out statements --workers 8
+"""
+
+################################   Libraries   ################################
+import argparse
+import csv
+from datetime import date, datetime, timedelta
+from multiprocessing import Pool
+import os
+import sys
+import time
+
+from database import ConnectionManager
+import queries
+from report import write_report
+from service import BankService
+
+
+#############################   Global variables   ############################
+STATEMENT_CHUNK_SIZE = 100  # accounts per worker task
+STATEMENT_FETCH_SIZE = 1000  # transactions read per query
+
+MANIFEST_NAME = "manifest.csv"
+MANIFEST_FIELDS = [
+    "month",
+    "acc_no",
+    "file_name",
+    "transactions",
+    "pages",
+    "credits",
+    "debits",
+    "created_at",
+]
+
+DEFAULT_LOGO_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "assets", "images", "Mo Bank logo.JPG"
+)
+
+# Service of a worker process, opened by _init_worker
+_bank = None
+_logo_path = None
+
+
+#############################   Helper functions   ############################
+def month_range(month: str) -> tuple:
+    """First and last day of a YYYY-MM month"""
+    first = datetime.strptime(month, "%Y-%m").date()
+    next_month = date(first.year + first.month // 12, first.month % 12 + 1, 1)
+    return first, next_month - timedelta(days=1)
+
+
+def previous_month() -> str:
+    return (date.today().replace(day=1) - timedelta(days=1)).strftime("%Y-%m")
+
+
+def statement_file_name(acc_no: int, month: str) -> str:
+    return f"statement_{acc_no}_{month}.pdf"
+
+
+def read_manifest(manifest_path: str, month: str) -> set:
+    """Accounts whose statement of the month is listed in the manifest and still on disk"""
+    if not os.path.exists(manifest_path):
+        return set()
+
+    out_dir = os.path.dirname(manifest_path)
+    done = set()
+    with open(manifest_path, newline="") as file:
+        for record in csv.DictReader(file):
+            # A line cut short by an interruption has no created_at
+            if record["month"] != month or not record["created_at"]:
+                continue
+            if os.path.exists(os.path.join(out_dir, record["file_name"])):
+                done.add(int(record["acc_no"]))
+    return done
+
+
+def open_manifest(manifest_path: str):
+    """Open the manifest for appending, writing the header of a new one"""
+    new_manifest = not os.path.exists(manifest_path)
+    if not new_manifest:
+        # Close a line cut short by an interruption so the next record starts on its own line
+        with open(manifest_path, "rb+") as file:
+            size = file.seek(0, os.SEEK_END)
+            if size:
+                file.seek(size - 1)
+                if file.read(1) != b"\n":
+                    file.write(b"\r\n")
+
+    file = open(manifest_path, "a", newline="")
+    if new_manifest:
+        csv.DictWriter(file, MANIFEST_FIELDS).writeheader()
+    return file
+
+
+def customer_accounts(db: ConnectionManager) -> list:
+    with db.reader() as conn:
+        return [row[0] for row in conn.execute(queries.CUSTOMER_ACCOUNTS)]
+
+
+############################   Worker processes   #############################
+def _init_worker(db_path: str, logo_path: str):
+    global _bank, _logo_path
+    # Every account is read once, caching the rows would only churn
+    _bank = BankService(
+        ConnectionManager(db_path, read_pool_size=1, read_only=True), cache_size=0
+    )
+    _logo_path = logo_path
+
+
+def write_statement(
+    bank: BankService,
+    acc_no: int,
+    month: str,
+    out_dir: str,
+    logo_path: str = None,
+) -> dict:
+    """
+    Write the statement of an account for a month
+
+    Returns
+    -------
+    dict
+        The manifest record of the statement.
+
+    """
+    from_date, to_date = month_range(month)
+    user_data = bank.get_account(acc_no)
+    if user_data is None:
+        raise ValueError(f"Account {acc_no} not found")
+    cursor = bank.statement_cursor(acc_no, from_date, to_date)
+
+    def rows():
+        while not cursor.exhausted:
+            yield from cursor.fetchmany(STATEMENT_FETCH_SIZE)
+
+    file_name = statement_file_name(acc_no, month)
+    path = os.path.join(out_dir, file_name)
+    with open(path + ".part", "wb") as file:
+        stats = write_report(
+            file,
+            user_data,
+            rows(),
+            str(from_date),
+            str(to_date),
+            logo_path=logo_path,
+            balances=bank.statement_balances(acc_no, from_date, to_date),
+        )
+    os.replace(path + ".part", path)
+
+    return {
+        "month": month,
+        "acc_no": acc_no,
+        "file_name": file_name,
+        "transactions": stats.transactions,
+        "pages": stats.pages,
+        "credits": stats.cr_val,
+        "debits": stats.db_val,
+        "created_at": str(datetime.now()),
+    }
+
+
+def _write_chunk(args: tuple) -> tuple:
+    acc_nos, month, out_dir = args
+    written = []
+    failures = []
+    for acc_no in acc_nos:
+        try:
+            written.append(write_statement(_bank, acc_no, month, out_dir, _logo_path))
+        except Exception as err:
+            # Bad data in one account is reported with the other failures instead of stopping the run
+            failures.append((acc_no, f"{type(err).__name__}: {err}"))
+    return written, failures
+
+
+###########################   Month-end statements   ##########################
+def run_statements(
+    db_path: str,
+    month: str,
+    out_dir: str,
+    workers: int = None,
+    chunk_size: int = STATEMENT_CHUNK_SIZE,
+    logo_path: str = DEFAULT_LOGO_PATH,
+    progress=print,
+) -> dict:
+    """
+    Write the statement of a month for every customer account not yet in the manifest of out_dir
+
+    Parameters
+    ----------
+    db_path : str
+        Path of an initialised database.
+    month : str
+        Statement month as YYYY-MM.
+    out_dir : str
+        Directory of the PDFs and manifest.csv, created if needed.
+    workers : int, optional
+        Number of worker processes. The default is the number of CPUs.
+    chunk_size : int, optional
+        Accounts handed to a worker at a time. The default is STATEMENT_CHUNK_SIZE.
+    logo_path : str, optional
+        Image drawn in the page headers, None for no logo. The default is the Mo Bank logo.
+    progress : callable, optional
+        Called with a status message after every finished chunk.
+
+    Returns
+    -------
+    dict
+        accounts, written, skipped (already in the manifest), failures as a list of (acc_no, reason) and seconds
+        taken.
+
+    """
+    started = time.perf_counter()
+    month_range(month)  # reject a malformed month before starting the pool
+    os.makedirs(out_dir, exist_ok=True)
+    manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+
+    db = ConnectionManager(db_path, read_only=True)
+    try:
+        accounts = customer_accounts(db)
+    finally:
+        db.close()
+
+    done = read_manifest(manifest_path, month)
+    pending = [acc_no for acc_no in accounts if acc_no not in done]
+    if done and progress:
+        progress(f"Resuming, {len(done)} statements of {month} already written")
+
+    jobs = [
+        (pending[i : i + chunk_size], month, out_dir)
+        for i in range(0, len(pending), chunk_size)
+    ]
+    written = 0
+    failures = []
+    if jobs:
+        with open_manifest(manifest_path) as file, Pool(
+            workers or os.cpu_count(),
+            initializer=_init_worker,
+            initargs=(db_path, logo_path),
+        ) as pool:
+            manifest = csv.DictWriter(file, MANIFEST_FIELDS)
+
+            for chunk_written, chunk_failures in pool.imap_unordered(
+                _write_chunk, jobs
+            ):
+                manifest.writerows(chunk_written)
+                file.flush()
+                written += len(chunk_written)
+                failures += chunk_failures
+                if progress:
+                    progress(
+                        f"{len(done) + written}/{len(accounts)} statements written"
+                    )
+
+    return {
+        "accounts": len(accounts),
+        "written": written,
+        "skipped": len(done),
+        "failures": sorted(failures),
+        "seconds": time.perf_counter() - started,
+    }
+
+
+###############################   Main Program   ##############################
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Write the month-end PDF statements of every Mo Bank customer"
+    )
+    parser.add_argument("--db", required=True, help="Mo Bank database")
+    parser.add_argument(
+        "--month",
+        default=previous_month(),
+        help="Statement month as YYYY-MM (default the previous month)",
+    )
+    parser.add_argument("--out", required=True, help="Output directory")
+    parser.add_argument("--workers", type=int, help="Defaults to the number of CPUs")
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=STATEMENT_CHUNK_SIZE,
+        help="Accounts handed to a worker at a time",
+    )
+    parser.add_argument("--no-logo", action="store_true", help="Leave out the logo")
+    args = parser.parse_args(argv)
+
+    try:
+        month_range(args.month)
+    except ValueError:
+        parser.error("--month should be given as YYYY-MM")
+    if args.chunk_size < 1:
+        parser.error("--chunk-size should be at least 1")
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    result = run_statements(
+        args.db,
+        args.month,
+        args.out,
+        args.workers,
+        args.chunk_size,
+        logo_path=None if args.no_logo else DEFAULT_LOGO_PATH,
+    )
+    print(
+        f"{result['written']} statements written, {result['skipped']} already done, "
+        f"{len(result['failures'])} failed in {result['seconds']:.1f}s"
+    )
+    for acc_no, reason in result["failures"]:
+        print(f"    Account {acc_no}: {reason}")
+    sys.exit(1 if result["failures"] else 0)
@@ -0,0 +1,33 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import ConnectionManager, create_schema  # noqa: E402
+from money import Money  # noqa: E402
+
+ADMIN = 100001  # created with every new database
+
+
+@pytest.fixture
+def db(tmp_path):
+    manager = ConnectionManager(str(tmp_path / "mo_bank.db"))
+    create_schema(manager)
+    yield manager
+    manager.close()
+
+
+def open_customer(bank, balance: Money = Money(100000), number: int = 1) -> int:
+    return bank.open_account(
+        "Mr. Test Customer",
+        f"customer{number}@mobank.xy",
+        f"{9000000000 + number}",
+        "M",
+        "1990-01-01",
+        "S",
+        balance,
+        "Test@1234",
+        ADMIN,
+    )
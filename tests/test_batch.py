@@ -0,0 +1,59 @@
+from conftest import ADMIN, open_customer
+import batch
+from database import MAX_INTEGER
+from money import Money
+from service import BankService
+
+
+def post_rows(db, tmp_path, lines: list) -> dict:
+    csv_path = tmp_path / "batch.csv"
+    csv_path.write_text(
+        "operation,acc_no,amount,to_acc_no,details\n" + "\n".join(lines) + "\n"
+    )
+    return batch.post_batch(db, str(csv_path), ADMIN)
+
+
+def test_oversized_account_number_is_a_row_failure(db, tmp_path):
+    acc_no = open_customer(BankService(db))
+    result = post_rows(
+        db,
+        tmp_path,
+        [
+            "deposit,99999999999999999999,10,,",
+            f"transfer,{acc_no},10,99999999999999999999,",
+            f"deposit,{acc_no},10,,",
+        ],
+    )
+
+    assert result["posted"] == 1
+    assert result["failures"] == [
+        (2, "Invalid account number"),
+        (3, "Invalid receiver account number"),
+    ]
+
+
+def test_oversized_amount_and_balance_are_row_failures(db, tmp_path):
+    bank = BankService(db)
+    acc_no = open_customer(bank)
+    near_max = (
+        MAX_INTEGER - 100000 - 50
+    )  # leaves the balance 50 paise short of the largest INTEGER
+    result = post_rows(
+        db,
+        tmp_path,
+        [
+            f"deposit,{acc_no},1e30,,",
+            f"deposit,{acc_no},{Money(near_max)},,",
+            f"deposit,{acc_no},1.00,,",
+            f"transfer,{ADMIN},1.00,{acc_no},",
+            f"deposit,{acc_no},0.50,,",
+        ],
+    )
+
+    assert result["posted"] == 2
+    assert result["failures"] == [
+        (2, "Invalid amount"),
+        (4, "Balance out of range"),
+        (5, "Balance out of range"),
+    ]
+    assert bank.get_account(acc_no)[9] == MAX_INTEGER
@@ -0,0 +1,43 @@
+import sqlite3 as sql
+
+import pytest
+
+from database import ConnectionManager
+import datagen
+from service import BankService
+
+FIRST_ACC_NO = 100002  # after the Admin of a new database
+
+
+def test_failed_generation_leaves_the_loaded_accounts_usable(tmp_path, monkeypatch):
+    def progress(message: str):
+        if message.endswith("loaded"):
+            raise RuntimeError("disk full")  # after the first shard committed
+
+    monkeypatch.setattr(datagen, "SHARD_ACCOUNTS", 25)
+    db_path = str(tmp_path / "mo_bank.db")
+    with pytest.raises(RuntimeError):
+        datagen.generate(db_path, 50, 500, workers=1, progress=progress)
+
+    conn = sql.connect(db_path)
+    try:
+        names = {row[0] for row in conn.execute("SELECT name FROM sqlite_master;")}
+        loaded = conn.execute("SELECT count(*) FROM AccountDetails;").fetchone()[0]
+        snapshots = conn.execute(
+            "SELECT count(*) FROM DailyBalances WHERE acc_no = ?;", (FIRST_ACC_NO,)
+        ).fetchone()[0]
+    finally:
+        conn.close()
+    assert set(datagen.LEDGER_INDEXES) <= names
+    assert {"trg_daily_balances", "trg_operator_totals"} <= names
+    assert loaded == 1 + 25
+    assert snapshots > 0
+
+    db = ConnectionManager(db_path)
+    try:
+        session = BankService(db).login(
+            datagen.mobile_of(FIRST_ACC_NO), datagen.DEFAULT_PASSWORD
+        )
+    finally:
+        db.close()
+    assert session["acc_no"] == FIRST_ACC_NO
@@ -0,0 +1,69 @@
+import threading
+import time
+
+import pytest
+
+from conftest import ADMIN, open_customer
+import ledger
+from money import Money
+import queries
+from service import BankService
+
+
+@pytest.fixture
+def postings(db):
+    queue = ledger.PostingQueue(db, max_batch=8, linger_ms=0)
+    yield queue
+    queue.close()
+
+
+def test_cache_miss_during_queued_deposit_keeps_committed_balance(db, postings):
+    bank = BankService(db, postings=postings)
+    acc_no = open_customer(bank)
+    bank.get_account(acc_no)  # opens the reader connection outside the batch
+
+    def lookup(db):
+        # Runs after the deposit in the same batch, before the commit: a cache miss reads the old balance
+        bank.accounts.clear()
+        reader = threading.Thread(target=bank.get_account, args=(acc_no,))
+        reader.start()
+        reader.join()
+
+    # Hold the writer thread so the deposit and the lookup are committed in one batch
+    gate = threading.Event()
+    held = postings.submit(lambda db: gate.wait())
+    while not held.running():
+        time.sleep(0.001)
+    depositor = threading.Thread(
+        target=bank.deposit, args=(acc_no, Money(10000), ADMIN)
+    )
+    depositor.start()
+    while postings._queue.qsize() == 0:
+        time.sleep(0.001)
+    looked_up = postings.submit(lookup)
+    gate.set()
+    held.result()
+    looked_up.result()
+    depositor.join()
+
+    with db.reader() as conn:
+        params = (acc_no,)
+        committed = conn.execute(queries.ACCOUNT_BALANCE, params).fetchone()[0]
+    assert committed == 110000
+    assert bank.get_account(acc_no)[9] == committed
+
+
+def test_refused_posting_is_rolled_back_alone(db, postings):
+    bank = BankService(db, postings=postings)
+    acc_no = open_customer(bank)
+
+    admin_bal = bank.get_account(ADMIN)[9]
+
+    # The admin account is credited first (lower account number) before the debit of acc_no is refused
+    with pytest.raises(ledger.InsufficientBalance):
+        bank.transfer(acc_no, ADMIN, Money(10**9), operator=ADMIN)
+    bank.deposit(acc_no, Money(500), operator=ADMIN)
+
+    assert bank.get_account(acc_no)[9] == 100500
+    bank.accounts.clear()
+    assert bank.get_account(ADMIN)[9] == admin_bal
@@ -0,0 +1,93 @@
+from datetime import date
+import io
+import re
+import zlib
+
+from conftest import ADMIN, open_customer
+from money import Money
+from report import write_report
+from service import BankService
+
+USER_DATA = (
+    100002,
+    "S",
+    "Mr. Test Customer",
+    "customer1@mobank.xy",
+    "9000000001",
+    "M",
+    None,
+    "",
+    "C",
+    150000,
+)
+ROWS = [
+    (
+        1,
+        100002,
+        "2024-03-01 10:00:00.000000",
+        "Cr",
+        100000,
+        50000,
+        150000,
+        "Deposit at Bank",
+        100001,
+    ),
+    (2, 100002, "2024-03-02 10:00:00.000000", "Cr", 150000, 0, 150000, None, 100001),
+]
+
+
+def test_null_details_and_dob_are_written_as_empty_cells():
+    file = io.BytesIO()
+    stats = write_report(file, USER_DATA, iter(ROWS), "2024-03-01", "2024-03-31")
+
+    assert stats.transactions == 2
+    assert file.getvalue().startswith(b"%PDF")
+    assert b"None" not in file.getvalue()
+
+
+def page_text(pdf: bytes) -> bytes:
+    """Content of the page streams, the only streams written with just a /Filter entry"""
+    streams = re.findall(
+        rb"<< /Filter /FlateDecode /Length \d+ >>\nstream\n(.*?)\nendstream", pdf, re.S
+    )
+    return b"".join(zlib.decompress(stream) for stream in streams)
+
+
+def test_employee_report_prints_the_given_totals():
+    file = io.BytesIO()
+    write_report(
+        file,
+        USER_DATA,
+        iter(ROWS),
+        "2024-03-01",
+        "2024-03-31",
+        is_emp=True,
+        totals=(123456, 23456),
+    )
+
+    text = page_text(file.getvalue())
+    assert b"(1469.12)" in text
+    assert b"(1000.00)" in text
+
+
+def test_operator_totals_agree_with_the_listed_postings(db):
+    bank = BankService(db)
+    acc_no = open_customer(bank)
+    bank.deposit(acc_no, Money(25000), ADMIN)
+    bank.withdraw(acc_no, Money(5000), ADMIN)
+
+    today = date.today()
+    cursor = bank.operator_cursor(ADMIN, today, today)
+    rows = []
+    while not cursor.exhausted:
+        rows.extend(cursor.fetchmany(100))
+    stats = write_report(
+        io.BytesIO(),
+        bank.get_employee(ADMIN),
+        iter(rows),
+        str(today),
+        str(today),
+        is_emp=True,
+    )
+
+    assert bank.operator_totals(ADMIN, today, today) == (stats.cr_val, stats.db_val)
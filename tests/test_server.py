@@ -0,0 +1,43 @@
+import asyncio
+
+import pytest
+
+from conftest import open_customer
+from database import create_schema
+from server import LedgerServer
+
+
+@pytest.fixture
+def server(tmp_path):
+    server = LedgerServer(str(tmp_path / "mo_bank.db"))
+    create_schema(server.db)
+    yield server
+    server.close()
+
+
+def call(server: LedgerServer, op: str, token=None, **args) -> tuple:
+    return asyncio.run(server.call(op, token, args))
+
+
+@pytest.mark.parametrize("amount", [10.9, 0.5, True, "100", None])
+def test_postings_refuse_amounts_that_are_not_integer_paise(server, amount):
+    acc_no = open_customer(server.bank)
+    login, _ = call(server, "login", user_info="9999999999", password="Hello@123")
+
+    result, error = call(
+        server, "deposit", login["token"], acc_no=acc_no, amount=amount
+    )
+
+    assert result is None
+    assert error["type"] == "BadRequest"
+    assert server.bank.get_account(acc_no)[9] == 100000
+
+
+def test_postings_take_integer_paise(server):
+    acc_no = open_customer(server.bank)
+    login, _ = call(server, "login", user_info="9999999999", password="Hello@123")
+
+    result, error = call(server, "deposit", login["token"], acc_no=acc_no, amount=1050)
+
+    assert error is None
+    assert result == 101050
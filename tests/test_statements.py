@@ -0,0 +1,25 @@
+import os
+
+from conftest import open_customer
+import statements
+from service import BankService
+
+
+def test_bad_account_is_recorded_and_the_chunk_carries_on(db, tmp_path):
+    bank = BankService(db)
+    first = open_customer(bank, number=1)
+    second = open_customer(bank, number=2)
+    missing = second + 100  # deleted after the account list was read
+
+    month = statements.previous_month()
+    out_dir = str(tmp_path / "statements")
+    os.makedirs(out_dir)
+    statements._init_worker(db.db_path, None)
+    written, failures = statements._write_chunk(
+        ([first, missing, second], month, out_dir)
+    )
+
+    assert [record["acc_no"] for record in written] == [first, second]
+    assert [acc_no for acc_no, _ in failures] == [missing]
+    for record in written:
+        assert os.path.exists(os.path.join(out_dir, record["file_name"]))
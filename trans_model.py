@@ -0,0 +1,166 @@
+"""
+    Project Name:       Mo Bank (A dummy banking system)
+    Module:             trans_model
+    Purpose:            Table model behind the transaction views
+    Description:
+        TransactionTableModel feeds the QTableView of the customer statement, SWO transaction and Admin transaction
+        pages. Rows are pulled from a TransactionCursor one page at a time through canFetchMore/fetchMore, so the
+        view only asks for more rows as the user scrolls down and only the visible cells are ever formatted. Each
+        page is read by a task on the thread pool and appended when it arrives, so scrolling never waits on a query
+        (or on the ledger server) on the GUI thread.
+        Summary rows (the totals of the operator reports) are appended once the cursor is exhausted.
+"""
+
+################################   Libraries   ################################
+from functools import partial
+
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt
+
+from money import Money
+from service import TransactionCursor
+from workers import Task
+
+
+#############################   Global variables   ############################
+FETCH_SIZE = 200
+
+# Text of every column a transaction view can show, from a Transactions row
+COLUMN_TEXT = {
+    "Date": lambda row: row[2][:10],
+    "Details": lambda row: row[7],
+    "Amount": lambda row: str(Money(row[5])),
+    "Operation": lambda row: row[3],
+    "Balance": lambda row: str(Money(row[6])),
+}
+
+
+#############################   Transaction model   ###########################
+class TransactionTableModel(QAbstractTableModel):
+    """
+    Read only model of Transactions rows fetched lazily from a cursor
+
+    Parameters
+    ----------
+    columns : list
+        Names of the columns to show, keys of COLUMN_TEXT.
+    parent : QObject, optional
+        Owner of the model.
+
+    """
+
+    def __init__(self, columns: list, parent=None):
+        super().__init__(parent)
+        self.columns = list(columns)
+        self._cursor = None
+        self._rows = []
+        self._summary = []
+        self._hidden = set()
+        self._done = False  # summary rows are part of the model
+        self._fetching = None  # task reading the next page
+
+    def load(
+        self,
+        cursor: TransactionCursor = None,
+        summary: list = (),
+        hide: tuple = (),
+        first_page: list = None,
+    ):
+        """
+        Show the rows of a new cursor (or nothing) and fetch its first page
+
+        Parameters
+        ----------
+        cursor : TransactionCursor, optional
+            Rows to show. The default clears the view.
+        summary : list, optional
+            Rows shown after the last transaction, as dicts of column name to text.
+        hide : tuple, optional
+            Columns left blank for every transaction row.
+        first_page : list, optional
+            Rows already read from the cursor (by a background task), shown instead of fetching a first page.
+
+        """
+        self.beginResetModel()
+        self._cursor = cursor
+        self._rows = list(first_page or [])
+        self._summary = list(summary)
+        self._hidden = set(hide)
+        self._done = first_page is not None and cursor.exhausted
+        self._fetching = None  # a page still being read for the last cursor is dropped
+        self.endResetModel()
+
+        if first_page is None and self.canFetchMore(QModelIndex()):
+            self.fetchMore(QModelIndex())
+
+    def clear(self):
+        self.load(None)
+
+    def is_empty(self) -> bool:
+        """True if the cursor had no transactions at all"""
+        return not self._rows
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._rows) + (len(self._summary) if self._done else 0)
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.columns)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+
+        column = self.columns[index.column()]
+        if index.row() >= len(self._rows):
+            return self._summary[index.row() - len(self._rows)].get(column, "")
+        if column in self._hidden:
+            return ""
+        return COLUMN_TEXT[column](self._rows[index.row()])
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.columns[section]
+        return section + 1
+
+    def canFetchMore(self, parent):
+        if parent.isValid() or self._cursor is None:
+            return False
+        return not self._done and self._fetching is None
+
+    def fetchMore(self, parent):
+        if not self.canFetchMore(parent):
+            return
+
+        # Connected before the start, a fast fetch could otherwise report back to no one
+        cursor = self._cursor
+        self._fetching = Task(cursor.fetchmany, FETCH_SIZE)
+        self._fetching.succeeded.connect(partial(self._fetched, cursor))
+        self._fetching.failed.connect(partial(self._fetch_failed, cursor))
+        self._fetching.start()
+
+    def _fetched(self, cursor: TransactionCursor, rows: list):
+        if cursor is not self._cursor:
+            return
+        self._fetching = None
+
+        done = cursor.exhausted
+        new_rows = len(rows) + (len(self._summary) if done else 0)
+        if not new_rows:
+            self._done = done
+            return
+
+        start = self.rowCount()
+        self.beginInsertRows(QModelIndex(), start, start + new_rows - 1)
+        self._rows.extend(rows)
+        self._done = done
+        self.endInsertRows()
+
+    def _fetch_failed(self, cursor: TransactionCursor, err: Exception):
+        # The page is asked for again when the view next wants more rows
+        if cursor is self._cursor:
+            self._fetching = None
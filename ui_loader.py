@@ -0,0 +1,149 @@
+"""
+    Project Name:       Mo Bank (A dummy banking system)
+    Module:             ui_loader
+    Purpose:            Building the Qt Designer pages
+    Description:
+        uic.loadUi parses the .ui XML and builds every widget through introspection each time a page is created,
+        which is a large part of the startup time. The build step of this module compiles every .ui file of
+        assets/pages into a Python module next to it (intro.ui -> intro_ui.py), which builds the same widgets with
+        plain constructor calls:
+            python ui_loader.py
+
+        load_ui() builds a page from its compiled module and falls back to uic.loadUi when the module is missing or
+        stale, i.e. it was compiled from a different version of the .ui file (its source hash is recorded at build
+        time). A page edited in Designer therefore works at once and only needs a rebuild to be fast again.
+"""
+
+################################   Libraries   ################################
+import argparse
+import glob
+import hashlib
+import importlib.util
+import io
+import os
+import re
+
+
+#############################   Global variables   ############################
+PAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "pages")
+
+# Lines added to a compiled module: its source hash and a helper resolving the image paths of the .ui file, which
+# are relative to the .ui file and not to the working directory
+COMPILED_HEADER = """
+import os
+
+UI_SOURCE_HASH = "{source_hash}"
+UI_CLASS = "{ui_class}"
+_UI_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _path(relative_path):
+    return os.path.join(_UI_DIR, relative_path)
+"""
+
+# Compiled modules already imported, by .ui path
+_modules = {}
+
+
+#############################   Helper functions   ############################
+def compiled_path(ui_path: str) -> str:
+    return os.path.splitext(ui_path)[0] + "_ui.py"
+
+
+def source_hash(ui_path: str) -> str:
+    with open(ui_path, "rb") as file:
+        return hashlib.sha1(file.read()).hexdigest()
+
+
+def _compiled_module(ui_path: str):
+    """Compiled module of a .ui file, None if it is missing or stale"""
+    if ui_path in _modules:
+        return _modules[ui_path]
+
+    module = None
+    path = compiled_path(ui_path)
+    if os.path.exists(path):
+        try:
+            spec = importlib.util.spec_from_file_location(
+                os.path.basename(path)[:-3], path
+            )
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            if module.UI_SOURCE_HASH != source_hash(ui_path):
+                module = None
+        except (ImportError, SyntaxError, AttributeError, OSError):
+            module = None
+
+    _modules[ui_path] = module
+    return module
+
+
+################################   Pages   ####################################
+def load_ui(ui_path: str, widget):
+    """
+    Build the widgets of a .ui file into widget, like uic.loadUi(ui_path, widget)
+
+    Every named widget of the file becomes an attribute of widget.
+    """
+    module = _compiled_module(ui_path)
+    if module is None:
+        from PyQt5 import uic
+
+        uic.loadUi(ui_path, widget)
+        return
+
+    ui = getattr(module, module.UI_CLASS)()
+    ui.setupUi(widget)
+    for name, value in vars(ui).items():
+        setattr(widget, name, value)
+
+
+def compile_ui(ui_path: str) -> str:
+    """
+    Compile a .ui file into a Python module next to it
+
+    Returns
+    -------
+    str
+        Path of the compiled module.
+
+    """
+    from PyQt5 import uic
+
+    code = io.StringIO()
+    # Compiled from a file object, the image paths are kept relative to the .ui file
+    with open(ui_path, encoding="utf-8") as file:
+        uic.compileUi(file, code)
+    code = code.getvalue()
+
+    ui_class = re.search(r"^class (Ui_\w+)\(object\):", code, re.MULTILINE).group(1)
+    code = re.sub(r'QtGui\.QPixmap\("([^"]+)"\)', r'QtGui.QPixmap(_path("\1"))', code)
+    code = re.sub(r'QtGui\.QIcon\("([^"]+)"\)', r'QtGui.QIcon(_path("\1"))', code)
+    header = COMPILED_HEADER.format(source_hash=source_hash(ui_path), ui_class=ui_class)
+    code = code.replace(
+        "from PyQt5 import QtCore, QtGui, QtWidgets\n",
+        "from PyQt5 import QtCore, QtGui, QtWidgets\n" + header,
+        1,
+    )
+
+    path = compiled_path(ui_path)
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(code)
+    _modules.pop(ui_path, None)
+    return path
+
+
+###############################   Main Program   ##############################
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compile the Mo Bank .ui pages into Python modules"
+    )
+    parser.add_argument(
+        "ui_files",
+        nargs="*",
+        help="pages to compile (default every .ui file in assets/pages)",
+    )
+    args = parser.parse_args()
+
+    for ui_path in args.ui_files or sorted(glob.glob(os.path.join(PAGES_DIR, "*.ui"))):
+        print(f"{ui_path} -> {compile_ui(ui_path)}")
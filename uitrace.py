@@ -0,0 +1,336 @@
+"""
+    Project Name:       Mo Bank (A dummy banking system)
+    Module:             uitrace
+    Purpose:            Latency tracing of the GUI thread
+    Description:
+        Every click runs its handler on the GUI thread, and while it runs the window neither repaints nor takes input.
+        A UITracer records how long each handler took (functions decorated with UITracer.handler), how long each page
+        took from being switched to until it was drawn, and every event-loop stall over a threshold, whatever caused
+        it. Time the GUI thread spent waiting in a message box is recorded separately and not counted as blocked.
+
+        Stalls are found with a heartbeat timer on the GUI thread: a beat arriving late means the event loop was busy
+        for that long. A watchdog thread samples the Python stack of the GUI thread while a beat is overdue, so a
+        stall outside any traced handler still shows where it was.
+
+        The events are exported in the Chrome trace format (chrome://tracing, https://ui.perfetto.dev) and summed up
+        per handler by summary(). Nothing is recorded until start() is called.
+"""
+
+################################   Libraries   ################################
+from collections import deque
+from contextlib import contextmanager
+import functools
+import inspect
+import json
+import os
+import sys
+import threading
+import time
+
+from PyQt5.QtCore import Qt, QTimer
+
+
+#############################   Global variables   ############################
+STALL_MS = 100  # event-loop stalls longer than this are recorded
+HEARTBEAT_MS = 20  # interval of the heartbeat timer on the GUI thread
+WATCHDOG_INTERVAL = 0.01  # seconds between the watchdog checks
+TRACE_MAX_EVENTS = 200_000  # older events are dropped beyond this
+STACK_DEPTH = 12  # frames kept of a stall's stack sample
+
+# Rows of the timeline, as thread ids of the trace
+HANDLERS_TID = 1
+PAGES_TID = 2
+STALLS_TID = 3
+TRACE_THREADS = {
+    HANDLERS_TID: "GUI handlers",
+    PAGES_TID: "Page switches",
+    STALLS_TID: "Event loop stalls",
+}
+
+
+#############################   Helper functions   ############################
+def positional_count(fn):
+    """Number of positional arguments fn takes, None if it takes any number"""
+    try:
+        parameters = inspect.signature(fn).parameters.values()
+    except (TypeError, ValueError):
+        return None
+
+    count = 0
+    for parameter in parameters:
+        if parameter.kind == parameter.VAR_POSITIONAL:
+            return None
+        if parameter.kind in (
+            parameter.POSITIONAL_ONLY,
+            parameter.POSITIONAL_OR_KEYWORD,
+        ):
+            count += 1
+    return count
+
+
+def format_stack(frame) -> list:
+    """Innermost frames of a stack as 'function (file:line)'"""
+    stack = []
+    while frame is not None and len(stack) < STACK_DEPTH:
+        code = frame.f_code
+        stack.append(
+            f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+        )
+        frame = frame.f_back
+    return stack
+
+
+################################   Tracing   ##################################
+class UITracer:
+    """
+    Handler, page switch and event-loop stall timeline of the GUI thread
+
+    Parameters
+    ----------
+    stall_ms : float, optional
+        Event-loop stalls longer than this are recorded. The default is STALL_MS.
+    max_events : int, optional
+        Events kept, the oldest are dropped first. The default is TRACE_MAX_EVENTS.
+
+    """
+
+    def __init__(self, stall_ms: float = STALL_MS, max_events: int = TRACE_MAX_EVENTS):
+        self.stall_ms = stall_ms
+        self.enabled = False
+        self.events = deque(maxlen=max_events)
+        self.started = time.perf_counter()
+
+        # Handlers running on the GUI thread, innermost last, as [name, seconds spent in message boxes]
+        self._active = []
+        self._gui_thread = None
+        self._heartbeat = None
+        self._last_beat = None
+        # Stack of the GUI thread taken by the watchdog during a stall
+        self._sample = None
+        self._watchdog = None
+        self._stop = threading.Event()
+
+    def start(self):
+        """Start recording, to be called on the GUI thread once the QApplication exists"""
+        if self.enabled:
+            return
+        self.enabled = True
+        self.started = time.perf_counter()
+        self._gui_thread = threading.get_ident()
+        self._last_beat = self.started
+
+        self._heartbeat = QTimer()
+        self._heartbeat.setTimerType(Qt.PreciseTimer)
+        self._heartbeat.timeout.connect(self._beat)
+        self._heartbeat.start(HEARTBEAT_MS)
+
+        self._stop.clear()
+        self._watchdog = threading.Thread(
+            target=self._watch, name="uitrace-watchdog", daemon=True
+        )
+        self._watchdog.start()
+
+    def stop(self):
+        if not self.enabled:
+            return
+        self.enabled = False
+        self._heartbeat.stop()
+        self._heartbeat = None
+        self._stop.set()
+        self._watchdog.join()
+        self._watchdog = None
+
+    ##########################   Recording   ##########################
+    def _us(self, moment: float) -> float:
+        return (moment - self.started) * 1_000_000
+
+    def complete(
+        self,
+        name: str,
+        cat: str,
+        began: float,
+        ended: float = None,
+        tid: int = HANDLERS_TID,
+        **args,
+    ):
+        """Record a span between two time.perf_counter() readings"""
+        if ended is None:
+            ended = time.perf_counter()
+        self.events.append(
+            {
+                "name": name,
+                "cat": cat,
+                "ph": "X",
+                "ts": self._us(began),
+                "dur": (ended - began) * 1_000_000,
+                "pid": 1,
+                "tid": tid,
+                "args": args,
+            }
+        )
+
+    @contextmanager
+    def span(self, name: str, cat: str, tid: int = HANDLERS_TID):
+        """Record the time spent in the with block"""
+        if not self.enabled:
+            yield
+            return
+        began = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.complete(name, cat, began, tid=tid)
+
+    @contextmanager
+    def modal(self, name: str):
+        """Record a wait for the user, e.g. an open message box, without counting it against the running handlers"""
+        if not self.enabled:
+            yield
+            return
+        began = time.perf_counter()
+        try:
+            yield
+        finally:
+            ended = time.perf_counter()
+            for handler in self._active:
+                handler[1] += ended - began
+            self.complete(name, "modal", began, ended)
+
+    def handler(self, fn):
+        """
+        Decorator recording every call of a slot or callback run on the GUI thread
+
+        The decorated function takes any number of positional arguments and passes on as many as fn accepts, like
+        PyQt does for a signal with more arguments than the slot.
+        """
+        accepted = positional_count(fn)
+
+        @functools.wraps(fn)
+        def traced(*args, **kwargs):
+            if accepted is not None:
+                args = args[:accepted]
+            if not self.enabled:
+                return fn(*args, **kwargs)
+
+            handler = [fn.__name__, 0.0]
+            self._active.append(handler)
+            began = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                ended = time.perf_counter()
+                self._active.pop()
+                blocked = ended - began - handler[1]
+                self.complete(
+                    fn.__name__,
+                    "handler",
+                    began,
+                    ended,
+                    blocked_ms=round(blocked * 1000, 3),
+                )
+
+        return traced
+
+    ##########################   Stalls   ##########################
+    def _beat(self):
+        now = time.perf_counter()
+        late_ms = (now - self._last_beat) * 1000 - HEARTBEAT_MS
+        sample, self._sample = self._sample, None
+        if late_ms >= self.stall_ms:
+            began = now - late_ms / 1000
+            self.complete(
+                "stall",
+                "stall",
+                began,
+                now,
+                tid=STALLS_TID,
+                stall_ms=round(late_ms, 1),
+                **(sample or {}),
+            )
+        self._last_beat = now
+
+    def _watch(self):
+        # Runs on the watchdog thread, samples the GUI thread once per overdue beat
+        while not self._stop.wait(WATCHDOG_INTERVAL):
+            overdue_ms = (time.perf_counter() - self._last_beat) * 1000 - HEARTBEAT_MS
+            if self._sample is None and overdue_ms >= self.stall_ms:
+                frame = sys._current_frames().get(self._gui_thread)
+                self._sample = {
+                    "handlers": [name for name, _ in self._active],
+                    "stack": format_stack(frame),
+                }
+
+    ##########################   Export   ##########################
+    def summary(self) -> list:
+        """
+        Calls, blocked time and slowest call per handler, the most blocked time first
+
+        Returns
+        -------
+        list
+            dicts of name, calls, blocked_ms, max_ms and stalls (how many recorded stalls it was running in).
+
+        """
+        handlers = {}
+        for event in list(self.events):
+            if event["cat"] == "handler":
+                stats = handlers.setdefault(
+                    event["name"],
+                    {
+                        "name": event["name"],
+                        "calls": 0,
+                        "blocked_ms": 0.0,
+                        "max_ms": 0.0,
+                        "stalls": 0,
+                    },
+                )
+                stats["calls"] += 1
+                stats["blocked_ms"] += event["args"]["blocked_ms"]
+                stats["max_ms"] = max(stats["max_ms"], event["args"]["blocked_ms"])
+            elif event["cat"] == "stall":
+                for name in set(event["args"].get("handlers", ())):
+                    if name in handlers:
+                        handlers[name]["stalls"] += 1
+        return sorted(
+            handlers.values(), key=lambda item: item["blocked_ms"], reverse=True
+        )
+
+    def print_summary(self, file=None, limit: int = 20):
+        file = file or sys.stdout
+        stalls = [event for event in list(self.events) if event["cat"] == "stall"]
+        print(
+            f"{len(stalls)} event loop stalls over {self.stall_ms} ms, "
+            f"{sum(event['args']['stall_ms'] for event in stalls):.0f} ms in total",
+            file=file,
+        )
+        print(
+            f"{'Handler':<32}{'calls':>8}{'blocked ms':>12}{'max ms':>10}{'stalls':>8}",
+            file=file,
+        )
+        for stats in self.summary()[:limit]:
+            print(
+                f"{stats['name']:<32}{stats['calls']:>8}{stats['blocked_ms']:>12.1f}"
+                f"{stats['max_ms']:>10.1f}{stats['stalls']:>8}",
+                file=file,
+            )
+
+    def dump(self, file):
+        """Write the events as a Chrome trace JSON to an open text file"""
+        threads = [
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": 1,
+                "tid": tid,
+                "args": {"name": name},
+            }
+            for tid, name in TRACE_THREADS.items()
+        ]
+        json.dump(
+            {
+                "traceEvents": threads + list(self.events),
+                "displayTimeUnit": "ms",
+                "otherData": {"stall_ms": self.stall_ms, "heartbeat_ms": HEARTBEAT_MS},
+            },
+            file,
+        )
@@ -0,0 +1,315 @@
+"""
+    Project Name:       Mo Bank (A dummy banking system)
+    Module:             workers
+    Purpose:            Background execution of database and report work
+    Description:
+        Queries, postings and PDF generation run on the Qt global thread pool instead of the GUI thread, so a long
+        statement or a locked database never freezes the window. A Task reports back through Qt signals, which are
+        delivered on the GUI thread, so result and error handlers can update widgets directly.
+
+        Every page that starts background work owns a PageWorker. It runs one task at a time, disables the page's
+        action buttons and shows a BusyIndicator (with a Cancel button for cancellable work) until the task ends.
+        Cancelling drops the result; work that checks its `cancelled` callback also stops early by raising
+        Cancelled.
+
+        Lookups driven by typing go through a DebouncedLookup, which waits for the input to settle before querying
+        and only hands back the result of the latest request.
+"""
+
+################################   Libraries   ################################
+from collections import OrderedDict
+import threading
+import time
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
+from PyQt5.QtWidgets import QHBoxLayout, QProgressBar, QPushButton, QWidget
+
+
+#############################   Global variables   ############################
+# Tasks are kept referenced until they finish, the pool only holds the runnable
+_running_tasks = set()
+
+LOOKUP_DELAY = 300  # ms the input has to stay unchanged before a lookup runs
+LOOKUP_CACHE_SIZE = 32  # recent lookup results kept for reuse
+LOOKUP_MAX_AGE = 30  # seconds a lookup result is reused for
+
+
+###############################   Exceptions   ################################
+class Cancelled(Exception):
+    """Raised by background work that noticed its task was cancelled"""
+
+
+################################   Tasks   ####################################
+class Task(QObject):
+    """
+    A function call run on the global thread pool
+
+    With cancellable=True the function also receives a `cancelled` keyword argument, a callable that tells if the task
+    was cancelled meanwhile. Connect the signals before start(), a quick function can finish first.
+
+    Signals
+    -------
+    succeeded(object)
+        Return value of the function, not emitted once cancelled.
+    failed(object)
+        Exception raised by the function, not emitted once cancelled.
+    finished()
+        Emitted last in every case.
+
+    """
+
+    succeeded = pyqtSignal(object)
+    failed = pyqtSignal(object)
+    finished = pyqtSignal()
+
+    def __init__(self, fn, *args, cancellable: bool = False, **kwargs):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.cancellable = cancellable
+        self._cancelled = threading.Event()
+        if cancellable:
+            self.kwargs["cancelled"] = self._cancelled.is_set
+
+    @property
+    def is_cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def start(self):
+        _running_tasks.add(self)
+        self.finished.connect(lambda: _running_tasks.discard(self))
+        QThreadPool.globalInstance().start(_TaskRunnable(self))
+
+    def _run(self):
+        # Runs on a pool thread, the signals are queued to the GUI thread
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except Cancelled:
+            pass
+        except Exception as err:
+            if not self.is_cancelled:
+                self.failed.emit(err)
+        else:
+            if not self.is_cancelled:
+                self.succeeded.emit(result)
+        self.finished.emit()
+
+
+class _TaskRunnable(QRunnable):
+    def __init__(self, task: Task):
+        super().__init__()
+        self.task = task
+
+    def run(self):
+        self.task._run()
+
+
+def pending_tasks() -> int:
+    """Number of tasks that have not finished yet"""
+    return len(_running_tasks)
+
+
+############################   Page busy handling   ###########################
+class BusyIndicator(QWidget):
+    """Indeterminate progress bar with an optional Cancel button, laid over a widget of the page"""
+
+    def __init__(self, anchor: QWidget, strip_height: int = None):
+        super().__init__(anchor.parentWidget())
+        self.anchor = anchor
+        self.strip_height = strip_height
+
+        self.progress = QProgressBar(self)
+        self.progress.setRange(0, 0)
+        self.progress.setTextVisible(False)
+        self.cancel_button = QPushButton("Cancel", self)
+
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(4, 2, 4, 2)
+        layout.addWidget(self.progress, stretch=1)
+        layout.addWidget(self.cancel_button)
+        self.hide()
+
+    def start(self, cancellable: bool):
+        rect = self.anchor.geometry()
+        if self.strip_height:
+            rect.setTop(rect.bottom() - self.strip_height)
+        self.setGeometry(rect)
+        self.cancel_button.setVisible(cancellable)
+        self.show()
+        self.raise_()
+
+    def stop(self):
+        self.hide()
+
+
+class PageWorker:
+    """
+    Runs the background tasks of a page one at a time
+
+    Parameters
+    ----------
+    buttons : list
+        Widgets disabled while a task runs.
+    anchor : QWidget
+        Widget the busy indicator is laid over.
+    strip_height : int, optional
+        Only cover this many pixels at the bottom of the anchor. The default covers all of it.
+
+    """
+
+    def __init__(self, buttons: list, anchor: QWidget, strip_height: int = None):
+        self.buttons = buttons
+        self.indicator = BusyIndicator(anchor, strip_height)
+        self.indicator.cancel_button.clicked.connect(self.cancel)
+        self.task = None
+
+    @property
+    def busy(self) -> bool:
+        return self.task is not None
+
+    def run(self, fn, *args, on_result, on_error, cancellable: bool = False, **kwargs):
+        """
+        Run fn in the background unless the page is already busy
+
+        on_result receives the return value and on_error the exception, both on the GUI thread.
+
+        Returns
+        -------
+        Task or None
+            The started task, None if another task of the page is still running.
+
+        """
+        if self.busy:
+            return None
+
+        task = Task(fn, *args, cancellable=cancellable, **kwargs)
+        task.succeeded.connect(on_result)
+        task.failed.connect(on_error)
+        task.finished.connect(lambda: self._done(task))
+        self.task = task
+
+        for button in self.buttons:
+            button.setEnabled(False)
+        self.indicator.start(cancellable)
+        task.start()
+        return task
+
+    def cancel(self):
+        """Cancel the running task if it allows it and release the page at once"""
+        if self.task is not None and self.task.cancellable:
+            self.task.cancel()
+            self._done(self.task)
+
+    def _done(self, task: Task):
+        if task is not self.task:
+            return
+        self.task = None
+        self.indicator.stop()
+        for button in self.buttons:
+            button.setEnabled(True)
+
+
+###########################   Debounced lookups   ############################
+class DebouncedLookup:
+    """
+    Runs fn(key) in the background once the key stops changing
+
+    Every request replaces the previous one: its timer is restarted and the result of a lookup that is still
+    running for an older request is dropped. Results are kept for a while, so asking for a recent key again (typing
+    and then backspacing) is answered at once without a query.
+
+    Parameters
+    ----------
+    fn : callable
+        Lookup run on the global thread pool with the key.
+    delay : int, optional
+        Milliseconds the key has to stay unchanged. The default is LOOKUP_DELAY.
+    cache_size : int, optional
+        Recent results kept. The default is LOOKUP_CACHE_SIZE.
+    max_age : float, optional
+        Seconds a result is reused for. The default is LOOKUP_MAX_AGE.
+
+    """
+
+    def __init__(
+        self,
+        fn,
+        delay: int = LOOKUP_DELAY,
+        cache_size: int = LOOKUP_CACHE_SIZE,
+        max_age: float = LOOKUP_MAX_AGE,
+    ):
+        self.fn = fn
+        self.delay = delay
+        self.cache_size = cache_size
+        self.max_age = max_age
+        self.timer = QTimer()
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self._start)
+        # (request id, key, on_result, on_error) of the latest request
+        self._request = None
+        self._request_id = 0
+        self._results = OrderedDict()  # key -> (time, result)
+        self._generation = 0  # bumped by clear(), results read before it are not kept
+
+    def request(self, key, on_result, on_error, delay: int = None):
+        """
+        Look key up once it stays unchanged for `delay` ms (the default delay of the lookup if None)
+
+        on_result receives the result and on_error the exception, both on the GUI thread and only if no other
+        request was made meanwhile.
+        """
+        self._request_id += 1
+        self._request = (self._request_id, key, on_result, on_error)
+
+        recent = self._results.get(key)
+        if recent is not None and time.monotonic() - recent[0] < self.max_age:
+            self.timer.stop()
+            self._results.move_to_end(key)
+            self._request = None
+            on_result(recent[1])
+            return
+
+        self.timer.start(self.delay if delay is None else delay)
+
+    def cancel(self):
+        """Forget the pending request, its result is dropped if already running"""
+        self.timer.stop()
+        self._request_id += 1
+        self._request = None
+
+    def clear(self):
+        """Forget the recent results, after the data they were read from changed"""
+        self._generation += 1
+        self._results.clear()
+
+    def _start(self):
+        if self._request is None:
+            return
+        request_id, key, on_result, on_error = self._request
+        generation = self._generation
+        task = Task(self.fn, key)
+        task.succeeded.connect(
+            lambda result: self._done(request_id, generation, key, result, on_result)
+        )
+        task.failed.connect(lambda err: self._failed(request_id, err, on_error))
+        task.start()
+
+    def _done(self, request_id: int, generation: int, key, result, on_result):
+        if generation == self._generation:
+            self._results[key] = (time.monotonic(), result)
+            self._results.move_to_end(key)
+            if len(self._results) > self.cache_size:
+                self._results.popitem(last=False)
+
+        if request_id == self._request_id:
+            self._request = None
+            on_result(result)
+
+    def _failed(self, request_id: int, err: Exception, on_error):
+        if request_id == self._request_id:
+            self._request = None
+            on_error(err)